@@ -0,0 +1,576 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from nl2120_soilmm import correlation, layer_analysis, read, stats
+from nl2120_soilmm.cache import cache_clear
+from nl2120_soilmm.constants import LOCATION_FULLNAMES
+from nl2120_soilmm.preprocessing.ingest import ingest_workbook
+from nl2120_soilmm.preprocessing.manifest import hash_file
+from nl2120_soilmm.preprocessing.workbook import (
+    load_workbook_sheets,
+    read_sheet_resampled,
+)
+from nl2120_soilmm.sites import (
+    DATA_ROOT,
+    DATA_ROOT_VARIABLE,
+    SITES,
+    get_anchor_columns,
+    get_workbook_path,
+)
+from nl2120_soilmm.synthetic import generate_sites
+
+# fixed synthetic fixtures of increasing size, with hourly data
+SIZES = {
+    "small": {"years": 1, "anchors": 3, "sites": 1},
+    "medium": {"years": 3, "anchors": 6, "sites": 10},
+    "large": {"years": 10, "anchors": 12, "sites": 100},
+}
+
+FIXTURE_SEED = 2120
+FIXTURE_START = "2022-01-01"
+
+# the benchmarks, with the function that runs the benchmarked code on a fixture
+# and the function that is called before each run (e.g., to empty the caches)
+BENCHMARKS = {}
+
+
+def benchmark(name, setup=None):
+    """
+    Register a benchmark.
+
+    Parameters:
+    - name: Name of the benchmark, the module and function (e.g.,
+      "layer_analysis.detrend_layers linear").
+    - setup: Function called with the fixture before each run, which is not
+      timed.
+    """
+
+    def decorator(function):
+        BENCHMARKS[name] = {"function": function, "setup": setup}
+
+        return function
+
+    return decorator
+
+
+def clear_caches(fixture):
+    cache_clear()
+
+
+def get_fixtures_dir():
+    if DATA_ROOT is None:
+        raise ValueError(
+            f"Set {DATA_ROOT_VARIABLE} to a local folder to write the fixtures."
+        )
+
+    return Path(DATA_ROOT, "benchmarks")
+
+
+def get_fixture(size):
+    """
+    Synthetic sites of a size (see SIZES). The sites are generated once per
+    data root with a fixed seed: interim files for every site, and a logger
+    workbook for one site for the preprocessing benchmarks.
+
+    Returns:
+    - Dictionary with the locations, the location with a workbook and the data
+      of the first location.
+    """
+
+    params = SIZES[size]
+    prefix = f"B{size[0].upper()}"
+
+    locations = [f"{prefix}{nr:03d}" for nr in range(1, params["sites"] + 1)]
+    workbook_location = f"{prefix}W001"
+
+    path_to_fixture = get_fixtures_dir().joinpath(f"fixture_{size}.json")
+
+    described = {**params, "seed": FIXTURE_SEED, "start": FIXTURE_START}
+
+    generated = False
+    if path_to_fixture.exists():
+        with open(path_to_fixture, encoding="UTF8") as f:
+            generated = json.load(f) == described
+
+    if not generated or any(
+        location not in SITES for location in locations + [workbook_location]
+    ):
+        kwargs = {
+            "n_anchors": params["anchors"],
+            "years": params["years"],
+            "interval": "h",
+            "start": FIXTURE_START,
+            "seed": FIXTURE_SEED,
+        }
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_sites(
+                params["sites"], interim=True, workbooks=False, prefix=prefix, **kwargs
+            )
+            generate_sites(1, workbooks=True, prefix=f"{prefix}W", **kwargs)
+
+        path_to_fixture.parent.mkdir(parents=True, exist_ok=True)
+        with open(path_to_fixture, "w", encoding="UTF8") as f:
+            json.dump(described, f)
+
+    location = locations[0]
+
+    extensometer = read.read_extensometer(location)
+    layer_thickness = layer_analysis.calculate_layer_thickness(extensometer)
+    _, anchors = read.read_soilprofile(location, LOCATION_FULLNAMES[location])
+
+    return {
+        "size": size,
+        **params,
+        "locations": locations,
+        "workbook location": workbook_location,
+        "extensometer": extensometer,
+        "layer thickness": layer_thickness,
+        "anchors": anchors,
+        "layer thickness start": layer_analysis.calculate_layer_thickness_start(
+            anchors["m-mv"], layer_thickness.columns
+        ),
+        "groundwater": read.read_gwlevel(location, "RF"),
+    }
+
+
+# read.py, all locations of the fixture with empty caches. There are no
+# synthetic sources for read_precipitation_deficit, read_strain and
+# read_soilprofile_regiodeal.
+
+
+@benchmark("read.read_extensometer", setup=clear_caches)
+def read_extensometer(fixture):
+    for location in fixture["locations"]:
+        read.read_extensometer(location)
+
+
+@benchmark("read.read_extensometer mmap", setup=clear_caches)
+def read_extensometer_mmap(fixture):
+    for location in fixture["locations"]:
+        read.read_extensometer(location, mmap=True)
+
+
+@benchmark("read.read_extensometer window", setup=clear_caches)
+def read_extensometer_window(fixture):
+    start = pd.Timestamp(FIXTURE_START) + pd.DateOffset(months=6)
+    for location in fixture["locations"]:
+        read.read_extensometer(
+            location, start=start, end=start + pd.DateOffset(months=1)
+        )
+
+
+@benchmark("read.read_gwlevel")
+def read_gwlevel(fixture):
+    for location in fixture["locations"]:
+        read.read_gwlevel(location, "RF")
+
+
+@benchmark("read.read_hydraulic_head")
+def read_hydraulic_head(fixture):
+    for location in fixture["locations"]:
+        read.read_hydraulic_head(location)
+
+
+@benchmark("read.read_ditch_level")
+def read_ditch_level(fixture):
+    for location in fixture["locations"]:
+        read.read_ditch_level(location)
+
+
+@benchmark("read.read_surface_level", setup=clear_caches)
+def read_surface_level(fixture):
+    for location in fixture["locations"]:
+        read.read_surface_level(location)
+
+
+@benchmark("read.read_filter_depths", setup=clear_caches)
+def read_filter_depths(fixture):
+    for location in fixture["locations"]:
+        read.read_filter_depths(location)
+
+
+@benchmark("read.read_soilprofile", setup=clear_caches)
+def read_soilprofile(fixture):
+    for location in fixture["locations"]:
+        read.read_soilprofile(location, LOCATION_FULLNAMES[location])
+
+
+# layer_analysis.py, stats.py and correlation.py, the data of the first location
+
+
+@benchmark("layer_analysis.calculate_layer_thickness")
+def calculate_layer_thickness(fixture):
+    layer_analysis.calculate_layer_thickness(fixture["extensometer"])
+
+
+@benchmark("layer_analysis.detrend_layers linear")
+def detrend_layers_linear(fixture):
+    layer_analysis.detrend_layers(fixture["layer thickness"], detrend_method="linear")
+
+
+@benchmark("layer_analysis.detrend_layers piecewise_linear")
+def detrend_layers_piecewise_linear(fixture):
+    index = fixture["layer thickness"].index
+    layer_analysis.detrend_layers(
+        fixture["layer thickness"],
+        detrend_method="piecewise_linear",
+        breakpoints=pd.date_range(index[0], index[-1], freq="YS")[1:],
+    )
+
+
+@benchmark("layer_analysis.detrend_layers moving_average")
+def detrend_layers_moving_average(fixture):
+    layer_analysis.detrend_layers(
+        fixture["layer thickness"], detrend_method="moving_average", window_length=24
+    )
+
+
+@benchmark("layer_analysis.calculate_layer_thickness_start")
+def calculate_layer_thickness_start(fixture):
+    layer_analysis.calculate_layer_thickness_start(
+        fixture["anchors"]["m-mv"], fixture["layer thickness"].columns
+    )
+
+
+@benchmark("layer_analysis.calculate_rek")
+def calculate_rek(fixture):
+    layer_analysis.calculate_rek(
+        fixture["layer thickness"], fixture["layer thickness start"]
+    )
+
+
+@benchmark("stats.calculate_yearly_stats")
+def calculate_yearly_stats(fixture):
+    stats.calculate_yearly_stats(
+        fixture["extensometer"],
+        fixture["layer thickness"],
+        fixture["layer thickness start"],
+        years=(pd.Timestamp(FIXTURE_START).year,),
+    )
+
+
+@benchmark("stats.get_trendline")
+def get_trendline(fixture):
+    for column in fixture["extensometer"].columns:
+        stats.get_trendline(fixture["extensometer"][column].dropna())
+
+
+@benchmark("stats.get_trendlines")
+def get_trendlines(fixture):
+    stats.get_trendlines(fixture["extensometer"])
+
+
+def get_correlation_series(fixture):
+    groundwater = fixture["groundwater"].iloc[:, 0]
+    layer_thickness = fixture["layer thickness"].reindex(groundwater.index)
+
+    return groundwater, layer_thickness
+
+
+# the lags of the cross correlations of the layers with the groundwater level
+LAGS = np.arange(-7 * 24 + 1, 1 * 24)
+
+
+@benchmark("correlation.crosscorr")
+def crosscorr(fixture):
+    groundwater, layer_thickness = get_correlation_series(fixture)
+    for column in layer_thickness.columns:
+        for lag in LAGS:
+            correlation.crosscorr(groundwater, layer_thickness[column], lag=lag)
+
+
+@benchmark("correlation.crosscorr_lags")
+def crosscorr_lags(fixture):
+    groundwater, layer_thickness = get_correlation_series(fixture)
+    correlation.crosscorr_lags(groundwater, layer_thickness, LAGS)
+
+
+@benchmark("correlation.ccf_values")
+def ccf_values(fixture):
+    groundwater, layer_thickness = get_correlation_series(fixture)
+    valid = groundwater.notna() & layer_thickness.iloc[:, 0].notna()
+    correlation.ccf_values(
+        groundwater[valid].to_numpy(), layer_thickness.iloc[:, 0][valid].to_numpy()
+    )
+
+
+# preprocessing, the workbook of one location
+
+
+@benchmark("preprocessing.load_workbook_sheets")
+def load_workbook(fixture):
+    load_workbook_sheets(
+        get_workbook_path(fixture["workbook location"]), ["Ext", "PB", "cal"]
+    )
+
+
+@benchmark("preprocessing.read_sheet_resampled")
+def read_extensometer_sheet(fixture):
+    location = fixture["workbook location"]
+    read_sheet_resampled(
+        get_workbook_path(location),
+        "Ext",
+        usecols=[0] + [ord(letter) - 65 for letter in get_anchor_columns(location)],
+    )
+
+
+@benchmark("preprocessing.ingest_workbook")
+def ingest(fixture):
+    ingest_workbook(fixture["workbook location"])
+
+
+@benchmark("preprocessing.ingest_workbook stream")
+def ingest_stream(fixture):
+    ingest_workbook(fixture["workbook location"], stream=True)
+
+
+@benchmark("preprocessing.hash_file")
+def hash_workbook(fixture):
+    hash_file(get_workbook_path(fixture["workbook location"]))
+
+
+def run_benchmark(name, fixture, repeat=3):
+    """
+    Time a benchmark and measure its peak memory. The benchmark is run once
+    beforehand, so files written on first use (e.g., the memory-mapped copy of
+    the extensometer data) are not timed. The peak memory is measured in a
+    separate run with tracemalloc, which counts the memory allocated by Python
+    and numpy, not by pyarrow.
+
+    Returns:
+    - Dictionary with the shortest and median time (s) and the peak memory (MB).
+    """
+
+    spec = BENCHMARKS[name]
+
+    def run():
+        if spec["setup"] is not None:
+            spec["setup"](fixture)
+
+        start = time.perf_counter()
+        spec["function"](fixture)
+
+        return time.perf_counter() - start
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        run()
+        times = [run() for _ in range(repeat)]
+
+        if spec["setup"] is not None:
+            spec["setup"](fixture)
+
+        tracemalloc.start()
+        try:
+            spec["function"](fixture)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "min [s]": min(times),
+        "median [s]": float(np.median(times)),
+        "peak memory [MB]": peak / 2**20,
+    }
+
+
+def get_commit():
+    """Short hash of the checked out commit, None outside a git repository."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return result.stdout.strip()
+
+
+def run_benchmarks(sizes=tuple(SIZES), names=None, repeat=3):
+    """
+    Run the benchmarks on the fixtures of the given sizes.
+
+    Parameters:
+    - sizes: Names of the fixture sizes (see SIZES).
+    - names: Names of the benchmarks, or the start of them (e.g., "read."), all
+      benchmarks by default.
+    - repeat: Number of timed runs per benchmark.
+
+    Returns:
+    - DataFrame with a row per benchmark and size, with the run, commit and
+      machine, so the results can be compared with earlier runs.
+    """
+
+    selected = [
+        name
+        for name in BENCHMARKS
+        if names is None or any(name.startswith(prefix) for prefix in names)
+    ]
+
+    run = {
+        "run": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": get_commit(),
+        "machine": platform.node(),
+        "python": platform.python_version(),
+    }
+
+    results = []
+
+    for size in sizes:
+        fixture = get_fixture(size)
+
+        for name in selected:
+            result = {
+                **run,
+                "benchmark": name,
+                "size": size,
+                **SIZES[size],
+                **run_benchmark(name, fixture, repeat),
+            }
+            print(
+                f"{name} ({size}): {result['min [s]']:.4f} s, "
+                f"{result['peak memory [MB]']:.1f} MB"
+            )
+            results.append(result)
+
+    return pd.DataFrame(results)
+
+
+def get_path_to_history():
+    return get_fixtures_dir().joinpath("history.csv")
+
+
+def load_history(path_to_history):
+    if not path_to_history.exists():
+        return pd.DataFrame()
+
+    return pd.read_csv(path_to_history)
+
+
+def save_results(results, path_to_history):
+    """Append the results of a run to the history."""
+    path_to_history.parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(
+        path_to_history,
+        mode="a",
+        header=not path_to_history.exists(),
+        index=False,
+    )
+
+
+# smallest increase that is flagged, below it the differences are noise
+MIN_INCREASE = {"min [s]": 0.001, "peak memory [MB]": 0.1}
+
+
+def find_regressions(results, history, threshold=0.2, baseline_runs=5):
+    """
+    Compare the results of a run with earlier runs on the same machine. The
+    baseline of a benchmark and size is the median of the shortest times and
+    peak memory of the last runs.
+
+    Parameters:
+    - results: Results of the run (see run_benchmarks).
+    - history: Results of earlier runs.
+    - threshold: Relative increase that is flagged (0.2 is 20% slower or more
+      memory), when the increase is also larger than MIN_INCREASE.
+    - baseline_runs: Number of earlier runs in the baseline.
+
+    Returns:
+    - DataFrame with the baseline and ratio of the time and memory of each
+      benchmark and size, and whether it is a regression.
+    """
+
+    columns = ["min [s]", "peak memory [MB]"]
+    keys = ["benchmark", "size"]
+
+    if history.empty:
+        return pd.DataFrame()
+
+    machine = results["machine"].iloc[0]
+    earlier = history[history["machine"] == machine]
+    earlier = earlier[
+        earlier["run"].isin(earlier["run"].drop_duplicates().iloc[-baseline_runs:])
+    ]
+
+    if earlier.empty:
+        return pd.DataFrame()
+
+    baseline = earlier.groupby(keys)[columns].median()
+
+    comparison = results.set_index(keys)[columns].join(
+        baseline, rsuffix=" baseline", how="inner"
+    )
+
+    comparison["regression"] = False
+
+    for column in columns:
+        baseline_values = comparison[f"{column} baseline"]
+        comparison[f"{column} ratio"] = comparison[column] / baseline_values
+
+        comparison["regression"] |= (comparison[f"{column} ratio"] > 1 + threshold) & (
+            comparison[column] - baseline_values > MIN_INCREASE[column]
+        )
+
+    return comparison.sort_values("min [s] ratio", ascending=False)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Time and memory-profile the readers, the analysis and the "
+            "preprocessing on synthetic fixtures, and compare with earlier runs."
+        )
+    )
+    parser.add_argument("benchmarks", nargs="*", help="names or the start of them")
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--history", type=Path, default=None)
+    parser.add_argument(
+        "--no-save", action="store_true", help="do not add the run to the history"
+    )
+    parser.add_argument("--list", action="store_true", help="list the benchmarks")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        sys.exit()
+
+    path_to_history = args.history or get_path_to_history()
+    history = load_history(path_to_history)
+
+    results = run_benchmarks(args.sizes, args.benchmarks or None, args.repeat)
+
+    regressions = find_regressions(results, history, args.threshold)
+
+    if not args.no_save:
+        save_results(results, path_to_history)
+
+    if regressions.empty:
+        print("No earlier runs to compare with.")
+    else:
+        print(regressions.to_string(float_format="{:.3f}".format))
+
+        if regressions["regression"].any():
+            print(
+                f"Regressions of more than {args.threshold:.0%}: "
+                f"{regressions.index[regressions['regression']].to_list()}"
+            )
+            sys.exit(1)
@@ -0,0 +1,151 @@
+from collections import OrderedDict
+import functools
+import inspect
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# all cached readers, so their caches can be cleared and inspected at once
+CACHED_READERS = {}
+
+
+def get_mtime(path):
+    """Modification time of a file, None if it does not exist."""
+    try:
+        return Path(path).stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def is_memory_mapped(result):
+    """
+    Check if a DataFrame or Series is a view on a memory-mapped file (see
+    read_grid). Whether the values are writeable says nothing about this, with
+    Copy-on-Write pandas returns read-only views of all data.
+    """
+
+    if isinstance(result, pd.DataFrame) and result.dtypes.nunique() > 1:
+        return False
+
+    values = result.to_numpy(copy=False)
+
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+
+        values = getattr(values, "base", None)
+
+    return False
+
+
+def copy_result(result):
+    """
+    Copy the DataFrames and Series in a result, so callers can modify them.
+    The values of views on memory-mapped files are read-only, so only the
+    DataFrame is copied (e.g., for a new index), not the values.
+    """
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        if is_memory_mapped(result):
+            return result.copy(deep=False)
+
+        return result.copy()
+    if isinstance(result, tuple):
+        return tuple(copy_result(item) for item in result)
+    if isinstance(result, dict):
+        return {key: copy_result(value) for key, value in result.items()}
+
+    return result
+
+
+def cached_reader(source_path, maxsize=32, copy=True):
+    """
+    Cache the results of a reader in memory. The cache is keyed on the
+    arguments of the reader and an entry is only used when the modification
+    time of the source file did not change. The least recently used entry is
+    evicted when the cache holds more than maxsize entries. The decorated
+    reader has the methods cache_clear(), cache_info() and cache_entries(),
+    which lists the arguments and result of each cached call.
+
+    Parameters:
+    - source_path: Function that returns the path of the source file for the
+      arguments of the reader.
+    - maxsize: Maximum number of cached results.
+    - copy: Return copies of the cached DataFrames. Without copies the callers
+      must not modify the result, e.g. when they only use a part of it and
+      copy that part.
+    """
+
+    def decorator(reader):
+        signature = inspect.signature(reader)
+        cache = OrderedDict()
+        stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        @functools.wraps(reader)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+
+            key = tuple(arguments.arguments.items())
+            source_parameters = inspect.signature(source_path).parameters
+            mtime = get_mtime(
+                source_path(
+                    **{
+                        name: value
+                        for name, value in arguments.arguments.items()
+                        if name in source_parameters
+                    }
+                )
+            )
+
+            if key in cache and cache[key][0] == mtime:
+                stats["hits"] += 1
+                cache.move_to_end(key)
+
+                return copy_result(cache[key][1]) if copy else cache[key][1]
+
+            stats["misses"] += 1
+            result = reader(*args, **kwargs)
+
+            cache[key] = (mtime, result)
+            cache.move_to_end(key)
+
+            while len(cache) > maxsize:
+                cache.popitem(last=False)
+                stats["evictions"] += 1
+
+            return copy_result(result) if copy else result
+
+        def cache_clear():
+            cache.clear()
+            for name in stats:
+                stats[name] = 0
+
+        def cache_info():
+            return {**stats, "size": len(cache), "maxsize": maxsize}
+
+        def cache_entries():
+            return [(dict(key), result) for key, (_, result) in cache.items()]
+
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_info = cache_info
+        wrapper.cache_entries = cache_entries
+
+        CACHED_READERS[reader.__name__] = wrapper
+
+        return wrapper
+
+    return decorator
+
+
+def cache_clear():
+    """Clear the caches of all cached readers."""
+    for reader in CACHED_READERS.values():
+        reader.cache_clear()
+
+
+def cache_info():
+    """DataFrame with the hits, misses, evictions and size of each cached reader."""
+    return pd.DataFrame(
+        {name: reader.cache_info() for name, reader in CACHED_READERS.items()}
+    ).T
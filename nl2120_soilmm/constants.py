@@ -87,6 +87,13 @@ DITCHES = {
     "ROU MS": "",
 }
 
+# columns of the groundwater wells in the PB and cal sheets of the logger workbooks
+PB_COLUMNS = {
+    "M4T": ["B", "C", "D"],
+    "MMW": ["B", "C", "D", "E"],
+    "MSW": ["B", "C", "D", "E"],
+}
+
 MIDDEPTH_FILTERS = {
     "ALB": "",
     "ASD": "ASD_MP_6",
@@ -1,4 +1,5 @@
 import numpy as np
+import pandas as pd
 from scipy import signal
 import matplotlib.pyplot as plt
 
@@ -51,6 +52,82 @@ def crosscorr(datax, datay, lag=0):
     return datax.corr(datay.shift(lag))
 
 
+def crosscorr_lags(datax, datay, lags):
+    """
+    Lag-N cross correlations for many lags and columns at once. For each lag
+    the Pearson correlation is computed over the pairs where both series have a
+    value, like crosscorr does, but the sums for all lags are calculated with
+    FFT convolutions instead of shifting the data per lag.
+
+    Parameters:
+    - datax: pandas.Series.
+    - datay: pandas.Series or DataFrame, aligned on the index of datax.
+    - lags: Integer lags (e.g., np.arange(-7 * 24 + 1, 1 * 24)).
+
+    Returns:
+    - Series (datay is a Series) or DataFrame (a column per column of datay)
+      with the cross correlation per lag.
+    """
+
+    lags = np.asarray(lags)
+
+    datay = datay.reindex(datax.index)
+    is_series = isinstance(datay, pd.Series)
+    if is_series:
+        datay = datay.to_frame()
+
+    x = datax.to_numpy(dtype="float64")[:, np.newaxis]
+    y = datay.to_numpy(dtype="float64")
+
+    mask_x = ~np.isnan(x)
+    mask_y = ~np.isnan(y)
+
+    # subtract the mean to keep the sums small compared to the rounding errors
+    x = np.where(mask_x, x - np.nanmean(x), 0.0)
+    y = np.where(mask_y, y - np.nanmean(y, axis=0), 0.0)
+
+    def correlate(a, b):
+        # sum over t of a[t] * b[t - lag], for lag = -(n - 1), ..., n - 1
+        return signal.fftconvolve(
+            np.broadcast_to(a, y.shape), b[::-1], mode="full", axes=0
+        )
+
+    mask_x = mask_x.astype("float64")
+    mask_y = mask_y.astype("float64")
+
+    n = correlate(mask_x, mask_y)
+    sum_x = correlate(x, mask_y)
+    sum_y = correlate(mask_x, y)
+    sum_xx = correlate(x * x, mask_y)
+    sum_yy = correlate(mask_x, y * y)
+    sum_xy = correlate(x, y)
+
+    # select the lags, index 0 of the full correlation is lag -(n - 1)
+    rows = lags + len(x) - 1
+    valid_lags = (rows >= 0) & (rows < n.shape[0])
+    rows = np.clip(rows, 0, n.shape[0] - 1)
+
+    n = np.round(n[rows])
+    covariance = n * sum_xy[rows] - sum_x[rows] * sum_y[rows]
+    variance_x = n * sum_xx[rows] - sum_x[rows] ** 2
+    variance_y = n * sum_yy[rows] - sum_y[rows] ** 2
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlation = covariance / np.sqrt(variance_x * variance_y)
+
+    correlation[(n < 2) | ~valid_lags[:, np.newaxis]] = np.nan
+    correlation = np.clip(correlation, -1.0, 1.0)
+
+    result = pd.DataFrame(
+        correlation, index=pd.Index(lags, name="lag"), columns=datay.columns
+    )
+
+    if is_series:
+        return result.iloc[:, 0]
+
+    return result
+
+
 if __name__ == "__main__":
     import numpy as np
     from read import read_groundwater, read_extensometer, read_precipitation_deficit
@@ -100,27 +177,20 @@ if __name__ == "__main__":
     # lags = np.arange(-10, 10)
 
     cross_corrs = []
-    auto_corrs = []
 
-    for i in lags:
-        # print(i)
-        cross_corrs_year = []
+    for year in ["2021", "2022", "2023", "2024"]:
+        precip_deficit_year = precip_deficit.loc[year]
+        layer_thickness_detrended_year = layer_thickness_detrended.loc[year]
 
-        for year in ["2021", "2022", "2023", "2024"]:
-            precip_deficit_year = precip_deficit.loc[year]
-            layer_thickness_detrended_year = layer_thickness_detrended.loc[year]
-
-            cross_corr_year = crosscorr(
+        cross_corrs.append(
+            crosscorr_lags(
                 precip_deficit_year,
                 layer_thickness_detrended_year["0.41 m bs - 0.06 m bs"],
-                lag=i,
+                lags,
             )
+        )
 
-            cross_corrs_year.append(cross_corr_year)
-
-        cross_corrs.append(np.mean(cross_corrs_year))
-        # auto_corr = groundwater.autocorr(lag=i)
-        # auto_corrs.append(auto_corr)
+    cross_corrs = pd.concat(cross_corrs, axis=1).mean(axis=1, skipna=False)
 
     # plot
     fig, ax = plt.subplots()
@@ -16,7 +16,7 @@ from read import (
 )
 from soilmm.layer_analysis import calculate_layer_thickness
 from soilmm.constants import LOCATION_FULLNAMES, SOILPROFILE_DEPTHS, SOILTYPES_COLORS
-from soilmm.correlation import crosscorr
+from soilmm.correlation import crosscorr_lags
 
 #################################################################
 # Parameters
@@ -68,12 +68,9 @@ for anchor in extensometer_data:
 
         print(f"Anchor {anchor} is above the groundwater level")
 
-        cross_corr_single_anchor = []
-        for lag in lags:
-            cross_corr = crosscorr(groundwater_data, extensometer_data[anchor], lag=lag)
-            cross_corr_single_anchor.append(cross_corr)
-
-        cross_corrs[anchor] = cross_corr_single_anchor
+        cross_corrs[anchor] = crosscorr_lags(
+            groundwater_data, extensometer_data[anchor], lags
+        ).tolist()
 
 ################################################################
 # the plot
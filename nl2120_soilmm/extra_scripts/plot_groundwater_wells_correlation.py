@@ -18,7 +18,7 @@ from soilmm.layer_analysis import calculate_layer_thickness
 from soilmm.constants import LOCATION_FULLNAMES, SOILPROFILE_DEPTHS
 
 from soilmm.reference_date_correction import subtract_value_in_januari
-from soilmm.correlation import crosscorr
+from soilmm.correlation import crosscorr_lags
 
 #################################################################
 # Parameters
@@ -71,16 +71,9 @@ for anchor in extensometer_data:
 
     if anchor_height < min_groundwater_level:
 
-        cross_corr_single_anchor = []
-        # print(float(anchor)[:3]
-        for lag in lags:
-            # print(i)
-            cross_corr = crosscorr(
-                phreatic_head_data, extensometer_data[anchor], lag=lag
-            )
-            cross_corr_single_anchor.append(cross_corr)
-
-        cross_corrs[anchor] = cross_corr_single_anchor
+        cross_corrs[anchor] = crosscorr_lags(
+            phreatic_head_data, extensometer_data[anchor], lags
+        ).tolist()
 
 ################################################################
 # correlation bewtween deep and shallow groundwater filters
@@ -88,10 +81,9 @@ for anchor in extensometer_data:
 
 lags = np.arange(-7 * 24 + 1, 1 * 24)
 
-cross_corrs_deep_shallow = []
-for lag in lags:
-    cross_corr = crosscorr(phreatic_head_data, aquifer_data, lag=lag)
-    cross_corrs_deep_shallow.append(cross_corr)
+cross_corrs_deep_shallow = crosscorr_lags(
+    phreatic_head_data, aquifer_data, lags
+).tolist()
 
 ################################################################
 # the plot
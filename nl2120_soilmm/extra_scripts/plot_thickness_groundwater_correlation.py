@@ -13,7 +13,7 @@ from read import (
 )
 from layer_analysis import calculate_layer_thickness
 from constants import LOCATION_FULLNAMES, SOILPROFILE_DEPTHS, SOILTYPES_COLORS
-from correlation import crosscorr
+from correlation import crosscorr_lags
 
 #################################################################
 # Parameters
@@ -55,14 +55,9 @@ for anchor in layer_thickness_data:
     print(float(anchor[:3]))
     if float(anchor[:3]) < min_groundwater_level:
 
-        cross_corr_single_anchor = []
-        for lag in lags:
-            cross_corr = crosscorr(
-                groundwater_data, layer_thickness_data[anchor], lag=lag
-            )
-            cross_corr_single_anchor.append(cross_corr)
-
-        cross_corrs[anchor] = cross_corr_single_anchor
+        cross_corrs[anchor] = crosscorr_lags(
+            groundwater_data, layer_thickness_data[anchor], lags
+        ).tolist()
 
 ################################################################
 # the plot
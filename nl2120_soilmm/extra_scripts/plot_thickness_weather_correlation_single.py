@@ -17,7 +17,7 @@ from read import (
 from layer_analysis import calculate_layer_thickness, detrend_layers
 from constants import LOCATION_FULLNAMES, LEVELLING_DATES, SOILPROFILE_DEPTHS
 from levelling_correction import subtract_value_at_levelling_date
-from correlation import crosscorr
+from correlation import crosscorr_lags
 
 #################################################################
 # Parameters
@@ -61,17 +61,9 @@ lags = np.arange(-28 * 24 + 1, 28 * 24)
 cross_corrs = {}
 
 for anchor in layer_thickness_data:
-    cross_corr_single_anchor = []
-    # print(float(anchor)[:3]
-
-    for lag in lags:
-        # print(i)
-        cross_corr = crosscorr(
-            precip_deficit_data, layer_thickness_data[anchor], lag=lag
-        )
-        cross_corr_single_anchor.append(cross_corr)
-
-    cross_corrs[anchor] = cross_corr_single_anchor
+    cross_corrs[anchor] = crosscorr_lags(
+        precip_deficit_data, layer_thickness_data[anchor], lags
+    ).tolist()
 
 ################################################################
 # the plot
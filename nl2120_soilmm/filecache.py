@@ -0,0 +1,347 @@
+import argparse
+import contextlib
+import json
+from multiprocessing.util import Finalize
+import os
+from pathlib import Path
+import shutil
+import time
+
+import pandas as pd
+
+from nl2120_soilmm.constants import (
+    DITCHES,
+    HYDRAULIC_HEADS,
+    LOCATION_FULLNAMES,
+    SELECTED_GROUNDWATER_WELLS,
+)
+from nl2120_soilmm.sites import (
+    DATA_ROOT,
+    LITHOLOGY_DIR,
+    data_path,
+    get_groundwater_dir,
+    get_interim_dir,
+    get_soilprofile_source,
+)
+from nl2120_soilmm.tracing import record_file
+
+# Set this environment variable to a local folder to keep copies of the files
+# on the network drives there. Without it the files are read from the network.
+CACHE_DIR_VARIABLE = "NL2120_SOILMM_CACHE_DIR"
+CACHE_SIZE_VARIABLE = "NL2120_SOILMM_CACHE_SIZE_GB"
+
+CACHE_DIR = os.environ.get(CACHE_DIR_VARIABLE)
+CACHE_MAX_BYTES = int(float(os.environ.get(CACHE_SIZE_VARIABLE, 5)) * 2**30)
+
+INDEX_FILENAME = "index.json"
+
+# seconds after which the lock on the index of a process that did not release
+# it (e.g., because it crashed) is removed
+LOCK_TIMEOUT = 30
+
+STATS = {
+    "local files": 0,
+    "remote files": 0,
+    "local bytes": 0,
+    "remote bytes": 0,
+    "evictions": 0,
+}
+
+# the index as last read or written by this process, and the time of the
+# accesses to files in the cache since then, which are only stored in the
+# index file when this process changes it or exits
+index = None
+accessed = {}
+ACCESS_WRITERS = set()
+
+
+def get_index_path(cache_dir):
+    return Path(cache_dir).joinpath(INDEX_FILENAME)
+
+
+def load_index(cache_dir):
+    """Size, modification time and last access of each file in the cache."""
+    path_to_index = get_index_path(cache_dir)
+
+    if not path_to_index.exists():
+        return {}
+
+    with open(path_to_index, encoding="UTF8") as f:
+        return json.load(f)
+
+
+def save_index(cache_dir, index):
+    path_to_index = get_index_path(cache_dir)
+    path_to_index.parent.mkdir(parents=True, exist_ok=True)
+
+    path_to_tmp = path_to_index.with_suffix(".tmp")
+    with open(path_to_tmp, "w", encoding="UTF8") as f:
+        json.dump(index, f, indent=1)
+
+    path_to_tmp.replace(path_to_index)
+
+
+@contextlib.contextmanager
+def lock_index(cache_dir):
+    """
+    Lock the index of a cache folder, so processes that share the folder (e.g.,
+    the worker processes of the preprocessing and render drivers) do not
+    overwrite each other's changes.
+    """
+
+    path_to_lock = get_index_path(cache_dir).with_suffix(".lock")
+    path_to_lock.parent.mkdir(parents=True, exist_ok=True)
+
+    while True:
+        try:
+            fd = os.open(path_to_lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except (FileExistsError, PermissionError):
+            try:
+                if time.time() - path_to_lock.stat().st_mtime > LOCK_TIMEOUT:
+                    path_to_lock.unlink(missing_ok=True)
+                    continue
+            except OSError:
+                continue
+
+            time.sleep(0.01)
+
+    try:
+        yield
+    finally:
+        os.close(fd)
+        path_to_lock.unlink(missing_ok=True)
+
+
+def update_index(cache_dir, max_bytes, key=None, entry=None):
+    """
+    Merge the accesses of this process and a new entry into the index on disk,
+    remove the least recently used files when the cache is full and save it.
+    """
+
+    global index
+
+    with lock_index(cache_dir):
+        index = load_index(cache_dir)
+
+        for accessed_key, last_access in accessed.items():
+            if accessed_key in index:
+                index[accessed_key]["last access"] = max(
+                    index[accessed_key]["last access"], last_access
+                )
+
+        accessed.clear()
+
+        if key is not None:
+            index[key] = entry
+
+        evict(cache_dir, index, max_bytes, keep=key)
+        save_index(cache_dir, index)
+
+
+def write_accesses(cache_dir, max_bytes):
+    if accessed:
+        update_index(cache_dir, max_bytes)
+
+
+def register_access_writer(cache_dir, max_bytes):
+    # runs when the process exits, also in the worker processes of a pool
+    if (os.getpid(), cache_dir) not in ACCESS_WRITERS:
+        ACCESS_WRITERS.add((os.getpid(), cache_dir))
+        Finalize(None, write_accesses, args=(cache_dir, max_bytes), exitpriority=0)
+
+
+def get_local_path(path, cache_dir):
+    """Path of the copy of a file, with a folder per drive letter."""
+    path = Path(path)
+
+    if DATA_ROOT is not None and path.is_relative_to(DATA_ROOT):
+        relative_path = path.relative_to(DATA_ROOT)
+    else:
+        drive, _, rest = path.as_posix().partition(":/")
+        relative_path = Path(drive.lower().lstrip("/"), rest)
+
+    return Path(cache_dir).joinpath(relative_path)
+
+
+def evict(cache_dir, index, max_bytes, keep=None):
+    """
+    Remove the least recently used files until the cache fits in max_bytes,
+    except the file keep (e.g., the file that was just copied). Files that
+    another process has opened on Windows can not be removed and are kept.
+    """
+
+    total = sum(entry["size"] for entry in index.values())
+
+    for key in sorted(index, key=lambda key: index[key]["last access"]):
+        if total <= max_bytes:
+            break
+
+        if key == keep:
+            continue
+
+        try:
+            Path(cache_dir).joinpath(key).unlink(missing_ok=True)
+        except PermissionError:
+            continue
+
+        total -= index.pop(key)["size"]
+        STATS["evictions"] += 1
+
+
+def is_fresh(entry, stat):
+    return (
+        entry is not None
+        and entry["size"] == stat.st_size
+        and entry["mtime"] == stat.st_mtime
+    )
+
+
+def cached_path(path, cache_dir=None, max_bytes=None):
+    """
+    Path to read a file on the network drives from. The file is copied to the
+    cache folder on first access, and the copy is used as long as the size and
+    modification time of the original did not change. The original path is
+    returned when no cache folder is set or the file does not fit in the cache.
+
+    Parameters:
+    - path: Path to the file on the network drive.
+    - cache_dir: Cache folder, NL2120_SOILMM_CACHE_DIR by default.
+    - max_bytes: Size of the cache, the least recently used files are removed
+      when it is full.
+    """
+
+    global index
+
+    record_file(path)
+
+    cache_dir = cache_dir or CACHE_DIR
+    max_bytes = max_bytes or CACHE_MAX_BYTES
+
+    if cache_dir is None:
+        return Path(path)
+
+    if index is None:
+        index = load_index(cache_dir)
+
+    local_path = get_local_path(path, cache_dir)
+    key = local_path.relative_to(cache_dir).as_posix()
+
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        # the network drive is not available, use the copy if there is one
+        if key not in index:
+            index = load_index(cache_dir)
+
+        if key in index and local_path.exists():
+            STATS["local files"] += 1
+            STATS["local bytes"] += index[key]["size"]
+
+            accessed[key] = time.time()
+            register_access_writer(cache_dir, max_bytes)
+
+            return local_path
+
+        return Path(path)
+
+    if stat.st_size > max_bytes:
+        STATS["remote files"] += 1
+        STATS["remote bytes"] += stat.st_size
+
+        return Path(path)
+
+    # another process may have copied the file since the index was read
+    if not is_fresh(index.get(key), stat):
+        index = load_index(cache_dir)
+
+    if is_fresh(index.get(key), stat) and local_path.exists():
+        STATS["local files"] += 1
+        STATS["local bytes"] += stat.st_size
+
+        # a hit is only stored in the index file later, see update_index
+        accessed[key] = time.time()
+        register_access_writer(cache_dir, max_bytes)
+
+        return local_path
+
+    # the copy is written next to the file and then renamed, so other
+    # processes never read a partial copy
+    local_path.parent.mkdir(parents=True, exist_ok=True)
+    path_to_tmp = local_path.with_name(f"{local_path.name}.{os.getpid()}.tmp")
+    shutil.copy2(path, path_to_tmp)
+
+    try:
+        os.replace(path_to_tmp, local_path)
+    except PermissionError:
+        # the copy of another process is open on Windows, it is the same file
+        path_to_tmp.unlink(missing_ok=True)
+
+    STATS["remote files"] += 1
+    STATS["remote bytes"] += stat.st_size
+
+    update_index(
+        cache_dir,
+        max_bytes,
+        key,
+        {"size": stat.st_size, "mtime": stat.st_mtime, "last access": time.time()},
+    )
+
+    return local_path
+
+
+def cache_stats():
+    """Number of files and bytes read from the cache (local) and the network."""
+    return pd.Series(STATS)
+
+
+def get_location_files(location, plot_types=("RF", "MS")):
+    """Files on the network drives that the read functions use for a location."""
+    files = []
+
+    interim_dir = get_interim_dir(location)
+    if interim_dir.exists():
+        files += [path for path in interim_dir.iterdir() if path.is_file()]
+
+    groundwater_dir = get_groundwater_dir(location)
+    names = [HYDRAULIC_HEADS.get(location), DITCHES.get(location)]
+    for plot_type in plot_types:
+        names.append(DITCHES.get(f"{location} {plot_type}"))
+        names += SELECTED_GROUNDWATER_WELLS.get(f"{location} {plot_type}", [])
+
+    files += [groundwater_dir.joinpath(f"{name}.csv") for name in names if name]
+
+    files.append(get_soilprofile_source(location)[0])
+    for name in ["lithology", "anchors"]:
+        files.append(
+            data_path(LITHOLOGY_DIR).joinpath("regiodeal", f"{location}_{name}.csv")
+        )
+
+    return [path for path in dict.fromkeys(files) if path.exists()]
+
+
+def prefetch(locations, plot_types=("RF", "MS")):
+    """Copy the files of the given locations to the cache folder."""
+    if CACHE_DIR is None:
+        raise ValueError(f"Set {CACHE_DIR_VARIABLE} to prefetch the data.")
+
+    for location in locations:
+        files = get_location_files(location, plot_types)
+
+        print(f"Prefetching {len(files)} files of {LOCATION_FULLNAMES[location]}")
+
+        for path in files:
+            cached_path(path)
+
+    print(cache_stats())
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Copy the data of locations to the local cache folder."
+    )
+    parser.add_argument("locations", nargs="*", default=list(LOCATION_FULLNAMES))
+    args = parser.parse_args()
+
+    prefetch(args.locations)
@@ -0,0 +1,513 @@
+import json
+import os
+from pathlib import Path
+import time
+
+import numpy as np
+import pandas as pd
+
+# parquet support is optional, without pyarrow only the csv files are used
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from nl2120_soilmm.constants import LOCATION_FULLNAMES
+from nl2120_soilmm.filecache import cached_path
+from nl2120_soilmm.sites import INTERIM_DIR
+
+# rows per parquet row group (a month of hourly data), a date window only
+# decodes the row groups it overlaps
+ROW_GROUP_SIZE = 24 * 31
+
+# rows per chunk when a date window is read from a csv file
+CSV_CHUNKSIZE = 50_000
+
+
+def get_columnar_path(path_to_csv):
+    """Path of the parquet file that is stored next to an interim csv file."""
+    return Path(path_to_csv).with_suffix(".parquet")
+
+
+def has_columnar_copy(path_to_csv):
+    """
+    Check if an up to date parquet copy of an interim csv file is available.
+    A parquet file that is older than the csv file is considered stale.
+    """
+    if pyarrow is None:
+        return False
+
+    path_to_csv = Path(path_to_csv)
+    path_to_parquet = get_columnar_path(path_to_csv)
+
+    if not path_to_parquet.exists():
+        return False
+
+    if path_to_csv.exists():
+        return path_to_parquet.stat().st_mtime >= path_to_csv.stat().st_mtime
+
+    return True
+
+
+def write_columnar(data, path_to_csv):
+    """
+    Write a time series to parquet next to the csv file, with a datetime index
+    and float64 columns.
+    """
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+
+    data = data.copy()
+    data.index = pd.to_datetime(data.index)
+    data.columns = [str(column) for column in data.columns]
+    data = data.apply(pd.to_numeric, errors="coerce").astype("float64")
+
+    data.to_parquet(get_columnar_path(path_to_csv), row_group_size=ROW_GROUP_SIZE)
+
+
+def read_csv_tail(path_to_csv, nbytes=2**16):
+    """
+    Read the last lines of a csv file without parsing the whole file.
+
+    Returns:
+    - List with tuples of the byte offset and the timestamp of each line.
+    """
+
+    with open(path_to_csv, "rb") as f:
+        f.seek(0, 2)
+        size = f.tell()
+        start = max(size - nbytes, 0)
+        f.seek(start)
+        tail = f.read()
+
+    tail_lines = tail.splitlines(keepends=True)
+    offset = start
+
+    # the first line is incomplete if the tail does not start at the file start
+    if start > 0 and tail_lines:
+        offset += len(tail_lines.pop(0))
+
+    lines = []
+
+    for line in tail_lines:
+        first_field = line.split(b",", 1)[0].decode().strip()
+
+        try:
+            lines.append((offset, pd.Timestamp(first_field)))
+        except ValueError:
+            pass  # header
+
+        offset += len(line)
+
+    return lines
+
+
+def read_last_index(path_to_csv):
+    """Timestamp of the last row of an interim csv file."""
+    lines = read_csv_tail(path_to_csv)
+
+    if not lines:
+        return None
+
+    return lines[-1][1]
+
+
+def append_csv(data, path_to_csv):
+    """
+    Append rows to an interim csv file. Rows in the file at or after the first
+    new timestamp are replaced by the new rows.
+    """
+
+    lines = read_csv_tail(path_to_csv)
+    first_timestamp = pd.Timestamp(data.index[0])
+
+    if not lines or lines[0][1] >= first_timestamp:
+        # the rows that are replaced are not all in the tail, rewrite the file
+        existing = pd.read_csv(path_to_csv, index_col=0, parse_dates=True)
+        existing = existing[existing.index < first_timestamp]
+        data = pd.concat([existing, data])
+        data.to_csv(path_to_csv)
+
+        return data
+
+    truncate_at = next(
+        (offset for offset, timestamp in lines if timestamp >= first_timestamp),
+        None,
+    )
+
+    with open(path_to_csv, "r+b") as f:
+        if truncate_at is not None:
+            f.truncate(truncate_at)
+
+    data.to_csv(path_to_csv, mode="a", header=False)
+
+    return data
+
+
+def write_interim(data, path_to_csv, append=False):
+    """
+    Write an interim time series to csv and, if pyarrow is installed, also to
+    parquet so the readers can skip parsing the dates of the csv file.
+
+    With append=True the rows are appended to the existing file, replacing the
+    rows from the first new timestamp onwards.
+    """
+
+    if append and Path(path_to_csv).exists():
+        has_copy = has_columnar_copy(path_to_csv)
+
+        append_csv(data, path_to_csv)
+
+        if has_copy:
+            # parquet files can not be appended to, so the copy is rewritten
+            existing = pd.read_parquet(get_columnar_path(path_to_csv))
+            existing = existing[existing.index < pd.Timestamp(data.index[0])]
+
+            if isinstance(data, pd.Series):
+                data = data.to_frame()
+
+            data.columns = [str(column) for column in data.columns]
+            write_columnar(pd.concat([existing, data]), path_to_csv)
+
+        return
+
+    data.to_csv(path_to_csv)
+
+    if pyarrow is not None:
+        write_columnar(data, path_to_csv)
+
+
+def get_window_bounds(start=None, end=None):
+    """
+    First and last timestamp that data.loc[start:end] can select. A partial
+    date as end (e.g. "2025" or "2025-06") includes the whole period.
+    """
+
+    lower = pd.Timestamp(start) if start is not None else None
+
+    if end is None:
+        upper = None
+    elif isinstance(end, str):
+        upper = pd.Period(end).end_time
+    else:
+        upper = pd.Timestamp(end)
+
+    return lower, upper
+
+
+def get_index_filters(path_to_parquet, start=None, end=None):
+    """Parquet filters on the datetime index that select a date window."""
+    lower, upper = get_window_bounds(start, end)
+
+    index_name = pyarrow.parquet.read_schema(path_to_parquet).pandas_metadata[
+        "index_columns"
+    ][0]
+
+    filters = []
+    if lower is not None:
+        filters.append((index_name, ">=", lower))
+    if upper is not None:
+        filters.append((index_name, "<=", upper))
+
+    return filters or None
+
+
+def read_csv_window(path_to_csv, start=None, end=None):
+    """
+    Read the rows of a date window from an interim csv file in chunks. The
+    file is read until the end of the window, when the rows are in order.
+    """
+
+    lower, upper = get_window_bounds(start, end)
+
+    chunks = []
+    in_order = True
+    previous = None
+
+    with pd.read_csv(
+        path_to_csv, index_col=0, parse_dates=True, chunksize=CSV_CHUNKSIZE
+    ) as reader:
+        for chunk in reader:
+            in_order = (
+                in_order
+                and chunk.index.is_monotonic_increasing
+                and (previous is None or chunk.index[0] >= previous)
+            )
+            previous = chunk.index[-1] if len(chunk) else previous
+
+            if lower is not None:
+                chunk = chunk[chunk.index >= lower]
+            if upper is not None:
+                chunk = chunk[chunk.index <= upper]
+
+            chunks.append(chunk)
+
+            if (
+                in_order
+                and upper is not None
+                and previous is not None
+                and previous > upper
+            ):
+                break
+
+    if chunks:
+        data = pd.concat(chunks)
+    else:
+        data = pd.read_csv(path_to_csv, index_col=0, nrows=0)
+
+    if len(data) == 0:
+        # the dates of a file with only a header are not parsed
+        data.index = pd.DatetimeIndex(data.index, name=data.index.name)
+
+    return data
+
+
+def read_interim(path_to_csv, columns=None, start=None, end=None):
+    """
+    Read an interim time series. The parquet copy is used when it is available
+    and up to date, otherwise the csv file is parsed. The file is read from the
+    local cache folder when NL2120_SOILMM_CACHE_DIR is set (see filecache.py).
+
+    Parameters:
+    - path_to_csv: Path to the csv file in the 2-interim folder.
+    - columns: Optional list of columns to select.
+    - start, end: Optional date window, like data.loc[start:end]. Only the
+      parquet row groups or csv rows up to the end of the window are read.
+
+    Returns:
+    - DataFrame with a DatetimeIndex.
+    """
+
+    window = start is not None or end is not None
+
+    if has_columnar_copy(path_to_csv):
+        path_to_parquet = cached_path(get_columnar_path(path_to_csv))
+
+        data = pd.read_parquet(
+            path_to_parquet,
+            columns=columns,
+            filters=get_index_filters(path_to_parquet, start, end) if window else None,
+        )
+    else:
+        if window:
+            data = read_csv_window(cached_path(path_to_csv), start, end)
+        else:
+            data = pd.read_csv(cached_path(path_to_csv), index_col=0, parse_dates=True)
+
+        if columns is not None:
+            data = data[columns]
+
+    if window:
+        data = data.loc[start:end]
+
+    return data
+
+
+def get_grid_values_paths(path_to_grid):
+    """All .npy files of a grid, the current and earlier versions."""
+    path_to_grid = Path(path_to_grid)
+
+    return [path_to_grid.with_suffix(".npy")] + sorted(
+        path_to_grid.parent.glob(f"{path_to_grid.name}.*.npy")
+    )
+
+
+def write_grid(data, path_to_grid, dtype="float64", metadata=None):
+    """
+    Store a time series on a fixed grid (e.g. hourly) as a .npy file with the
+    values, one column after the other, and a .json file with the start, the
+    frequency, the column names and the name of the .npy file. See read_grid.
+
+    Each write makes a new .npy file and then replaces the .json file, so
+    DataFrames that are a view on an earlier version (see read_grid) keep
+    their values. Earlier versions are removed when they are no longer
+    opened (on Windows an opened file can not be removed).
+
+    Parameters:
+    - data: DataFrame with a regular DatetimeIndex (e.g. after asfreq("h")).
+    - path_to_grid: Path of the grid files, without suffix.
+    - dtype: Data type of the stored values ("float64" or "float32").
+    - metadata: Optional dictionary that is stored in the .json file as well.
+    """
+
+    path_to_grid = Path(path_to_grid)
+    path_to_grid.parent.mkdir(parents=True, exist_ok=True)
+
+    if len(data) and data.index.freq is None:
+        raise ValueError("The index of a grid needs a frequency, e.g. asfreq('h').")
+
+    path_to_values = path_to_grid.with_name(
+        f"{path_to_grid.name}.{time.time_ns()}_{os.getpid()}.npy"
+    )
+
+    np.save(path_to_values, np.asfortranarray(data.to_numpy(dtype=dtype)))
+
+    grid = {
+        "values": path_to_values.name,
+        "start": str(data.index[0]) if len(data) else None,
+        # an empty grid is hourly, so it can be read like the others
+        "freq": data.index.freqstr if len(data) else "h",
+        "length": len(data),
+        "index name": data.index.name,
+        "column levels": list(data.columns.names),
+        "columns": [
+            list(column) if isinstance(column, tuple) else column
+            for column in data.columns
+        ],
+        **(metadata or {}),
+    }
+
+    path_to_metadata = path_to_grid.with_suffix(".json")
+    path_to_tmp = path_to_grid.with_suffix(f".{os.getpid()}.tmp")
+
+    with open(path_to_tmp, "w", encoding="UTF8") as f:
+        json.dump(grid, f, indent=1)
+
+    os.replace(path_to_tmp, path_to_metadata)
+
+    # another process may have replaced the .json file in the meantime
+    current = read_grid_metadata(path_to_grid).get("values")
+
+    for path_to_old_values in get_grid_values_paths(path_to_grid):
+        if path_to_old_values.name not in (path_to_values.name, current):
+            try:
+                path_to_old_values.unlink(missing_ok=True)
+            except PermissionError:
+                continue
+
+
+def read_grid_metadata(path_to_grid):
+    with open(Path(path_to_grid).with_suffix(".json"), encoding="UTF8") as f:
+        return json.load(f)
+
+
+def read_grid(path_to_grid):
+    """
+    Open a time series that was stored with write_grid. The values are
+    memory-mapped, not read: only the parts of the file that are used (e.g. a
+    date window selected with .loc) are read from disk.
+
+    Returns:
+    - Read-only DataFrame that is a view on the file.
+    """
+
+    grid = read_grid_metadata(path_to_grid)
+
+    if grid["length"] == 0:
+        # an empty file can not be memory-mapped
+        values = np.empty((0, len(grid["columns"])))
+        values.flags.writeable = False
+        index = pd.DatetimeIndex([], freq=grid["freq"], name=grid["index name"])
+    else:
+        values = np.load(
+            Path(path_to_grid).with_name(
+                grid.get("values", Path(path_to_grid).with_suffix(".npy").name)
+            ),
+            mmap_mode="r",
+        )
+        index = pd.date_range(
+            grid["start"],
+            periods=grid["length"],
+            freq=grid["freq"],
+            name=grid["index name"],
+        )
+
+    if len(grid["column levels"]) > 1:
+        columns = pd.MultiIndex.from_tuples(
+            [tuple(column) for column in grid["columns"]], names=grid["column levels"]
+        )
+    else:
+        columns = pd.Index(grid["columns"], name=grid["column levels"][0])
+
+    return pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+
+def has_grid(path_to_grid, path_to_source):
+    """Check if the grid files are newer than the file they were made from."""
+    path_to_metadata = Path(path_to_grid).with_suffix(".json")
+
+    if not path_to_metadata.exists():
+        return False
+
+    return path_to_metadata.stat().st_mtime >= Path(path_to_source).stat().st_mtime
+
+
+def convert_interim_folder(basedir=INTERIM_DIR, overwrite=False):
+    """
+    Write a parquet copy of every time series csv file in the 2-interim folder.
+    Csv files without a datetime index (e.g. surface levels) are skipped.
+
+    Returns:
+    - List with the paths of the parquet files that were written.
+    """
+
+    if pyarrow is None:
+        raise ImportError("pyarrow is required to convert the interim folder.")
+
+    converted = []
+
+    for path_to_csv in sorted(Path(basedir).glob("*/*.csv")):
+        if has_columnar_copy(path_to_csv) and not overwrite:
+            continue
+
+        data = pd.read_csv(path_to_csv, index_col=0, parse_dates=True)
+
+        if not isinstance(data.index, pd.DatetimeIndex):
+            continue
+
+        print(f"Converting {path_to_csv.name}")
+        write_columnar(data, path_to_csv)
+        converted.append(get_columnar_path(path_to_csv))
+
+    return converted
+
+
+def benchmark_interim(locations, basedir=INTERIM_DIR, repeat=3):
+    """
+    Compare the load times of the csv and parquet files of each location.
+
+    Returns:
+    - DataFrame with the best load time over all files of a location.
+    """
+
+    results = {}
+
+    for location in locations:
+        location_dir = Path(basedir).joinpath(LOCATION_FULLNAMES[location])
+
+        csv_time = 0.0
+        parquet_time = 0.0
+
+        for path_to_csv in sorted(location_dir.glob("*.csv")):
+            if not has_columnar_copy(path_to_csv):
+                continue
+
+            csv_times = []
+            parquet_times = []
+
+            for _ in range(repeat):
+                start = time.perf_counter()
+                pd.read_csv(path_to_csv, index_col=0, parse_dates=True)
+                csv_times.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                pd.read_parquet(get_columnar_path(path_to_csv))
+                parquet_times.append(time.perf_counter() - start)
+
+            csv_time += min(csv_times)
+            parquet_time += min(parquet_times)
+
+        results[location] = {"csv (s)": csv_time, "parquet (s)": parquet_time}
+
+    results = pd.DataFrame(results).T
+    results["speedup"] = results["csv (s)"] / results["parquet (s)"]
+
+    return results
+
+
+if __name__ == "__main__":
+
+    convert_interim_folder()
+
+    print(benchmark_interim(list(LOCATION_FULLNAMES)).round(3))
@@ -1,7 +1,10 @@
+import numpy as np
 import pandas as pd
-from scipy import signal
 
+from nl2120_soilmm.tracing import traced
 
+
+@traced()
 def calculate_layer_thickness(extensometer_data):
 
     column_names = [
@@ -18,34 +21,90 @@ def calculate_layer_thickness(extensometer_data):
     return layer_thickness
 
 
-def detrend_layers(layer_thickness_data, detrend_method="linear", window_length=7):
-
-    detrended_layers = pd.DataFrame()
-
-    for column in layer_thickness_data.columns:
-
-        if detrend_method == "linear":
-            detrended_layer = signal.detrend(layer_thickness_data[column])
-        elif detrend_method == "moving_average":
-            detrended_layer = (
-                layer_thickness_data[column]
-                - layer_thickness_data[column].rolling(window_length).mean()
+def detrend_linear(values):
+    """
+    Subtract a least-squares line from each column of a 2-D array. Missing
+    values are left out of the fit and stay missing, for columns without
+    missing values this is the same as signal.detrend.
+    """
+
+    x = np.arange(values.shape[0], dtype="float64")[:, np.newaxis]
+    valid = ~np.isnan(values)
+    n = valid.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = np.where(valid, x, 0.0).sum(axis=0) / n
+        y_mean = np.where(valid, values, 0.0).sum(axis=0) / n
+
+        dx = np.where(valid, x - x_mean, 0.0)
+        dy = np.where(valid, values - y_mean, 0.0)
+
+        # a single value has no slope
+        slope = np.nan_to_num((dx * dy).sum(axis=0) / (dx * dx).sum(axis=0))
+
+    return values - y_mean - slope * (x - x_mean)
+
+
+@traced()
+def detrend_layers(
+    layer_thickness_data,
+    detrend_method="linear",
+    window_length=7,
+    breakpoints=None,
+    center=False,
+):
+    """
+    Remove the trend from all layers at once.
+
+    Parameters:
+    - layer_thickness_data: DataFrame with the layer thicknesses.
+    - detrend_method: "linear", "piecewise_linear" or "moving_average".
+    - window_length: Number of values in the moving average window.
+    - breakpoints: Timestamps where a new linear trend starts, used by
+      "piecewise_linear" (each part gets its own line, like signal.detrend
+      with bp).
+    - center: Center the moving average window instead of using the values
+      before each timestamp.
+
+    Returns:
+    - DataFrame with the detrended layer thicknesses. Missing values are left
+      out of the trends and stay missing.
+    """
+
+    values = layer_thickness_data.to_numpy(dtype="float64")
+
+    match detrend_method:
+        case "linear":
+            detrended = detrend_linear(values)
+        case "piecewise_linear":
+            if breakpoints is None:
+                raise ValueError("Breakpoints are required for piecewise_linear.")
+
+            positions = layer_thickness_data.index.searchsorted(
+                pd.to_datetime(breakpoints)
             )
-        else:
+            bounds = np.unique(np.concatenate([[0], positions, [len(values)]]))
+
+            detrended = np.empty_like(values)
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                detrended[start:end] = detrend_linear(values[start:end])
+        case "moving_average":
+            detrended = values - (
+                layer_thickness_data.rolling(window_length, center=center)
+                .mean()
+                .to_numpy()
+            )
+        case _:
             raise ValueError("Invalid detrend method.")
 
-        detrended_layer = pd.Series(
-            detrended_layer, index=layer_thickness_data.index, name=column
-        )
-
-        if detrended_layers.empty:
-            detrended_layers = detrended_layer.to_frame()
-        else:
-            detrended_layers = pd.concat([detrended_layers, detrended_layer], axis=1)
-
-    return detrended_layers
+    return pd.DataFrame(
+        detrended,
+        index=layer_thickness_data.index,
+        columns=layer_thickness_data.columns,
+    )
 
 
+@traced()
 def calculate_layer_thickness_start(soilprofile_anchors, column_names):
     layer_thickness_start = soilprofile_anchors.diff().dropna()
 
@@ -62,6 +121,7 @@ def calculate_layer_thickness_start(soilprofile_anchors, column_names):
     return layer_thickness_start
 
 
+@traced()
 def calculate_anchor_depth_start(soilprofile_anchors, column_names):
     # calculate the anchor depth start
     anchor_depth_start = soilprofile_anchors.copy()
@@ -78,6 +138,7 @@ def calculate_anchor_depth_start(soilprofile_anchors, column_names):
     return anchor_depth_start
 
 
+@traced()
 def calculate_rek(layer_thickness, layer_thickness_start):
     # calculate the deformation in cm
     totale_deformatie = layer_thickness  # + layer_thickness_start.T.values
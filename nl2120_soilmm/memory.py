@@ -0,0 +1,379 @@
+import argparse
+import gc
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+# the resident set size is sampled with psutil when it is installed, otherwise
+# it is read from /proc on Linux and not measured on other systems
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from nl2120_soilmm import tracing
+from nl2120_soilmm.cache import CACHED_READERS
+
+MB = 2**20
+
+# whether memory is measured, the highest resident set size since the last span
+# started or ended, the spans after which a checkpoint is taken and the
+# checkpoints taken so far
+STATE = {
+    "enabled": False,
+    "rss peak": 0,
+    "interval": 0.01,
+    "checkpoint spans": ("pipeline.",),
+    "largest": 5,
+    "checkpoints": [],
+}
+
+
+def get_rss():
+    """Resident set size of this process in bytes, None if it can not be measured."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+
+    try:
+        with open("/proc/self/statm", encoding="UTF8") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, AttributeError, ValueError):
+        return None
+
+
+def sample_rss():
+    # runs in a thread, a short peak between two spans is caught by sampling
+    while STATE["enabled"]:
+        STATE["rss peak"] = max(STATE["rss peak"], get_rss() or 0)
+        time.sleep(STATE["interval"])
+
+
+def reset_peaks():
+    tracemalloc.reset_peak()
+    STATE["rss peak"] = get_rss() or 0
+
+
+def update_peaks(record):
+    """Fold the peaks since the last reset into those of a span."""
+    _, peak = tracemalloc.get_traced_memory()
+
+    record["peak"] = max(record["peak"], peak)
+    record["rss peak"] = max(record["rss peak"], STATE["rss peak"], get_rss() or 0)
+
+
+def start_span(record, stack):
+    # the peaks so far belong to the span this one is nested in
+    if stack:
+        update_peaks(stack[-1])
+
+    reset_peaks()
+
+    current, _ = tracemalloc.get_traced_memory()
+
+    record["start memory"] = current
+    record["peak"] = current
+    record["rss peak"] = STATE["rss peak"]
+
+
+def end_span(record, stack, name, tags):
+    update_peaks(record)
+
+    if stack:
+        stack[-1]["peak"] = max(stack[-1]["peak"], record["peak"])
+        stack[-1]["rss peak"] = max(stack[-1]["rss peak"], record["rss peak"])
+
+    current, _ = tracemalloc.get_traced_memory()
+    rss = get_rss()
+
+    measured = {
+        "peak [MB]": (record["peak"] - record["start memory"]) / MB,
+        "retained [MB]": (current - record["start memory"]) / MB,
+        "traced [MB]": current / MB,
+        "rss [MB]": None if rss is None else rss / MB,
+        "rss peak [MB]": record["rss peak"] / MB if rss is not None else None,
+    }
+
+    if name.startswith(STATE["checkpoint spans"]):
+        checkpoint(name, **tags)
+
+        # the memory used by the checkpoint itself is not part of the spans
+        reset_peaks()
+
+    return measured
+
+
+def enable(checkpoint_spans=("pipeline.",), interval=0.01, largest=5):
+    """
+    Measure the memory of each span (see tracing.py): the extra memory at the
+    peak of the span and the memory it retained, traced with tracemalloc, and
+    the resident set size of the process. Tracing is enabled as well. With
+    tracemalloc the code runs a few times slower.
+
+    Parameters:
+    - checkpoint_spans: Start of the names of the spans after which the largest
+      live DataFrames are listed (see checkpoint), e.g. the pipeline stages.
+    - interval: Time in seconds between two samples of the resident set size.
+    - largest: Number of DataFrames listed at a checkpoint.
+    """
+
+    if STATE["enabled"]:
+        return
+
+    STATE.update(
+        {
+            "enabled": True,
+            "interval": interval,
+            "checkpoint spans": tuple(checkpoint_spans),
+            "largest": largest,
+        }
+    )
+
+    tracemalloc.start()
+    tracing.enable()
+
+    tracing.HOOKS["start"].append(start_span)
+    tracing.HOOKS["end"].append(end_span)
+
+    reset_peaks()
+    threading.Thread(target=sample_rss, daemon=True).start()
+
+
+def disable():
+    if not STATE["enabled"]:
+        return
+
+    STATE["enabled"] = False
+
+    tracing.HOOKS["start"].remove(start_span)
+    tracing.HOOKS["end"].remove(end_span)
+
+    tracemalloc.stop()
+
+
+def add_names(names, name, result):
+    if isinstance(result, pd.DataFrame):
+        names.setdefault(id(result), name)
+    elif isinstance(result, (tuple, list)):
+        for i, item in enumerate(result):
+            add_names(names, f"{name}[{i}]", item)
+    elif isinstance(result, dict):
+        for key, item in result.items():
+            add_names(names, f"{name}[{key!r}]", item)
+
+
+def get_dataframe_names():
+    """
+    Names of the DataFrames that are referenced by a variable in one of the
+    running functions, a module, the results of the pipeline or the caches of
+    the readers.
+
+    Returns:
+    - Dictionary with the name per id of a DataFrame.
+    """
+
+    names = {}
+
+    for frame in sys._current_frames().values():
+        while frame is not None:
+            if frame.f_code.co_filename != __file__:
+                location = (
+                    f"{Path(frame.f_code.co_filename).stem}.{frame.f_code.co_name}"
+                )
+                for variable, value in frame.f_locals.items():
+                    add_names(names, f"{variable} in {location}", value)
+
+            frame = frame.f_back
+
+    pipeline = sys.modules.get("nl2120_soilmm.pipeline")
+    if pipeline is not None:
+        for (stage, location, plot_type, _), result in list(pipeline.RESULTS.items()):
+            add_names(names, f"pipeline result {stage} {location} {plot_type}", result)
+
+    for reader_name, reader in CACHED_READERS.items():
+        for arguments, result in reader.cache_entries():
+            described = ", ".join(
+                f"{argument}={value!r}"
+                for argument, value in arguments.items()
+                if value is not None
+            )
+            add_names(names, f"cached {reader_name}({described})", result)
+
+    for module_name, module in list(sys.modules.items()):
+        if module_name == "__main__" or module_name.startswith("nl2120_soilmm"):
+            for variable, value in list(vars(module).items()):
+                add_names(names, f"{variable} in {module_name}", value)
+
+    return names
+
+
+def checkpoint(label, **tags):
+    """
+    Record the memory in use and the largest live DataFrames, with their
+    names where they are known (see get_dataframe_names). DataFrames on
+    memory-mapped data are listed with their size, although they are not in
+    memory.
+
+    Parameters:
+    - label: Name of the checkpoint (e.g., the stage).
+    - tags: Values stored with the checkpoint (e.g., location="ZEG").
+
+    Returns:
+    - Dictionary with the checkpoint.
+    """
+
+    dataframes = [obj for obj in gc.get_objects() if isinstance(obj, pd.DataFrame)]
+    sizes = [(frame.memory_usage(index=True).sum(), frame) for frame in dataframes]
+    sizes.sort(key=lambda item: item[0], reverse=True)
+
+    names = get_dataframe_names()
+
+    current = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    rss = get_rss()
+
+    result = {
+        "label": label,
+        **{tag: str(value) for tag, value in tags.items()},
+        "traced [MB]": None if current is None else current / MB,
+        "rss [MB]": None if rss is None else rss / MB,
+        "dataframes": len(dataframes),
+        "dataframes [MB]": sum(size for size, _ in sizes) / MB,
+        "largest": [
+            {
+                "name": names.get(id(frame), "unnamed"),
+                "shape": frame.shape,
+                "MB": size / MB,
+            }
+            for size, frame in sizes[: STATE["largest"]]
+        ],
+    }
+
+    del dataframes, sizes
+
+    STATE["checkpoints"].append(result)
+
+    return result
+
+
+def get_checkpoints():
+    """DataFrame with a row per checkpoint and the largest DataFrames as text."""
+    checkpoints = pd.DataFrame(STATE["checkpoints"])
+
+    if checkpoints.empty:
+        return checkpoints
+
+    checkpoints["largest"] = [
+        "; ".join(
+            f"{frame['name']} {frame['shape']} {frame['MB']:.1f} MB"
+            for frame in largest
+        )
+        for largest in checkpoints["largest"]
+    ]
+
+    return checkpoints
+
+
+def summarize_memory(events=None, by=("name",)):
+    """
+    Memory per stage, or per stage and location with by=("name", "location").
+
+    Returns:
+    - DataFrame with the number of spans, the highest extra memory at the peak
+      of a span and the memory the spans retained in total (MB, traced with
+      tracemalloc), and the highest resident set size, sorted by the peak.
+    """
+
+    events = tracing.get_events() if events is None else events
+
+    spans = pd.DataFrame(
+        [
+            {
+                "name": event["name"],
+                **{tag: event["args"].get(tag) for tag in by if tag != "name"},
+                "peak [MB]": event["args"]["peak [MB]"],
+                "retained [MB]": event["args"]["retained [MB]"],
+                "rss peak [MB]": event["args"]["rss peak [MB]"],
+            }
+            for event in events
+            if "peak [MB]" in event["args"]
+        ]
+    )
+
+    if spans.empty:
+        return spans
+
+    summary = spans.groupby(list(by), dropna=False).agg(
+        spans=("peak [MB]", "size"),
+        **{
+            "peak [MB]": ("peak [MB]", "max"),
+            "retained [MB]": ("retained [MB]", "sum"),
+            "rss peak [MB]": ("rss peak [MB]", "max"),
+        },
+    )
+
+    return summary.sort_values("peak [MB]", ascending=False)
+
+
+if __name__ == "__main__":
+
+    from nl2120_soilmm.constants import LOCATION_FULLNAMES
+    from nl2120_soilmm.pipeline import clear_results, compute
+    from nl2120_soilmm.visualisation.render import render_location, use_agg
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compute stats stages and figures for several locations, like the stats "
+            "script and the figure scripts, and report the memory per stage and "
+            "location and the largest DataFrames after each stage."
+        )
+    )
+    parser.add_argument("locations", nargs="*", default=list(LOCATION_FULLNAMES))
+    parser.add_argument("--plot-type", default="RF")
+    parser.add_argument(
+        "--stages", nargs="+", default=["yearly stats", "trendlines", "rek"]
+    )
+    parser.add_argument("--figures", action="store_true", help="also draw the figures")
+    parser.add_argument(
+        "--trace", type=Path, default=None, help="write a Chrome trace to this file"
+    )
+    args = parser.parse_args()
+
+    enable()
+
+    if args.figures:
+        use_agg()
+
+    for location in args.locations:
+        for stage in args.stages:
+            compute(stage, location, args.plot_type)
+
+        if args.figures:
+            with tracing.span("figures", location=location, plot_type=args.plot_type):
+                render_location(
+                    location, args.plot_type, {"soil movement": ["english"]}
+                )
+
+        checkpoint("location done", location=location)
+
+        # like the stats script, the next location does not use these results
+        clear_results(location)
+
+    with pd.option_context("display.width", 250, "display.max_colwidth", 200):
+        print(summarize_memory().to_string(float_format="{:.1f}".format))
+        print(
+            summarize_memory(by=("name", "location")).to_string(
+                float_format="{:.1f}".format
+            )
+        )
+        print(
+            get_checkpoints()
+            .drop(columns=["dataframes"])
+            .to_string(float_format="{:.1f}".format)
+        )
+
+    if args.trace is not None:
+        tracing.save_trace(args.trace)
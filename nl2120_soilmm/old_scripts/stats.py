@@ -57,10 +57,8 @@ def get_trendline(extensometer_data, months=(1, 2)):
     x = mdates.date2num(highest_per_year.index)
     y = highest_per_year.values
 
-    z = np.polyfit(x, y, 1)
-    p = np.poly1d(z)
-
     slope, intercept, r_value, p_value, std_err = scipy.stats.linregress(x, y)
+    p = np.poly1d([slope, intercept])
     r_2 = r_value * r_value
 
     # convert slope to mm/year
@@ -0,0 +1,167 @@
+import argparse
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from nl2120_soilmm.constants import LOCATION_FULLNAMES
+from nl2120_soilmm.filecache import get_location_files
+from nl2120_soilmm.interim import read_grid, read_grid_metadata, write_grid
+from nl2120_soilmm.read import (
+    read_ditch_level,
+    read_extensometer,
+    read_gwlevel,
+    read_hydraulic_head,
+)
+from nl2120_soilmm.sites import INTERIM_DIR
+
+PANEL_DIR = INTERIM_DIR.joinpath("panels")
+
+# the series of a location that are put in the panel, with their reader
+VARIABLES = {
+    "extensometer": read_extensometer,
+    "groundwater level": read_gwlevel,
+    "hydraulic head": read_hydraulic_head,
+    "ditch level": read_ditch_level,
+}
+
+COLUMN_LEVELS = ["location", "variable", "series"]
+
+
+def read_location_series(location, plot_type="RF"):
+    """
+    Read the time series of a location that go into the panel. Series that are
+    not available for the location are left out.
+
+    Returns:
+    - Dictionary with a DataFrame per variable.
+    """
+
+    series = {}
+
+    for variable, reader in VARIABLES.items():
+        try:
+            data = reader(location, plot_type=plot_type)
+        except (KeyError, FileNotFoundError):
+            continue
+
+        if data is None or len(data) == 0:
+            continue
+
+        if isinstance(data, pd.Series):
+            data = data.to_frame(variable)
+
+        series[variable] = data
+
+    return series
+
+
+def build_panel(locations, plot_type="RF", period="h"):
+    """
+    Put the extensometer, groundwater level, hydraulic head and ditch level
+    series of several locations on one hourly time axis.
+
+    Parameters:
+    - locations: Short codes of the locations (e.g., ["ALB", "ASD"]).
+    - plot_type: Plot type of the locations (default is "RF").
+    - period: Frequency of the time axis (default is "h" for hourly).
+
+    Returns:
+    - DataFrame with the location, variable and series (e.g., the anchor) as
+      column levels. All values are stored in one float64 array, with the
+      values of each series next to each other.
+    """
+
+    frames = {}
+
+    for location in locations:
+        for variable, data in read_location_series(location, plot_type).items():
+            data.index = pd.to_datetime(data.index).floor(period)
+            data = data[~data.index.duplicated(keep="first")]
+
+            for column in data.columns:
+                if data[column].notna().any():
+                    frames[(location, variable, str(column))] = data[column]
+
+    if not frames:
+        return pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=COLUMN_LEVELS))
+
+    start = min(frame.first_valid_index() for frame in frames.values())
+    end = max(frame.last_valid_index() for frame in frames.values())
+    index = pd.date_range(start, end, freq=period)
+
+    values = np.full((len(index), len(frames)), np.nan, order="F")
+
+    for position, frame in enumerate(frames.values()):
+        frame = frame.dropna()
+        values[index.get_indexer(frame.index), position] = frame.to_numpy()
+
+    return pd.DataFrame(
+        values,
+        index=index,
+        columns=pd.MultiIndex.from_tuples(frames, names=COLUMN_LEVELS),
+        copy=False,
+    )
+
+
+def get_panel_name(locations, plot_type="RF"):
+    """Name of the stored panel of a set of locations."""
+    key = "-".join(locations)
+
+    return f"{plot_type}_{hashlib.md5(key.encode()).hexdigest()[:10]}"
+
+
+def get_sources(locations, plot_type="RF"):
+    """Modification times of the files the panel of the locations is built from."""
+    return {
+        str(path): path.stat().st_mtime
+        for location in locations
+        for path in get_location_files(location, plot_types=(plot_type,))
+        if path.suffix in (".csv", ".parquet")
+    }
+
+
+def get_path_to_panel(name):
+    return PANEL_DIR.joinpath(name)
+
+
+def get_panel(locations, plot_type="RF", rebuild=False):
+    """
+    Panel of the locations (see build_panel). The panel is stored in
+    2-interim/panels (see write_grid) and memory-mapped as long as the interim
+    files it was built from did not change.
+    """
+
+    path_to_panel = get_path_to_panel(get_panel_name(locations, plot_type))
+    sources = get_sources(locations, plot_type)
+
+    if path_to_panel.with_suffix(".json").exists() and not rebuild:
+        if read_grid_metadata(path_to_panel)["sources"] == sources:
+            return read_grid(path_to_panel)
+
+    print(f"Building the panel of {len(locations)} locations ({plot_type})")
+
+    write_grid(
+        build_panel(locations, plot_type),
+        path_to_panel,
+        metadata={"sources": sources},
+    )
+
+    return read_grid(path_to_panel)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Build the aligned hourly panel of several locations."
+    )
+    parser.add_argument("locations", nargs="*", default=list(LOCATION_FULLNAMES))
+    parser.add_argument("--plot-type", default="RF")
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    panel = get_panel(args.locations, args.plot_type, rebuild=args.rebuild)
+
+    # number of series per location and variable
+    columns = panel.columns.to_frame(index=False)
+    print(columns.groupby(["location", "variable"]).size().unstack())
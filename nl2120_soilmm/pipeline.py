@@ -0,0 +1,317 @@
+import hashlib
+import inspect
+
+import pandas as pd
+
+from nl2120_soilmm.cache import copy_result
+from nl2120_soilmm.constants import EXTENSOMETER_DEPTHS, LOCATION_FULLNAMES
+from nl2120_soilmm.filecache import get_location_files
+from nl2120_soilmm.layer_analysis import (
+    calculate_layer_thickness,
+    calculate_layer_thickness_start,
+    calculate_rek,
+)
+from nl2120_soilmm.read import (
+    read_extensometer,
+    read_soilprofile,
+    read_soilprofile_regiodeal,
+)
+from nl2120_soilmm.sites import INTERIM_DIR
+from nl2120_soilmm.stats import calculate_yearly_stats, get_trendlines
+from nl2120_soilmm.tracing import span
+
+RESULT_DIR = INTERIM_DIR.joinpath("pipeline")
+
+# locations of which the anchor depths are taken from the lithology workbooks,
+# for the other locations the depths in EXTENSOMETER_DEPTHS are used
+SOILPROFILE_LOCATIONS = [
+    "ALB",
+    "ASD",
+    "ROU",
+    "VLI",
+    "ZEG",
+    "DEM",
+    "LW",
+    "VEG",
+    "ZH",
+    "BKW",
+    "BKG",
+    "CBW",
+    "HZW",
+    "ROU09",
+]
+
+# the stages of the analysis, with their inputs (other stages) and parameters
+NODES = {}
+
+# results computed in this process, keyed on the stage, location, plot type and
+# the parameters the stage depends on
+RESULTS = {}
+
+
+def node(name, inputs=(), params=()):
+    """
+    Register a stage of the analysis. The stage is called with the location,
+    the plot type, the results of its inputs and its parameters as keyword
+    arguments.
+
+    Parameters:
+    - name: Name of the stage (e.g., "layer thickness").
+    - inputs: Names of the stages of which the results are used.
+    - params: Names of the parameters of the stage, with their defaults.
+    """
+
+    def decorator(function):
+        defaults = {
+            param: parameter.default
+            for param, parameter in inspect.signature(function).parameters.items()
+            if param in params
+        }
+
+        NODES[name] = {
+            "function": function,
+            "inputs": list(inputs),
+            "params": defaults,
+        }
+
+        return function
+
+    return decorator
+
+
+# the full series is read once per location and shared by all stages, the
+# stages that use a date window select it from the result
+@node("extensometer")
+def extensometer_node(location, plot_type):
+    return read_extensometer(location, plot_type=plot_type)
+
+
+@node("soilprofile anchors", inputs=("extensometer",))
+def soilprofile_anchors_node(location, plot_type, extensometer):
+    if location in SOILPROFILE_LOCATIONS:
+        _, anchors = read_soilprofile(
+            location, LOCATION_FULLNAMES[location], plot_type=plot_type
+        )
+    elif location == "GDA":
+        _, anchors = read_soilprofile_regiodeal(location, LOCATION_FULLNAMES[location])
+    else:
+        anchor_levels = [
+            -1 * float(depth.split(" ")[0]) for depth in EXTENSOMETER_DEPTHS[location]
+        ]
+        anchors = pd.DataFrame(
+            anchor_levels, index=extensometer.columns, columns=["m-mv"]
+        )
+
+    return anchors
+
+
+@node("layer thickness", inputs=("extensometer",))
+def layer_thickness_node(location, plot_type, extensometer):
+    return calculate_layer_thickness(extensometer)
+
+
+@node("layer thickness start", inputs=("soilprofile anchors", "layer thickness"))
+def layer_thickness_start_node(
+    location, plot_type, soilprofile_anchors, layer_thickness
+):
+    return calculate_layer_thickness_start(
+        soilprofile_anchors["m-mv"], layer_thickness.columns
+    )
+
+
+@node("rek", inputs=("layer thickness", "layer thickness start"))
+def rek_node(location, plot_type, layer_thickness, layer_thickness_start):
+    _, rek = calculate_rek(layer_thickness, layer_thickness_start)
+
+    return rek
+
+
+@node("trendlines", inputs=("extensometer",), params=("months", "start", "end"))
+def trendlines_node(
+    location, plot_type, extensometer, months=(1, 2), start=None, end=None
+):
+    return get_trendlines(extensometer.loc[start:end], months=months)
+
+
+@node(
+    "layer thickness trendlines",
+    inputs=("layer thickness",),
+    params=("months", "start", "end"),
+)
+def layer_thickness_trendlines_node(
+    location, plot_type, layer_thickness, months=(1, 2), start=None, end=None
+):
+    return get_trendlines(layer_thickness.loc[start:end], months=months)
+
+
+@node(
+    "yearly stats",
+    inputs=("extensometer", "layer thickness", "layer thickness start"),
+    params=("years",),
+)
+def yearly_stats_node(
+    location,
+    plot_type,
+    extensometer,
+    layer_thickness,
+    layer_thickness_start,
+    years=(2022,),
+):
+    return calculate_yearly_stats(
+        extensometer, layer_thickness, layer_thickness_start, years=years
+    )
+
+
+def get_params(name, params):
+    """
+    Parameters a stage depends on, its own and those of the stages before it,
+    with the defaults filled in.
+    """
+
+    stage = NODES[name]
+
+    used = {
+        param: params.get(param, default) for param, default in stage["params"].items()
+    }
+
+    for input_name in stage["inputs"]:
+        used.update(get_params(input_name, params))
+
+    return dict(sorted(used.items()))
+
+
+def get_key(name, location, plot_type, params):
+    params = {
+        param: tuple(value) if isinstance(value, list) else value
+        for param, value in get_params(name, params).items()
+    }
+
+    return (name, location, plot_type, tuple(params.items()))
+
+
+def get_path_to_result(key):
+    name, location, plot_type, params = key
+    digest = hashlib.md5(repr(params).encode()).hexdigest()[:10]
+
+    return RESULT_DIR.joinpath(
+        name.replace(" ", "_"), f"{location}_{plot_type}_{digest}.pkl"
+    )
+
+
+def get_sources(location, plot_type):
+    """Modification times of the files the results of a location depend on."""
+    return {
+        str(path): path.stat().st_mtime
+        for path in get_location_files(location, plot_types=(plot_type,))
+    }
+
+
+def evaluate(name, location, plot_type, params, persist):
+    key = get_key(name, location, plot_type, params)
+
+    if key in RESULTS:
+        return RESULTS[key]
+
+    path_to_result = get_path_to_result(key)
+
+    if persist:
+        sources = get_sources(location, plot_type)
+
+        if path_to_result.exists():
+            stored = pd.read_pickle(path_to_result)
+
+            if stored["sources"] == sources:
+                RESULTS[key] = stored["result"]
+
+                return RESULTS[key]
+
+    stage = NODES[name]
+
+    inputs = {
+        input_name.replace(" ", "_"): evaluate(
+            input_name, location, plot_type, params, persist
+        )
+        for input_name in stage["inputs"]
+    }
+    own_params = {
+        param: params.get(param, default) for param, default in stage["params"].items()
+    }
+
+    with span(f"pipeline.{name}", location=location, plot_type=plot_type):
+        result = stage["function"](
+            location=location, plot_type=plot_type, **inputs, **own_params
+        )
+
+    RESULTS[key] = result
+
+    if persist:
+        path_to_result.parent.mkdir(parents=True, exist_ok=True)
+        pd.to_pickle({"sources": sources, "result": result}, path_to_result)
+
+    return result
+
+
+def compute(name, location, plot_type="RF", persist=False, **params):
+    """
+    Result of a stage of the analysis for a location, e.g.
+    compute("rek", "ZEG") or compute("trendlines", "ZEG", months=(1, 2)).
+    The stages before it are computed when needed. Results are kept in memory,
+    so a stats export and several figures in the same run share them.
+
+    Parameters:
+    - name: Name of the stage (see NODES).
+    - location: Short code for the location (e.g., "ZEG").
+    - plot_type: Plot type of the location (default is "RF").
+    - persist: Also store the results in 2-interim/pipeline, and reuse them in
+      later runs as long as the files of the location did not change.
+    - params: Parameters of the stages (e.g., months, start, end).
+
+    Returns:
+    - A copy of the result, which can be modified. The results of a location
+      stay in memory until clear_results is called.
+    """
+
+    unknown = set(params) - {
+        param for stage in NODES.values() for param in stage["params"]
+    }
+    if unknown:
+        raise ValueError(f"Unknown pipeline parameters: {unknown}")
+
+    return copy_result(evaluate(name, location, plot_type, params, persist))
+
+
+def clear_results(location=None):
+    """
+    Remove the results kept in memory, of all locations or of one location
+    (e.g., when a run is done with a location and moves on to the next).
+    """
+
+    if location is None:
+        RESULTS.clear()
+        return
+
+    for key in [key for key in RESULTS if key[1] == location]:
+        del RESULTS[key]
+
+
+def describe():
+    """DataFrame with the inputs and parameters of each stage."""
+    return pd.DataFrame(
+        {
+            name: {
+                "inputs": ", ".join(stage["inputs"]),
+                "params": ", ".join(stage["params"]),
+            }
+            for name, stage in NODES.items()
+        }
+    ).T
+
+
+if __name__ == "__main__":
+
+    print(describe())
+
+    location = "ZEG"
+
+    print(compute("layer thickness trendlines", location, months=(1, 2)))
+    print(compute("rek", location).describe())
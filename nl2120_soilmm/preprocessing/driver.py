@@ -0,0 +1,112 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import os
+import time
+import traceback
+
+import pandas as pd
+
+from nl2120_soilmm.constants import LOCATION_FULLNAMES
+from nl2120_soilmm.preprocessing.ingest import ingest_workbook
+from nl2120_soilmm.tracing import traced
+
+
+@traced()
+def run_location(location, plot_type="RF", period="h"):
+    """
+    Ingest the workbook of one location. Errors are caught and returned, so a
+    failing location does not stop the other locations.
+    """
+
+    start = time.perf_counter()
+
+    try:
+        timings = ingest_workbook(location, plot_type=plot_type, period=period)
+        error = None
+    except Exception:
+        timings = None
+        error = traceback.format_exc()
+
+    return {
+        "location": location,
+        "status": "failed" if error else "done",
+        "time (s)": time.perf_counter() - start,
+        "timings": timings,
+        "error": error,
+    }
+
+
+def run_preprocessing(locations, plot_type="RF", period="h", max_workers=None):
+    """
+    Preprocess the logger workbooks of several locations in parallel, each
+    location in its own worker process.
+
+    Parameters:
+    - locations: Short codes of the locations (e.g., ["M4T", "MMW", "MSW"]).
+    - plot_type: Plot type of the locations (default is "RF").
+    - period: Resampling period (default is "h" for hourly).
+    - max_workers: Maximum number of worker processes (default is the number of
+      cpus, but not more than the number of locations).
+
+    Returns:
+    - DataFrame with the status, duration and error of each location.
+    """
+
+    columns = ["status", "time (s)", "timings", "error"]
+
+    if not locations:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name="location"))
+
+    if max_workers is None:
+        max_workers = min(len(locations), os.cpu_count() or 1)
+
+    results = []
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(run_location, location, plot_type, period)
+            for location in locations
+        ]
+
+        for i, future in enumerate(as_completed(futures)):
+            result = future.result()
+            results.append(result)
+
+            print(
+                f"[{i + 1}/{len(locations)}] "
+                f"{LOCATION_FULLNAMES[result['location']]} {result['status']} "
+                f"in {result['time (s)']:.1f} s"
+            )
+
+    summary = pd.DataFrame(results).set_index("location").loc[list(locations), columns]
+
+    for location, error in summary["error"].dropna().items():
+        print(f"Preprocessing {LOCATION_FULLNAMES[location]} failed:\n{error}")
+
+    return summary
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Preprocess the logger workbooks of several locations in parallel."
+    )
+    parser.add_argument(
+        "locations",
+        nargs="*",
+        # no logger workbook is available for LangRoggebroek
+        default=[location for location in LOCATION_FULLNAMES if location != "LR"],
+    )
+    parser.add_argument("--plot-type", default="RF")
+    parser.add_argument("--period", default="h")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    summary = run_preprocessing(
+        args.locations,
+        plot_type=args.plot_type,
+        period=args.period,
+        max_workers=args.workers,
+    )
+
+    print(summary[["status", "time (s)"]].round(1))
@@ -1,4 +1,4 @@
-from pathlib import Path
+import argparse
 import pandas as pd
 import numpy as np
 
@@ -9,6 +9,20 @@ import numpy as np
 # )
 
 from nl2120_soilmm.constants import LOCATION_FULLNAMES
+from nl2120_soilmm.interim import read_last_index, write_interim
+from nl2120_soilmm.preprocessing.manifest import (
+    check_entry,
+    load_manifest,
+    save_manifest,
+)
+from nl2120_soilmm.preprocessing.workbook import read_sheet_resampled
+from nl2120_soilmm.sites import (
+    get_anchor_columns,
+    get_interim_path,
+    get_site,
+    get_workbook_path,
+)
+from nl2120_soilmm.tracing import traced
 
 
 def letter_range(start, stop="{", step=1):
@@ -17,99 +31,51 @@ def letter_range(start, stop="{", step=1):
         yield chr(ord_)
 
 
-def load_column_letters(location_fullname):
-    match location_fullname:
-        case "Vegelinsoord":
-            # anchor_columns = list(letter_range("G", "J"))
-            anchor_columns = list(letter_range("D", "G"))
-        case "Rouveen":
-            # anchor_columns = list(letter_range("I", "M"))
-            anchor_columns = list(letter_range("E", "I"))
-        case "Rouveen_parcel09":
-            anchor_columns = list(letter_range("D", "G"))
-        case "Hegewarren-Museum" | "Hegewarren-Greppel" | "Hegewarren-Ref":
-            anchor_columns = list(letter_range("F", "K"))
-        case _:
-            # anchor_columns = list(letter_range("M", "S"))
-            anchor_columns = list(letter_range("G", "M"))
+def load_column_letters(location):
+    """Column letters of the anchors in the logger workbook of a location."""
+    return get_anchor_columns(location)
 
-    return anchor_columns
 
+def get_extensometer_sheetname(location):
+    """Name of the sheet in the logger workbook that holds the anchor data."""
+    return get_site(location)["extensometer_sheet"]
 
+
+@traced()
 def update_extensometer_data_firstseries(
-    location, location_fullname, plot_type="RF", period="h"
+    location, location_fullname, plot_type="RF", period="h", sheets=None, since=None
 ):
 
-    match location:
-        case "ROU":
-            basedir = Path(
-                r"n:/Projects/11202000/11202008/B. Measurements and calculations/Extensometers"
-            )
-            if plot_type == "MS":
-                path_to_data = basedir.joinpath("WDOD-05A-drain.xlsm")
-            else:
-                path_to_data = basedir.joinpath("WDOD-05B-ref.xlsm")
-        case "ROU09":
-            basedir = Path(
-                r"n:/Projects/11202000/11202008/B. Measurements and calculations/Extensometers"
-            )
-            if plot_type == "MS":
-                path_to_data = basedir.joinpath("WDOD-09A-drain.xlsm")
-            else:
-                path_to_data = basedir.joinpath("WDOD-09B-ref.xlsm")
-        case _:
-            basedir = Path(
-                r"n:/Projects/11204000/11204108/B. Measurements and calculations/Extensometers/"
-            )
-            path_to_data = basedir.joinpath(f"{location}_{plot_type}.xlsm")
-
-    if location == "ZEG":
-        if plot_type == "MS":
-            path_to_data = basedir.joinpath(f"{location}_003_perceel 16-drain.xlsm")
+    path_to_data = get_workbook_path(location, plot_type)
 
-    outputdir = Path(
-        r"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim"
-    )
+    anchor_columns = load_column_letters(location)
 
-    anchor_columns = load_column_letters(location_fullname)
-
-    ## load raw data from excel
-    df = pd.read_excel(
+    ## load raw data from excel, keeping the first row of duplicated timestamps
+    df = read_sheet_resampled(
         path_to_data,
-        sheet_name="bewerking",
-        header=4,
-        # skiprows = [0,1,2,4],
+        get_extensometer_sheetname(location),
         usecols=[0] + [ord(letter) - 65 for letter in anchor_columns],
+        period=period,
+        since=since,
+        drop_duplicates=True,
+        sheets=sheets,
     )
 
-    names = df.iloc[0, 1:].values.tolist()
-
     ## rename columns
     new_names = []
-    for name in names:
+    for name in df.columns:
         name = name.replace(",", ".")
         new_names.append(name.replace("MV -", "") + "-mv")
-    df.columns = df.columns[:1].tolist() + new_names
-    df = df.iloc[4:]
-
-    df.tijd = pd.to_datetime(df.tijd)
-
-    ## set index to datetime
-    df = df.set_index("tijd")  # .loc[~df.index.duplicated(keep="first")]
-    df = df[~df.index.duplicated(keep="first")]
-
-    # print(df)
-
-    # df.index = pd.to_datetime(df.index)
-    df = df.resample(period).mean()
+    df.columns = new_names
+    df.index.name = "tijd"
 
     if (location == "ROU09") and (plot_type == "MS"):
         df.loc["2025-02-01":] = np.nan
 
-    df.to_csv(
-        outputdir.joinpath(
-            location_fullname, f"{location}_extensometer_{plot_type}.csv"
-        )
+    write_interim(
+        df,
+        get_interim_path(location, "extensometer", plot_type),
+        append=since is not None,
     )
 
     return df
@@ -121,11 +87,10 @@ def read_file(path_to_data, sheetname, location_fullname, usecols=None):
     namely to read data from an excel file.
     """
 
-    if usecols is None:
-        usecols = [0] + [
-            ord(letter) - 65 for letter in load_column_letters(location_fullname)
-        ]
-    anchor_columns = load_column_letters(location_fullname)
+    location = next(
+        code for code, name in LOCATION_FULLNAMES.items() if name == location_fullname
+    )
+    anchor_columns = load_column_letters(location)
     df = pd.read_excel(
         path_to_data,
         sheet_name=sheetname,
@@ -136,38 +101,26 @@ def read_file(path_to_data, sheetname, location_fullname, usecols=None):
     return df
 
 
-def update_extensometer_data_secondseries(location, location_fullname, period="h"):
+@traced()
+def update_extensometer_data_secondseries(
+    location, location_fullname, period="h", sheets=None, since=None
+):
+
+    path_to_data = get_workbook_path(location)
 
-    basedir = Path(r"n:/Projects/11206000/11206457/B. Measurements and calculations")
-    path_to_data = basedir.joinpath(
-        location_fullname, "Extensometer", f"{location_fullname}.xlsm"
-    )
+    anchor_columns = load_column_letters(location)
 
-    outputdir = Path(
-        r"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim"
-    )
+    sheetname = get_extensometer_sheetname(location)
 
-    anchor_columns = load_column_letters(location_fullname)
-
-    match location_fullname:
-        case "Demmerik" | "Vegelinsoord":
-            sheetname = "Ext"
-        case "LangeWeide":
-            sheetname = "EXT"
-        case "ZegveldHoogwater":
-            sheetname = "bewerking"
-
-    ## load raw data from excel
-    data = (
-        pd.read_excel(
-            path_to_data,
-            sheet_name=sheetname,
-            skiprows=[0, 1, 2, 3, 4, 6, 7, 8],
-            usecols=[0] + [ord(letter) - 65 for letter in anchor_columns],
-            index_col=0,
-        )
-        .resample(period)
-        .mean()
+    ## load raw data from excel, only the rows from the last (incomplete)
+    ## period of the interim data onwards when since is given
+    data = read_sheet_resampled(
+        path_to_data,
+        sheetname,
+        usecols=[0] + [ord(letter) - 65 for letter in anchor_columns],
+        period=period,
+        since=since,
+        sheets=sheets,
     )
 
     new_column_names = []
@@ -177,43 +130,35 @@ def update_extensometer_data_secondseries(location, location_fullname, period="h
 
     data.columns = new_column_names
 
-    data.to_csv(outputdir.joinpath(location_fullname, f"{location}_extensometer.csv"))
+    write_interim(
+        data,
+        get_interim_path(location, "extensometer"),
+        append=since is not None,
+    )
 
     return data
 
 
-def update_extensometer_data_regiodeal(location, location_fullname, period="h"):
-
-    basedir = Path(r"n:/Projects/11206000/11206020/B. Measurements and calculations")
-
-    if location == "HZW":
-        filename = location_fullname.removesuffix("-Dorp")
-    else:
-        filename = location_fullname
-
-    path_to_data = basedir.joinpath("Extensometers", f"{filename}.xlsm")
+@traced()
+def update_extensometer_data_regiodeal(
+    location, location_fullname, period="h", sheets=None, since=None
+):
 
-    outputdir = Path(
-        r"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim"
-    )
+    path_to_data = get_workbook_path(location)
 
-    anchor_columns = load_column_letters(location_fullname)
+    anchor_columns = load_column_letters(location)
 
-    # match location_fullname:
-    #     case "Gouda_MBORijnland" | "Berkenwoude":
-    sheetname = "Ext"
+    sheetname = get_extensometer_sheetname(location)
 
-    ## load raw data from excel
-    data = (
-        pd.read_excel(
-            path_to_data,
-            sheet_name=sheetname,
-            skiprows=[0, 1, 2, 3, 4, 6, 7, 8],
-            usecols=[0] + [ord(letter) - 65 for letter in anchor_columns],
-            index_col=0,
-        )
-        .resample(period)
-        .mean()
+    ## load raw data from excel, only the rows from the last (incomplete)
+    ## period of the interim data onwards when since is given
+    data = read_sheet_resampled(
+        path_to_data,
+        sheetname,
+        usecols=[0] + [ord(letter) - 65 for letter in anchor_columns],
+        period=period,
+        since=since,
+        sheets=sheets,
     )
 
     new_column_names = []
@@ -224,41 +169,39 @@ def update_extensometer_data_regiodeal(location, location_fullname, period="h"):
     data.columns = new_column_names
 
     if location == "BKW":
-        data.loc["2024-07-25 10:00"] = np.nan
+        data.loc["2024-07-25 10:00":"2024-07-25 10:00"] = np.nan
     elif location == "HZW":
-        data.loc["2023-05-24 14:00", "2.60 m-mv"] = np.nan
+        data.loc["2023-05-24 14:00":"2023-05-24 14:00", "2.60 m-mv"] = np.nan
 
-    data.to_csv(outputdir.joinpath(location_fullname, f"{location}_extensometer.csv"))
+    write_interim(
+        data,
+        get_interim_path(location, "extensometer"),
+        append=since is not None,
+    )
 
     return data
 
 
-def update_extensometer_data_moordrecht(location, location_fullname, period="h"):
+@traced()
+def update_extensometer_data_moordrecht(
+    location, location_fullname, period="h", sheets=None, since=None
+):
 
-    basedir = Path(r"n:/Projects/11210000/11210175/B. Measurements and calculations")
-    path_to_data = basedir.joinpath("Extensometers", f"{location_fullname}.xlsm")
+    path_to_data = get_workbook_path(location)
 
-    outputdir = Path(
-        r"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim"
-    )
+    anchor_columns = load_column_letters(location)
 
-    anchor_columns = load_column_letters(location_fullname)
+    sheetname = get_extensometer_sheetname(location)
 
-    # match location_fullname:
-    #     case "Gouda_MBORijnland" | "Berkenwoude":
-    sheetname = "Ext"
-
-    ## load raw data from excel
-    data = (
-        pd.read_excel(
-            path_to_data,
-            sheet_name=sheetname,
-            skiprows=[0, 1, 2, 3, 4, 6, 7, 8],
-            usecols=[0] + [ord(letter) - 65 for letter in anchor_columns],
-            index_col=0,
-        )
-        .resample(period)
-        .mean()
+    ## load raw data from excel, only the rows from the last (incomplete)
+    ## period of the interim data onwards when since is given
+    data = read_sheet_resampled(
+        path_to_data,
+        sheetname,
+        usecols=[0] + [ord(letter) - 65 for letter in anchor_columns],
+        period=period,
+        since=since,
+        sheets=sheets,
     )
 
     new_column_names = []
@@ -268,37 +211,35 @@ def update_extensometer_data_moordrecht(location, location_fullname, period="h")
 
     data.columns = new_column_names
 
-    data.to_csv(outputdir.joinpath(location_fullname, f"{location}_extensometer.csv"))
+    write_interim(
+        data,
+        get_interim_path(location, "extensometer"),
+        append=since is not None,
+    )
 
     return data
 
 
-def update_extensometer_data_hegewarren(location, location_fullname, period="h"):
-
-    basedir = Path(r"n:/Projects/11210000/11210448/B. Measurements and calculations")
-    path_to_data = basedir.joinpath("Extensometers", f"{location_fullname}.xlsm")
+@traced()
+def update_extensometer_data_hegewarren(
+    location, location_fullname, period="h", sheets=None, since=None
+):
 
-    outputdir = Path(
-        r"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim"
-    )
+    path_to_data = get_workbook_path(location)
 
-    anchor_columns = load_column_letters(location_fullname)
+    anchor_columns = load_column_letters(location)
 
-    # match location_fullname:
-    #     case "Gouda_MBORijnland" | "Berkenwoude":
-    sheetname = "Ext"
+    sheetname = get_extensometer_sheetname(location)
 
-    ## load raw data from excel
-    data = (
-        pd.read_excel(
-            path_to_data,
-            sheet_name=sheetname,
-            skiprows=[0, 1, 2, 3, 4, 6, 7, 8],
-            usecols=[0] + [ord(letter) - 65 for letter in anchor_columns],
-            index_col=0,
-        )
-        .resample(period)
-        .mean()
+    ## load raw data from excel, only the rows from the last (incomplete)
+    ## period of the interim data onwards when since is given
+    data = read_sheet_resampled(
+        path_to_data,
+        sheetname,
+        usecols=[0] + [ord(letter) - 65 for letter in anchor_columns],
+        period=period,
+        since=since,
+        sheets=sheets,
     )
 
     new_column_names = []
@@ -308,41 +249,148 @@ def update_extensometer_data_hegewarren(location, location_fullname, period="h")
 
     data.columns = new_column_names
 
-    data.to_csv(outputdir.joinpath(location_fullname, f"{location}_extensometer.csv"))
+    write_interim(
+        data,
+        get_interim_path(location, "extensometer"),
+        append=since is not None,
+    )
 
     return data
 
 
-def update_extensometer_data(locations, period="h", plot_type="MS"):
+@traced()
+def update_extensometer_data_location(
+    location, period="h", plot_type="MS", sheets=None, since=None
+):
+    """
+    Update the interim extensometer data of a single location. The raw sheets
+    of the logger workbook can be passed to avoid opening the workbook again.
+
+    When since is given, only the rows from that timestamp onwards are
+    resampled and appended to the interim data, replacing the period that
+    starts at since.
+    """
+
+    location_fullname = LOCATION_FULLNAMES[location]
+
+    match get_site(location)["series"]:
+        case "first":
+            extensometer_data = update_extensometer_data_firstseries(
+                location,
+                location_fullname,
+                period=period,
+                plot_type=plot_type,
+                sheets=sheets,
+                since=since,
+            )
+        case "second":
+            extensometer_data = update_extensometer_data_secondseries(
+                location, location_fullname, period=period, sheets=sheets, since=since
+            )
+        case "regiodeal":
+            extensometer_data = update_extensometer_data_regiodeal(
+                location, location_fullname, period=period, sheets=sheets, since=since
+            )
+
+        case "moordrecht":
+            extensometer_data = update_extensometer_data_moordrecht(
+                location, location_fullname, period=period, sheets=sheets, since=since
+            )
+
+        case "hegewarren":
+            extensometer_data = update_extensometer_data_hegewarren(
+                location, location_fullname, period=period, sheets=sheets, since=since
+            )
+
+    return extensometer_data
+
+
+def get_path_to_output(location, plot_type="RF"):
+    """Path to the interim extensometer csv file of a location."""
+    return get_interim_path(location, "extensometer", plot_type)
+
+
+@traced()
+def update_extensometer_data(
+    locations, period="h", plot_type="MS", force=False, incremental=False
+):
+    """
+    Update the interim extensometer data of the given locations. Locations of
+    which the logger workbook and the parameters did not change since the last
+    run (according to the manifest in the 2-interim folder) are skipped, unless
+    force is True.
+
+    With incremental=True a changed workbook is assumed to only have grown at
+    the end: only the rows from the last period in the interim data onwards
+    are resampled and appended. The location is rebuilt instead when the
+    parameters changed as well or the interim data is missing.
+    """
+
+    manifest = load_manifest()
+
+    extensometer_data = None
+    report = []
 
     for location in locations:
         location_fullname = LOCATION_FULLNAMES[location]
 
-        print(f"Processing data for {location_fullname}")
-
-        match location:
-            case "ALB" | "ASD" | "ROU" | "VLI" | "ZEG" | "ROU09":
-                extensometer_data = update_extensometer_data_firstseries(
-                    location, location_fullname, period=period, plot_type=plot_type
-                )
-            case "DEM" | "LW" | "VEG" | "ZH":
-                extensometer_data = update_extensometer_data_secondseries(
-                    location, location_fullname, period=period
-                )
-            case "GDA" | "BKG" | "BKW" | "CBW" | "HZW":
-                extensometer_data = update_extensometer_data_regiodeal(
-                    location, location_fullname, period=period
-                )
-
-            case "M4T" | "MMW" | "MSW":
-                extensometer_data = update_extensometer_data_moordrecht(
-                    location, location_fullname, period=period
-                )
-
-            case "HGM" | "HGG" | "HGR":
-                extensometer_data = update_extensometer_data_hegewarren(
-                    location, location_fullname, period=period
-                )
+        if get_site(location)["plot_types"]:
+            key = f"{location} extensometer {plot_type}"
+            location_plot_type = plot_type
+        else:
+            key = f"{location} extensometer"
+            location_plot_type = None
+
+        parameters = {
+            "period": period,
+            "plot_type": location_plot_type,
+            "anchor_columns": load_column_letters(location),
+        }
+
+        reason, entry = check_entry(
+            manifest,
+            key,
+            get_workbook_path(location, plot_type),
+            parameters,
+            outputs=[get_path_to_output(location, plot_type)],
+            force=force,
+        )
+
+        # rows can only be appended to an existing output that was made with
+        # the same parameters (e.g., the same period), otherwise it is rebuilt
+        since = None
+        if (
+            incremental
+            and reason == "source changed"
+            and manifest[key]["parameters"] == parameters
+            and get_path_to_output(location, plot_type).exists()
+        ):
+            since = read_last_index(get_path_to_output(location, plot_type))
+
+        if reason is None:
+            status = "skipped"
+            print(f"Skipping {location_fullname}, the data is up to date")
+        else:
+            status = "rebuilt" if since is None else f"appended from {since}"
+            print(f"Processing data for {location_fullname} ({reason})")
+
+            extensometer_data = update_extensometer_data_location(
+                location, period=period, plot_type=plot_type, since=since
+            )
+
+        # also store unchanged entries, to keep the modification times up to date
+        manifest[key] = entry
+        save_manifest(manifest)
+
+        report.append(
+            {
+                "location": location,
+                "status": status,
+                "reason": reason or "up to date",
+            }
+        )
+
+    print(pd.DataFrame(report).to_string(index=False))
 
     return extensometer_data
 
@@ -355,7 +403,25 @@ if __name__ == "__main__":
     # locations = ["BKW"]  # "HZW", "BKG", "CBW", "HZW",
     # locations = ["ROU09"]
 
-    locations = ["HGM", "HGG", "HGR"]  # ["M4T", "MMW"]
+    parser = argparse.ArgumentParser(
+        description="Update the interim extensometer data."
+    )
+    parser.add_argument(
+        "locations", nargs="*", default=["HGM", "HGG", "HGR"]  # ["M4T", "MMW"]
+    )
+    parser.add_argument("--period", default="h")
+    parser.add_argument("--plot-type", default="MS")
+    parser.add_argument(
+        "--force", action="store_true", help="also rebuild unchanged locations"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only append the new rows of changed workbooks",
+    )
+    args = parser.parse_args()
+
+    locations = args.locations
 
     print(locations)
 
@@ -373,4 +439,10 @@ if __name__ == "__main__":
     #     "GOU": "Gouda_MBORijnland",
     # }
 
-    data = update_extensometer_data(locations)
+    data = update_extensometer_data(
+        locations,
+        period=args.period,
+        plot_type=args.plot_type,
+        force=args.force,
+        incremental=args.incremental,
+    )
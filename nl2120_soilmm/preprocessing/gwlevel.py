@@ -1,28 +1,15 @@
-from pathlib import Path
 import pandas as pd
 import numpy as np
 
-from nl2120_soilmm.constants import LOCATION_FULLNAMES
+from nl2120_soilmm.constants import LOCATION_FULLNAMES, PB_COLUMNS
+from nl2120_soilmm.interim import INTERIM_DIR, write_interim
+from nl2120_soilmm.preprocessing.workbook import read_sheet, read_sheet_resampled
+from nl2120_soilmm.sites import get_interim_path, get_site, get_workbook_path
+from nl2120_soilmm.tracing import traced
 
 
-def load_column_letters(location_fullname, column="B"):
-    match location_fullname:
-        case (
-            "Gouda_MBORijnland"
-            | "Berkenwoude"
-            | "Bleskensgraaf"
-            | "Cabauw"
-            | "Hazerswoude-Dorp"
-            | "Moordrecht-Middelweg"
-            | "Moordrecht-4eTochtweg"
-            | "Moordrecht-Spoorweglaan"
-        ):
-            anchor_columns = list(column)
-
-    return anchor_columns
-
-
-def read_gwlevel(location, location_fullname, period="h"):
+@traced()
+def read_gwlevel(location, location_fullname, period="h", sheets=None):
     """
     Read groundwater level data from an Excel file and resample it to the specified period.
 
@@ -30,67 +17,38 @@ def read_gwlevel(location, location_fullname, period="h"):
     - location: Short code for the location (e.g., "GOU").
     - location_fullname: Full name of the location (e.g., "Gouda_MBORijnland").
     - period: Resampling period (default is "h" for hourly).
+    - sheets: Optional raw sheets of the workbook (see load_workbook_sheets).
 
     Returns:
     - DataFrame with resampled groundwater level data.
     """
 
-    if location == "HZW":
-        filename = location_fullname.removesuffix("-Dorp")
-    else:
-        filename = location_fullname
+    path_to_data = get_workbook_path(location)
 
-    match location:
-        case "GDA" | "BKW" | "BKG" | "CBW" | "HZW":
-            basedir = Path(
-                r"n:/Projects/11206000/11206020/B. Measurements and calculations"
-            )
-        case "M4T" | "MMW" | "MSW":
-            basedir = Path(
-                r"n:/Projects/11210000/11210175/B. Measurements and calculations"
-            )
-
-    path_to_data = basedir.joinpath("Extensometers", f"{filename}.xlsm")
-
-    outputdir = Path(
-        r"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim"
-    )
+    anchor_columns = ["B"]
 
-    anchor_columns = load_column_letters(location_fullname, column="B")
-
-    match location_fullname:
-        case (
-            "Gouda_MBORijnland"
-            | "Berkenwoude"
-            | "Bleskensgraaf"
-            | "Cabauw"
-            | "Hazerswoude-Dorp"
-            | "Moordrecht-Middelweg"
-            | "Moordrecht-4eTochtweg"
-            | "Moordrecht-Spoorweglaan"
-        ):
-            sheetname = "PB"
+    sheetname = "PB"
 
     ## load raw data from excel
     data = (
-        pd.read_excel(
+        read_sheet_resampled(
             path_to_data,
-            sheet_name=sheetname,
-            skiprows=[0, 1, 2, 3, 4, 6, 7, 8],
+            sheetname,
             usecols=[0] + [ord(letter) - 65 for letter in anchor_columns],
-            index_col=0,
+            period=period,
+            sheets=sheets,
         )
-        .resample(period)
-        .mean()
-    ) * 100
+        * 100
+    )
 
     data.columns = ["Waterstand"]
 
-    data.to_csv(outputdir.joinpath(location_fullname, f"{location}_gwlevel.csv"))
+    write_interim(data, get_interim_path(location, "gwlevel"))
 
     return data
 
 
+@traced()
 def read_gwlevel_rou09(filename_wareco, period="h", plot_type="RF"):
     """
     Read groundwater level data from an Excel file and resample it to the specified period.
@@ -148,7 +106,8 @@ def read_gwlevel_rou09(filename_wareco, period="h", plot_type="RF"):
     return gwstand_wareco
 
 
-def read_hydraulic_head(location, location_fullname, period="h"):
+@traced()
+def read_hydraulic_head(location, location_fullname, period="h", sheets=None):
     """
     Read groundwater level data from an Excel file and resample it to the specified period.
 
@@ -156,73 +115,39 @@ def read_hydraulic_head(location, location_fullname, period="h"):
     - location: Short code for the location (e.g., "GOU").
     - location_fullname: Full name of the location (e.g., "Gouda_MBORijnland").
     - period: Resampling period (default is "h" for hourly).
+    - sheets: Optional raw sheets of the workbook (see load_workbook_sheets).
 
     Returns:
     - DataFrame with resampled groundwater level data.
     """
 
-    if location == "HZW":
-        filename = location_fullname.removesuffix("-Dorp")
-    else:
-        filename = location_fullname
+    path_to_data = get_workbook_path(location)
 
-    match location:
-        case "GDA" | "BKW" | "BKG" | "CBW" | "HZW":
-            basedir = Path(
-                r"n:/Projects/11206000/11206020/B. Measurements and calculations"
-            )
-            column = "C"
-        case "MMW" | "M4T" | "MSW":
-            basedir = Path(
-                r"n:/Projects/11210000/11210175/B. Measurements and calculations"
-            )
-            if location in ["MMW", "MSW"]:
-                column = "E"
-            elif location == "M4T":
-                column = "D"
-
-    path_to_data = basedir.joinpath("Extensometers", f"{filename}.xlsm")
-
-    anchor_columns = load_column_letters(location_fullname, column=column)
-
-    match location_fullname:
-        case (
-            "Gouda_MBORijnland"
-            | "Berkenwoude"
-            | "Bleskensgraaf"
-            | "Cabauw"
-            | "Hazerswoude-Dorp"
-            | "Moordrecht-Middelweg"
-            | "Moordrecht-4eTochtweg"
-            | "Moordrecht-Spoorweglaan"
-        ):
-            sheetname = "PB"
+    anchor_columns = [get_site(location)["hydraulic_head_column"]]
+
+    sheetname = "PB"
 
     ## load raw data from excel
     data = (
-        pd.read_excel(
+        read_sheet_resampled(
             path_to_data,
-            sheet_name=sheetname,
-            skiprows=[0, 1, 2, 3, 4, 6, 7, 8],
+            sheetname,
             usecols=[0] + [ord(letter) - 65 for letter in anchor_columns],
-            index_col=0,
+            period=period,
+            sheets=sheets,
         )
-        .resample(period)
-        .mean()
-    ) * 100
+        * 100
+    )
 
     data.columns = ["Waterstand"]
 
-    outputdir = Path(
-        r"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim"
-    )
-
-    data.to_csv(outputdir.joinpath(location_fullname, f"{location}_hydraulic_head.csv"))
+    write_interim(data, get_interim_path(location, "hydraulic_head"))
 
     return data
 
 
-def read_ditch_level(location, location_fullname, period="h"):
+@traced()
+def read_ditch_level(location, location_fullname, period="h", sheets=None):
     """
     Read groundwater level data from an Excel file and resample it to the specified period.
 
@@ -230,71 +155,25 @@ def read_ditch_level(location, location_fullname, period="h"):
     - location: Short code for the location (e.g., "GOU").
     - location_fullname: Full name of the location (e.g., "Gouda_MBORijnland").
     - period: Resampling period (default is "h" for hourly).
+    - sheets: Optional raw sheets of the workbook (see load_workbook_sheets).
 
     Returns:
     - DataFrame with resampled groundwater level data.
     """
 
-    if location == "HZW":
-        filename = location_fullname.removesuffix("-Dorp")
-    else:
-        filename = location_fullname
+    path_to_data = get_workbook_path(location)
 
-    match location:
-        case "GDA" | "BKW" | "BKG" | "HZW":
-            basedir = Path(
-                r"n:/Projects/11206000/11206020/B. Measurements and calculations"
-            )
-            column = "J"
-            index_col = "F"
-            skiprows = [0, 1, 2, 3, 4, 6]
-
-        case "CBW":
-            basedir = Path(
-                r"n:/Projects/11206000/11206020/B. Measurements and calculations"
-            )
-            column = "N"
-            index_col = "J"
-            skiprows = [0, 1, 2, 3, 4, 6, 7]
-        case "MMW" | "M4T" | "MSW":
-            basedir = Path(
-                r"n:/Projects/11210000/11210175/B. Measurements and calculations"
-            )
-            if location == "MMW":
-                column = "L"
-                index_col = "H"
-                skiprows = [0, 1, 2, 3, 4, 6, 7]
-            elif location == "MSW":
-                column = "M"
-                index_col = "I"
-                skiprows = [0, 1, 2, 3, 4, 6, 7, 8]
-            elif location == "M4T":
-                column = "K"
-                index_col = "G"
-                skiprows = [0, 1, 2, 3, 4]
-
-    path_to_data = basedir.joinpath("Extensometers", f"{filename}.xlsm")
-
-    anchor_columns = load_column_letters(location_fullname, column=column)
-    index_column = load_column_letters(location_fullname, column=index_col)
-
-    match location_fullname:
-        case (
-            "Gouda_MBORijnland"
-            | "Berkenwoude"
-            | "Bleskensgraaf"
-            | "Cabauw"
-            | "Hazerswoude-Dorp"
-            | "Moordrecht-Middelweg"
-            | "Moordrecht-4eTochtweg"
-            | "Moordrecht-Spoorweglaan"
-        ):
-            sheetname = "PB"
+    index_col, column, skiprows = get_site(location)["ditch"]
+
+    anchor_columns = [column]
+    index_column = [index_col]
+
+    sheetname = "PB"
 
     ## load raw data from excel
-    data = pd.read_excel(
+    data = read_sheet(
         path_to_data,
-        sheet_name=sheetname,
+        sheetname,
         skiprows=skiprows,
         header=1,
         usecols=[ord(letter) - 65 for letter in index_column]
@@ -302,6 +181,7 @@ def read_ditch_level(location, location_fullname, period="h"):
         # index_col=[ord(letter) - 65 for letter in index_column],
         # usecols=[5, 9],
         # index_col=[5]
+        sheets=sheets,
     )
     # .resample(period)
     # .mean()
@@ -322,16 +202,13 @@ def read_ditch_level(location, location_fullname, period="h"):
         case "M4T":
             data.loc[:"2024-10-23 13:00"] = np.nan
 
-    outputdir = Path(
-        r"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim"
-    )
-
-    data.to_csv(outputdir.joinpath(location_fullname, f"{location}_ditch_level.csv"))
+    write_interim(data, get_interim_path(location, "ditch_level"))
 
     return data
 
 
-def read_pb(location, location_fullname, period="h", columns=["B"]):
+@traced()
+def read_pb(location, location_fullname, period="h", columns=["B"], sheets=None):
     """
     Read groundwater level data from an Excel file and resample it to the specified period.
 
@@ -339,63 +216,33 @@ def read_pb(location, location_fullname, period="h", columns=["B"]):
     - location: Short code for the location (e.g., "GOU").
     - location_fullname: Full name of the location (e.g., "Gouda_MBORijnland").
     - period: Resampling period (default is "h" for hourly).
+    - sheets: Optional raw sheets of the workbook (see load_workbook_sheets).
 
     Returns:
     - DataFrame with resampled groundwater level data.
     """
 
-    if location == "HZW":
-        filename = location_fullname.removesuffix("-Dorp")
-    else:
-        filename = location_fullname
-
-    match location:
-        case "GDA" | "BKW" | "BKG" | "CBW" | "HZW":
-            basedir = Path(
-                r"n:/Projects/11206000/11206020/B. Measurements and calculations"
-            )
-        case "M4T" | "MMW" | "MSW":
-            basedir = Path(
-                r"n:/Projects/11210000/11210175/B. Measurements and calculations"
-            )
-
-    path_to_data = basedir.joinpath("Extensometers", f"{filename}.xlsm")
-
-    outputdir = Path(
-        r"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim"
-    )
+    path_to_data = get_workbook_path(location)
 
     # anchor_columns = load_column_letters(location_fullname, column=column)
 
-    match location_fullname:
-        case (
-            "Gouda_MBORijnland"
-            | "Berkenwoude"
-            | "Bleskensgraaf"
-            | "Cabauw"
-            | "Hazerswoude-Dorp"
-            | "Moordrecht-Middelweg"
-            | "Moordrecht-4eTochtweg"
-            | "Moordrecht-Spoorweglaan"
-        ):
-            sheetname = "PB"
+    sheetname = "PB"
 
     ## load raw data from excel
     data = (
-        pd.read_excel(
+        read_sheet_resampled(
             path_to_data,
-            sheet_name=sheetname,
-            skiprows=[0, 1, 2, 3, 4, 6, 7, 8],
+            sheetname,
             usecols=[0] + [ord(letter) - 65 for letter in columns],
-            index_col=0,
+            period=period,
+            sheets=sheets,
         )
-        .resample(period)
-        .mean()
-    ) * 100
+        * 100
+    )
 
     data.columns = [f"Waterstand PB{nr+1}" for nr in range(len(columns))]
 
-    data.to_csv(outputdir.joinpath(location_fullname, f"{location}_gwlevels.csv"))
+    write_interim(data, get_interim_path(location, "gwlevels"))
 
     return data
 
@@ -490,16 +337,13 @@ if __name__ == "__main__":
     # locations = ["BKG", "BKW", "CBW", "HZW", "GDA"]
     # locations = ["BKW"]
     locations = ["M4T", "MMW", "MSW"]
-    columns = [["B", "C", "D"], ["B", "C", "D", "E"], ["B", "C", "D", "E"]]
     # locations = ["BKW"]
     # locations = ["ROU09"]  # For testing Rouveen parcels
     # plot_types = ["RF", "MS"]
     period = "h"
     # location_fullname = "Gouda_MBORijnland"
 
-    outputdir = Path(
-        r"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim"
-    )
+    outputdir = INTERIM_DIR
 
     for i, location in enumerate(locations):
 
@@ -545,6 +389,6 @@ if __name__ == "__main__":
             #     location, location_fullname, period
             # )
             # ditch_level_data = read_ditch_level(location, location_fullname, period)
-            pb_data = read_pb(location, location_fullname, columns=columns[i])
+            pb_data = read_pb(location, location_fullname, columns=PB_COLUMNS[location])
 
     # print(gwlevel_data.head())
@@ -0,0 +1,149 @@
+from functools import partial
+import time
+
+import pandas as pd
+
+from nl2120_soilmm.constants import LOCATION_FULLNAMES, PB_COLUMNS
+from nl2120_soilmm.preprocessing.extensometers import (
+    get_extensometer_sheetname,
+    update_extensometer_data_location,
+)
+from nl2120_soilmm.preprocessing.filter_depths import write_filter_depths
+from nl2120_soilmm.preprocessing.gwlevel import (
+    read_ditch_level,
+    read_gwlevel,
+    read_hydraulic_head,
+    read_pb,
+)
+from nl2120_soilmm.preprocessing.surface_levels import write_surface_level
+from nl2120_soilmm.preprocessing.workbook import (
+    close_workbook_sheets,
+    get_path_to_workbook,
+    load_workbook_sheets,
+)
+from nl2120_soilmm.sites import get_site
+from nl2120_soilmm.tracing import traced
+
+
+@traced()
+def ingest_workbook(location, plot_type="RF", period="h", stream=False):
+    """
+    Open the logger workbook of a location once and write all interim outputs
+    that are derived from it: extensometer data, surface level and, where
+    available, groundwater levels, hydraulic head, ditch level and filter depths.
+
+    Parameters:
+    - location: Short code for the location (e.g., "MMW").
+    - plot_type: Plot type of the location (default is "RF").
+    - period: Resampling period (default is "h" for hourly).
+    - stream: Only load the "cal" sheet in memory and read the logger sheets
+      row by row from the open workbook in each step. This is slower, as the
+      "PB" sheet is read once per step, but the memory use does not grow with
+      the size of the sheets.
+
+    Returns:
+    - Series with the time (s) spent per step.
+    """
+
+    location_fullname = LOCATION_FULLNAMES[location]
+    path_to_data = get_path_to_workbook(location, location_fullname, plot_type)
+
+    sheetnames = [get_extensometer_sheetname(location), "cal"]
+
+    steps = {
+        "extensometer": partial(
+            update_extensometer_data_location,
+            location,
+            period=period,
+            plot_type=plot_type,
+        ),
+        "surface level": partial(
+            write_surface_level, location, location_fullname, plot_type=plot_type
+        ),
+    }
+
+    match get_site(location)["series"]:
+        case "regiodeal":
+            sheetnames.append("PB")
+            steps["groundwater level"] = partial(
+                read_gwlevel, location, location_fullname, period=period
+            )
+            steps["hydraulic head"] = partial(
+                read_hydraulic_head, location, location_fullname, period=period
+            )
+            steps["ditch level"] = partial(
+                read_ditch_level, location, location_fullname, period=period
+            )
+        case "moordrecht":
+            sheetnames.append("PB")
+            steps["groundwater levels"] = partial(
+                read_pb,
+                location,
+                location_fullname,
+                period=period,
+                columns=PB_COLUMNS[location],
+            )
+            steps["hydraulic head"] = partial(
+                read_hydraulic_head, location, location_fullname, period=period
+            )
+            steps["ditch level"] = partial(
+                read_ditch_level, location, location_fullname, period=period
+            )
+            steps["filter depths"] = partial(
+                write_filter_depths,
+                location,
+                location_fullname,
+                columns=PB_COLUMNS[location],
+            )
+
+    timings = {}
+
+    stream = (
+        [sheetname for sheetname in sheetnames if sheetname != "cal"] if stream else []
+    )
+
+    start = time.perf_counter()
+    sheets = load_workbook_sheets(path_to_data, sheetnames, stream=stream)
+    timings["load workbook"] = time.perf_counter() - start
+
+    try:
+        for step, update in steps.items():
+            start = time.perf_counter()
+            update(sheets=sheets)
+            timings[step] = time.perf_counter() - start
+    finally:
+        close_workbook_sheets(sheets)
+
+    timings = pd.Series(timings, name=location)
+    timings["total"] = timings.sum()
+
+    return timings
+
+
+def ingest_workbooks(locations, plot_type="RF", period="h", stream=False):
+    """
+    Ingest the logger workbooks of several locations.
+
+    Returns:
+    - DataFrame with the time (s) spent per step for each workbook.
+    """
+
+    timings = []
+
+    for location in locations:
+        print(f"Ingesting the workbook of {LOCATION_FULLNAMES[location]}")
+
+        timings.append(
+            ingest_workbook(location, plot_type=plot_type, period=period, stream=stream)
+        )
+
+    return pd.DataFrame(timings)
+
+
+if __name__ == "__main__":
+
+    locations = ["M4T", "MMW", "MSW"]
+
+    timings = ingest_workbooks(locations)
+
+    print(timings.round(1))
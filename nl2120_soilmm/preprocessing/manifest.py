@@ -0,0 +1,120 @@
+from pathlib import Path
+import hashlib
+import json
+
+from nl2120_soilmm.interim import INTERIM_DIR
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def get_manifest_path(outputdir=INTERIM_DIR):
+    return Path(outputdir).joinpath(MANIFEST_FILENAME)
+
+
+def load_manifest(outputdir=INTERIM_DIR):
+    """
+    Load the manifest with the sources of the interim outputs. An empty
+    manifest is returned when the file does not exist yet.
+    """
+    path_to_manifest = get_manifest_path(outputdir)
+
+    if not path_to_manifest.exists():
+        return {}
+
+    with open(path_to_manifest, encoding="UTF8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, outputdir=INTERIM_DIR):
+    path_to_manifest = get_manifest_path(outputdir)
+
+    # write to a temporary file first, so an interrupted run keeps the old manifest
+    path_to_tmp = path_to_manifest.with_suffix(".tmp")
+    with open(path_to_tmp, "w", encoding="UTF8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    path_to_tmp.replace(path_to_manifest)
+
+
+def hash_file(path, chunk_size=2**20):
+    """Sha256 hash of the content of a file."""
+    sha256 = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+def describe_source(path_to_source, previous=None):
+    """
+    Size, modification time and content hash of a source file. The hash of the
+    previous entry is reused when size and modification time did not change.
+    """
+    stat = Path(path_to_source).stat()
+
+    source = {
+        "path": str(path_to_source),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+    }
+
+    if (
+        previous is not None
+        and previous.get("path") == source["path"]
+        and previous.get("size") == source["size"]
+        and previous.get("mtime") == source["mtime"]
+    ):
+        source["sha256"] = previous["sha256"]
+    else:
+        source["sha256"] = hash_file(path_to_source)
+
+    return source
+
+
+def check_entry(manifest, key, path_to_source, parameters, outputs, force=False):
+    """
+    Check if an interim output is stale.
+
+    Parameters:
+    - manifest: Manifest as returned by load_manifest.
+    - key: Key of the output in the manifest (e.g., "ZEG extensometer RF").
+    - path_to_source: Path to the raw source file.
+    - parameters: Dictionary with the parameters used to build the output.
+    - outputs: Paths of the files that are written for this entry.
+    - force: Always rebuild.
+
+    Returns:
+    - Tuple with the reason to rebuild (None if the output is up to date) and
+      the new manifest entry.
+    """
+
+    previous = manifest.get(key)
+
+    if previous is None:
+        source = describe_source(path_to_source)
+        reason = "not in manifest"
+    else:
+        source = describe_source(path_to_source, previous=previous["source"])
+
+        if force:
+            reason = "forced"
+        elif previous["source"]["path"] != source["path"]:
+            reason = "source moved"
+        elif previous["source"]["sha256"] != source["sha256"]:
+            reason = "source changed"
+        elif previous["parameters"] != parameters:
+            reason = "parameters changed"
+        elif not all(Path(output).exists() for output in outputs):
+            reason = "output missing"
+        else:
+            reason = None
+
+    entry = {
+        "source": source,
+        "parameters": parameters,
+        "outputs": [str(output) for output in outputs],
+    }
+
+    return reason, entry
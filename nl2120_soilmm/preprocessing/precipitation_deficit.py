@@ -1,7 +1,9 @@
-from pathlib import Path
 from openpyxl import load_workbook
 import pandas as pd
 
+from nl2120_soilmm.interim import write_interim
+from nl2120_soilmm.sites import data_path, get_interim_dir
+
 
 def get_sheetnames_xlsx(filepath):
     wb = load_workbook(filepath, read_only=True, keep_links=False)
@@ -9,7 +11,7 @@ def get_sheetnames_xlsx(filepath):
 
 
 def write_precipitation_deficit(location, location_fullname):
-    basedir = Path(
+    basedir = data_path(
         "n:/Projects/11204000/11204108/B. Measurements and calculations/Meetlocaties/Info_per_locatie/Zegveld/zeg_pt"
     )
 
@@ -41,12 +43,9 @@ def write_precipitation_deficit(location, location_fullname):
     # convert the dataframe to a series by selecting the first column
     data = data.iloc[:, 0]
 
-    outputdir = Path(
-        r"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim"
-    )
-
-    data.to_csv(
-        outputdir.joinpath(location_fullname, f"{location}_precipitation_deficit.csv"),
+    write_interim(
+        data,
+        get_interim_dir(location).joinpath(f"{location}_precipitation_deficit.csv"),
     )
 
 
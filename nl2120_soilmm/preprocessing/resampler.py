@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+
+STATISTICS = ["count", "sum", "min", "max"]
+
+# how the statistics of two parts of the same period are combined
+COMBINE = {"count": "sum", "sum": "sum", "min": "min", "max": "max"}
+
+
+def create_resampler(columns, period="h", drop_duplicates=False, lateness="0s"):
+    """
+    Create a resampler that aggregates logger rows per period while they are
+    read, keeping only the count, sum, minimum and maximum of the periods that
+    are not finished yet.
+
+    Parameters:
+    - columns: Names of the value columns.
+    - period: Resampling period, a fixed frequency that divides a day (e.g.,
+      "h", "15min") or "D". The periods start at midnight, like resample().
+    - drop_duplicates: Only use the first row of a timestamp that occurs more
+      than once, like data[~data.index.duplicated(keep="first")]. The
+      timestamps are remembered until a period plus lateness before the
+      finished periods, so the memory use does not grow with the sheet. A
+      duplicate that arrives later than that is used as a late row.
+    - lateness: How long a period is kept open after a row of a later period
+      was read, for rows that are not in order.
+
+    Returns:
+    - Dictionary with the state of the resampler (see update_resampler).
+    """
+
+    return {
+        "columns": list(columns),
+        "period": pd.tseries.frequencies.to_offset(period),
+        "drop_duplicates": drop_duplicates,
+        "lateness": pd.Timedelta(lateness),
+        "open": empty_bins(columns),
+        "seen": pd.DatetimeIndex([]),
+        "newest": None,
+        "finished until": None,
+        "late rows": 0,
+    }
+
+
+def empty_bins(columns):
+    return pd.DataFrame(
+        columns=pd.MultiIndex.from_product([STATISTICS, list(columns)]),
+        index=pd.DatetimeIndex([]),
+        dtype="float64",
+    )
+
+
+def aggregate(data, labels):
+    """Count, sum, minimum and maximum of each column per period."""
+    grouped = data.groupby(labels)
+
+    return pd.concat(
+        {
+            "count": grouped.count().astype("float64"),
+            "sum": grouped.sum(),
+            "min": grouped.min(),
+            "max": grouped.max(),
+        },
+        axis=1,
+    )
+
+
+def merge_bins(bins):
+    """
+    Combine the statistics of periods that occur more than once, e.g. when
+    rows of a finished period arrived late.
+    """
+    if not bins.index.has_duplicates:
+        return bins.sort_index()
+
+    return pd.concat(
+        {
+            statistic: bins[statistic].groupby(level=0).agg(COMBINE[statistic])
+            for statistic in STATISTICS
+        },
+        axis=1,
+    )
+
+
+def update_resampler(resampler, data):
+    """
+    Add rows to a resampler.
+
+    Parameters:
+    - resampler: Resampler (see create_resampler).
+    - data: DataFrame with a DatetimeIndex and the value columns.
+
+    Returns:
+    - DataFrame with the statistics of the periods that are finished, with the
+      statistic and the column name as column levels. Rows of periods that
+      were already finished are returned as an extra part of the period, use
+      merge_bins to combine them.
+    """
+
+    data = data[data.index.notna()].astype("float64")
+
+    if data.empty:
+        return empty_bins(resampler["columns"])
+
+    if resampler["drop_duplicates"]:
+        data = data[
+            ~data.index.duplicated(keep="first") & ~data.index.isin(resampler["seen"])
+        ]
+
+    labels = data.index.floor(resampler["period"])
+
+    finished_until = resampler["finished until"]
+    late = (
+        labels < finished_until
+        if finished_until is not None
+        else np.zeros(len(data), dtype=bool)
+    )
+    resampler["late rows"] += int(late.sum())
+
+    bins = [aggregate(data[late], labels[late])]
+
+    resampler["open"] = merge_bins(
+        pd.concat([resampler["open"], aggregate(data[~late], labels[~late])])
+    )
+
+    if resampler["drop_duplicates"]:
+        resampler["seen"] = resampler["seen"].append(data.index)
+
+    newest = data.index.max()
+    if resampler["newest"] is None or newest > resampler["newest"]:
+        resampler["newest"] = newest
+
+    # a period is finished when a row at least lateness after its end was read
+    ends = resampler["open"].index + resampler["period"]
+    finished = ends <= resampler["newest"] - resampler["lateness"]
+
+    if finished.any():
+        bins.append(resampler["open"][finished])
+        resampler["open"] = resampler["open"][~finished]
+        resampler["finished until"] = ends[finished].max()
+
+    # the timestamps of the last finished period and the lateness before it
+    # are kept, for duplicates of rows that were already used
+    if resampler["drop_duplicates"] and resampler["finished until"] is not None:
+        horizon = (
+            resampler["finished until"] - resampler["period"] - resampler["lateness"]
+        )
+        resampler["seen"] = resampler["seen"][resampler["seen"] >= horizon]
+
+    return pd.concat(bins)
+
+
+def finish_resampler(resampler):
+    """Statistics of the periods that are still open, at the end of the data."""
+    bins = resampler["open"]
+
+    resampler["open"] = empty_bins(resampler["columns"])
+    resampler["seen"] = pd.DatetimeIndex([])
+
+    if len(bins):
+        resampler["finished until"] = bins.index.max() + resampler["period"]
+
+    return bins
+
+
+def get_means(bins, period="h"):
+    """
+    Mean of each column per period, like resample(period).mean(). Periods
+    without rows between the first and the last period are NaN.
+    """
+
+    bins = merge_bins(bins)
+
+    means = bins["sum"] / bins["count"].where(bins["count"] > 0)
+
+    if means.empty:
+        return means
+
+    return means.asfreq(period)
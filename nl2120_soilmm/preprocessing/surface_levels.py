@@ -1,121 +1,21 @@
-from pathlib import Path
-import openpyxl
 import csv
 
+from nl2120_soilmm.preprocessing.workbook import get_path_to_workbook, read_cell
+from nl2120_soilmm.sites import get_interim_path, get_site, select_plot_type
+from nl2120_soilmm.tracing import traced
 
-def write_surface_level(location, location_fullname, plot_type="RF"):
-
-    if location == "HZW":
-        filename = location_fullname.removesuffix("-Dorp")
-    else:
-        filename = location_fullname
-
-    match location:
-        case "ROU":
-            basedir = Path(
-                r"n:/Projects/11202000/11202008/B. Measurements and calculations/Extensometers"
-            )
-            if plot_type == "MS":
-                path_to_data = basedir.joinpath("WDOD-05A-drain.xlsm")
-            else:
-                path_to_data = basedir.joinpath("WDOD-05B-ref.xlsm")
-        case "ROU09":
-            basedir = Path(
-                r"n:/Projects/11202000/11202008/B. Measurements and calculations/Extensometers"
-            )
-            if plot_type == "MS":
-                path_to_data = basedir.joinpath("WDOD-09A-drain.xlsm")
-            else:
-                path_to_data = basedir.joinpath("WDOD-09B-ref.xlsm")
-        case "ALB" | "ASD" | "VLI" | "ZEG":
-            basedir = Path(
-                r"n:/Projects/11204000/11204108/B. Measurements and calculations/Extensometers/"
-            )
-            path_to_data = basedir.joinpath(f"{location}_{plot_type}.xlsm")
-        case "DEM" | "LW" | "VEG" | "ZH":
-            basedir = Path(
-                "n:/Projects/11206000/11206457/B. Measurements and calculations"
-            )
-            path_to_data = basedir.joinpath(
-                location_fullname, "Extensometer", f"{filename}.xlsm"
-            )
-        case "GDA" | "BKW" | "BKG" | "CBW" | "HZW":
-            basedir = Path(
-                r"n:/Projects/11206000/11206020/B. Measurements and calculations"
-            )
-            path_to_data = basedir.joinpath("Extensometers", f"{filename}.xlsm")
-        case "MMW" | "M4T" | "MSW":
-            basedir = Path(
-                r"n:/Projects/11210000/11210175/B. Measurements and calculations"
-            )
-            path_to_data = basedir.joinpath("Extensometers", f"{filename}.xlsm")
-        case "HGM" | "HGG" | "HGR":
-            basedir = Path(
-                r"n:/Projects/11210000/11210448/B. Measurements and calculations"
-            )
-            path_to_data = basedir.joinpath("Extensometers", f"{filename}.xlsm")
-
-    if location == "ZEG":
-        if plot_type == "MS":
-            path_to_data = basedir.joinpath(f"{location}_003_perceel 16-drain.xlsm")
-
-    match location:
-        case "ROU":
-            if plot_type == "MS":
-                column_row = "C96"
-            else:
-                column_row = "C56"
-        case "ROU09":
-            column_row = "C56"
-        case "ALB" | "ASD" | "VLI" | "ZEG" | "LW" | "VEG" | "ZH":
-            column_row = "C21"
-        case "DEM":
-            column_row = "C27"
-        case "GDA" | "BKW" | "BKG" | "CBW" | "HZW":
-            column_row = "B23"
-        case "M4T" | "MSW":
-            column_row = "C108"
-        case "MMW":
-            column_row = "C109"
-        case "HGM" | "HGG" | "HGR":
-            column_row = "C27"
-
-    outputdir = Path(
-        r"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim"
-    )
-
-    wb = openpyxl.load_workbook(path_to_data, read_only=True)
-    print("Workbook loaded")
-    sheet = wb["cal"]  # .active
-
-    surface_level = sheet[column_row].value
-
-    match location:
-        case (
-            "DEM"
-            | "LW"
-            | "VEG"
-            | "ZH"
-            | "GDA"
-            | "BKW"
-            | "BKG"
-            | "CBW"
-            | "HZW"
-            | "MMW"
-            | "M4T"
-            | "MSW"
-            | "HGM"
-            | "HGG"
-            | "HGR"
-        ):
-            plot_type = ""
-        case _:
-            plot_type = "_" + plot_type
+
+@traced()
+def write_surface_level(location, location_fullname, plot_type="RF", sheets=None):
+
+    path_to_data = get_path_to_workbook(location, location_fullname, plot_type)
+
+    column_row = select_plot_type(get_site(location)["surface_level_cell"], plot_type)
+
+    surface_level = read_cell(path_to_data, "cal", column_row, sheets=sheets)
 
     with open(
-        outputdir.joinpath(
-            location_fullname, f"{location}_surface_level{plot_type}.csv"
-        ),
+        get_interim_path(location, "surface_level", plot_type),
         "w+",
         encoding="UTF8",
     ) as f:
@@ -0,0 +1,366 @@
+from datetime import datetime
+from itertools import islice
+import time
+
+import numpy as np
+import openpyxl
+from openpyxl.utils.cell import column_index_from_string, coordinate_from_string
+import pandas as pd
+
+from nl2120_soilmm.preprocessing.resampler import (
+    create_resampler,
+    finish_resampler,
+    get_means,
+    update_resampler,
+)
+from nl2120_soilmm.sites import get_workbook_path
+from nl2120_soilmm.tracing import record_file, span, traced
+
+# number of rows that resample_rows reads before aggregating them
+CHUNKSIZE = 10_000
+
+
+def get_path_to_workbook(location, location_fullname=None, plot_type="RF"):
+    """Path to the logger workbook (.xlsm) of a location."""
+    return get_workbook_path(location, plot_type)
+
+
+def read_raw_sheet(sheet):
+    """DataFrame with the values of a worksheet, empty cells are NaN."""
+    raw = pd.DataFrame(list(sheet.iter_rows(values_only=True)))
+
+    return raw.where(raw.notna(), np.nan)
+
+
+@traced(tags=("sheetnames",))
+def load_workbook_sheets(path_to_data, sheetnames, stream=()):
+    """
+    Open a logger workbook once and read the raw values of the requested sheets.
+    Sheets that are not in the workbook are skipped.
+
+    Parameters:
+    - path_to_data: Path to the .xlsm workbook.
+    - sheetnames: Names of the sheets to read (e.g., ["Ext", "PB", "cal"]).
+    - stream: Names of sheets that are not loaded in memory, but read row by
+      row from the open workbook when they are used (see iter_sheet_rows).
+      The workbook then stays open until close_workbook_sheets is called.
+
+    Returns:
+    - Dictionary with a DataFrame per sheet. The DataFrame has the same row and
+      column positions as the sheet, empty cells are NaN. Streamed sheets are
+      read-only worksheets of openpyxl.
+    """
+
+    start = time.perf_counter()
+
+    record_file(path_to_data)
+
+    wb = openpyxl.load_workbook(
+        path_to_data, read_only=True, data_only=True, keep_links=False
+    )
+
+    sheets = {}
+
+    for sheetname in sheetnames:
+        if sheetname not in wb.sheetnames:
+            continue
+
+        sheet = wb[sheetname]
+        sheet.reset_dimensions()
+
+        if sheetname in stream:
+            sheets[sheetname] = sheet
+        else:
+            sheets[sheetname] = read_raw_sheet(sheet)
+
+    if not any(sheetname in sheets for sheetname in stream):
+        wb.close()
+
+    print(
+        f"Loaded sheets {list(sheets)} of {path_to_data.name} "
+        f"in {time.perf_counter() - start:.1f} s"
+    )
+
+    return sheets
+
+
+def close_workbook_sheets(sheets):
+    """Close the workbook of streamed sheets (see load_workbook_sheets)."""
+    for sheet in sheets.values():
+        if not isinstance(sheet, pd.DataFrame):
+            sheet.parent.close()
+
+
+@traced(tags=("sheetname",))
+def read_sheet(
+    path_to_data,
+    sheetname,
+    header=0,
+    skiprows=None,
+    usecols=None,
+    index_col=None,
+    sheets=None,
+):
+    """
+    Read a table from a sheet like pd.read_excel does. When the raw sheets are
+    passed (see load_workbook_sheets) the table is taken from those, so the
+    workbook is not opened again. A streamed sheet is loaded from the open
+    workbook.
+    """
+
+    sheet = None if sheets is None else sheets.get(sheetname)
+
+    if sheet is None:
+        record_file(path_to_data)
+
+        return pd.read_excel(
+            path_to_data,
+            sheet_name=sheetname,
+            header=header,
+            skiprows=skiprows,
+            usecols=usecols,
+            index_col=index_col,
+        )
+
+    raw = sheet if isinstance(sheet, pd.DataFrame) else read_raw_sheet(sheet)
+
+    # trailing empty rows are not part of the table
+    raw = raw.loc[: raw.last_valid_index()]
+
+    table = raw.drop(index=skiprows or [], errors="ignore")
+
+    if usecols is not None:
+        table = table.reindex(columns=sorted(usecols))
+
+    column_names = [
+        name if pd.notna(name) else f"Unnamed: {position}"
+        for position, name in table.iloc[header].items()
+    ]
+
+    data = table.iloc[header + 1 :].copy()
+    data.columns = column_names
+    data = data.infer_objects().reset_index(drop=True)
+
+    if index_col is not None:
+        data = data.set_index(column_names[index_col])
+
+        if pd.isna(table.iloc[header].iloc[index_col]):
+            data.index.name = None
+
+    return data
+
+
+def iter_sheet_rows(path_to_data, sheetname, min_row, usecols, sheets=None):
+    """
+    Yield the values of some columns of a sheet row by row, without loading
+    the sheet in memory. When the raw sheets are passed (see
+    load_workbook_sheets) and include the sheet, the rows are taken from those,
+    or from the open workbook for a streamed sheet.
+
+    Parameters:
+    - path_to_data: Path to the .xlsm workbook.
+    - sheetname: Name of the sheet.
+    - min_row: Number of the first row (1 based, like in Excel).
+    - usecols: Positions of the columns (0 based).
+
+    Returns:
+    - Generator of tuples with the values of the columns.
+    """
+
+    sheet = None if sheets is None else sheets.get(sheetname)
+
+    if isinstance(sheet, pd.DataFrame):
+        raw = sheet.loc[: sheet.last_valid_index()].reindex(columns=usecols)
+
+        yield from raw.iloc[min_row - 1 :].itertuples(index=False, name=None)
+
+        return
+
+    if sheet is not None:
+        yield from iter_worksheet_rows(sheet, min_row, usecols)
+
+        return
+
+    record_file(path_to_data)
+
+    wb = openpyxl.load_workbook(
+        path_to_data, read_only=True, data_only=True, keep_links=False
+    )
+
+    try:
+        sheet = wb[sheetname]
+        sheet.reset_dimensions()
+
+        yield from iter_worksheet_rows(sheet, min_row, usecols)
+    finally:
+        wb.close()
+
+
+def iter_worksheet_rows(sheet, min_row, usecols):
+    for row in sheet.iter_rows(
+        min_row=min_row, max_col=max(usecols) + 1, values_only=True
+    ):
+        yield tuple(row[col] if col < len(row) else None for col in usecols)
+
+
+def parse_rows(rows, columns):
+    """DataFrame with a DatetimeIndex and float values from rows of a sheet."""
+    data = pd.DataFrame.from_records(rows, columns=["time"] + list(columns))
+    data["time"] = pd.to_datetime(data["time"], errors="coerce")
+    data = data.dropna(subset="time").set_index("time")
+
+    return data.apply(pd.to_numeric, errors="coerce").astype("float64")
+
+
+def skip_rows_before(rows, since):
+    """
+    Skip the rows of a sheet with a timestamp before since, before they are
+    parsed. Timestamps that are not dates in the sheet (e.g., text) are kept
+    and filtered after parsing.
+    """
+
+    for row in rows:
+        if isinstance(row[0], datetime) and row[0] < since:
+            continue
+
+        yield row
+
+
+def resample_rows(rows, columns, period="h", since=None, drop_duplicates=False):
+    """
+    Average rows of a logger sheet per period, like resample(period).mean(),
+    while reading them (see resampler.py). Only the statistics of the periods
+    are kept, so the memory use depends on the length of the output and not
+    of the sheet.
+
+    Parameters:
+    - rows: Iterable of tuples with a timestamp and the values of the columns.
+    - columns: Names of the value columns.
+    - period: Resampling period (default is "h" for hourly).
+    - since: Optional timestamp, earlier rows are skipped.
+    - drop_duplicates: Only use the first row of a timestamp that occurs
+      more than once.
+
+    Returns:
+    - DataFrame with the mean of each column per period.
+    """
+
+    resampler = create_resampler(columns, period, drop_duplicates=drop_duplicates)
+    bins = []
+
+    if since is not None:
+        since = pd.Timestamp(since)
+        rows = skip_rows_before(rows, since)
+
+    def update(chunk):
+        # the rows are parsed from the workbook while they are read, this span
+        # only covers the resampling
+        with span("preprocessing.workbook.resample_chunk"):
+            data = parse_rows(chunk, columns)
+
+            if since is not None:
+                data = data[data.index >= since]
+
+            bins.append(update_resampler(resampler, data))
+
+    chunk = []
+
+    for row in rows:
+        chunk.append(row)
+
+        if len(chunk) == CHUNKSIZE:
+            update(chunk)
+            chunk = []
+
+    update(chunk)
+    bins.append(finish_resampler(resampler))
+
+    return get_means(pd.concat(bins), period)
+
+
+@traced(tags=("sheetname",))
+def read_sheet_resampled(
+    path_to_data,
+    sheetname,
+    usecols,
+    period="h",
+    header_row=6,
+    min_row=10,
+    since=None,
+    drop_duplicates=False,
+    sheets=None,
+):
+    """
+    Read a time series from a logger sheet and average it per period, without
+    loading the sheet in memory (see iter_sheet_rows and resample_rows).
+
+    Parameters:
+    - path_to_data: Path to the .xlsm workbook.
+    - sheetname: Name of the sheet.
+    - usecols: Positions of the columns (0 based), the first one holds the time.
+    - period: Resampling period (default is "h" for hourly).
+    - header_row: Number of the row with the column names (1 based).
+    - min_row: Number of the first row with data (1 based).
+    - since: Optional timestamp, earlier rows are skipped.
+    - drop_duplicates: Only use the first row of a duplicated timestamp.
+    - sheets: Optional raw sheets of the workbook (see load_workbook_sheets).
+
+    Returns:
+    - DataFrame with the mean of each column per period. The index and columns
+      are named after the header row.
+    """
+
+    # the header and the data are read in one pass over the sheet
+    rows = iter_sheet_rows(path_to_data, sheetname, header_row, usecols, sheets=sheets)
+
+    header = next(rows)
+    names = [
+        name if pd.notna(name) else f"Unnamed: {position}"
+        for position, name in zip(usecols, header)
+    ]
+
+    data = resample_rows(
+        islice(rows, min_row - header_row - 1, None),
+        names[1:],
+        period=period,
+        since=since,
+        drop_duplicates=drop_duplicates,
+    )
+    data.index.name = header[0] if pd.notna(header[0]) else None
+
+    return data
+
+
+@traced(tags=("sheetname", "cell"))
+def read_cell(path_to_data, sheetname, cell, sheets=None, data_only=True):
+    """
+    Read the value of a single cell (e.g., "C21"). When the raw sheets are
+    passed (see load_workbook_sheets) the value is taken from those. Like
+    load_workbook_sheets, the value Excel calculated is returned for a cell
+    with a formula; with data_only=False the formula is returned, which is
+    read from the workbook itself.
+    """
+
+    sheet = None if sheets is None else sheets.get(sheetname)
+
+    if sheet is None or not data_only:
+        record_file(path_to_data)
+
+        wb = openpyxl.load_workbook(path_to_data, read_only=True, data_only=data_only)
+        value = wb[sheetname][cell].value
+        wb.close()
+
+        return value
+
+    if not isinstance(sheet, pd.DataFrame):
+        return sheet[cell].value
+
+    column, row = coordinate_from_string(cell)
+    column = column_index_from_string(column)
+
+    try:
+        value = sheet.iloc[row - 1, column - 1]
+    except IndexError:
+        return None
+
+    return None if pd.isna(value) else value
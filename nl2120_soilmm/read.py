@@ -14,6 +14,25 @@ from nl2120_soilmm.constants import (
     DITCHES,
     SELECTED_GROUNDWATER_WELLS,
 )
+from nl2120_soilmm.interim import (
+    INTERIM_DIR,
+    has_grid,
+    read_grid,
+    read_interim,
+    write_grid,
+)
+from nl2120_soilmm.sites import (
+    LITHOLOGY_DIR,
+    data_path,
+    get_groundwater_dir,
+    get_interim_dir,
+    get_interim_path,
+    get_site,
+    get_soilprofile_source,
+)
+from nl2120_soilmm.cache import cached_reader, copy_result, get_mtime
+from nl2120_soilmm.filecache import cached_path
+from nl2120_soilmm.tracing import traced
 
 
 def get_sheetnames_xlsx(filepath):
@@ -21,37 +40,24 @@ def get_sheetnames_xlsx(filepath):
     return wb.sheetnames
 
 
-def read_hydraulic_head(location, plot_type="RF"):
+@traced()
+def read_hydraulic_head(location, plot_type="RF", start=None, end=None):
     """
     Reads hydraulic head data for a given location and plot type.
     Functionality to select the plot type still needs to be implemented.
+    Only the rows between start and end are read when these are given.
     """
 
     hydraulic_head = HYDRAULIC_HEADS[location]
-    location_fullname = LOCATION_FULLNAMES[location]
 
-    match location:
-        case "LW":
-            foldername = "LAW"
-        case "ZH":
-            foldername = "ZEG31"
-        case _:
-            foldername = location
-
-    match location:
-        case "GDA" | "BKW" | "BKG" | "CBW" | "HZW" | "MMW" | "M4T" | "MSW":
-            basedir = Path(
-                rf"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim/{location_fullname}"
-            )
-        case _:
-            # groundwater data
-            basedir = Path(
-                f"p:/broeikasgassen-veenweiden/Grondwater/grondwaterstandanalyse/data/4-output/Gecorrigeerde_grondwaterstanden_hourly/gecorrigeerd/{foldername}"
-            )
+    basedir = get_groundwater_dir(location)
 
     if hydraulic_head:
-        data = pd.read_csv(
-            basedir.joinpath(f"{hydraulic_head}.csv"), index_col=0, parse_dates=True
+        data = read_interim(
+            basedir.joinpath(f"{hydraulic_head}.csv"),
+            columns=["Waterstand"],
+            start=start,
+            end=end,
         )["Waterstand"]
 
         return data
@@ -59,41 +65,28 @@ def read_hydraulic_head(location, plot_type="RF"):
         pass
 
 
-def read_ditch_level(location, plot_type="RF"):
+@traced()
+def read_ditch_level(location, plot_type="RF", start=None, end=None):
     """
     Reads hydraulic head data for a given location and plot type.
     Functionality to select the plot type still needs to be implemented.
+    Only the rows between start and end are read when these are given.
     """
 
-    match location:
-        case "GDA" | "BKW" | "BKG" | "CBW" | "HZW" | "MMW" | "M4T" | "MSW":
-            ditch = DITCHES[location]
-        case _:
-            ditch = DITCHES[f"{location} {plot_type}"]
-    location_fullname = LOCATION_FULLNAMES[location]
-
-    match location:
-        case "LW":
-            foldername = "LAW"
-        case "ZH":
-            foldername = "ZEG31"
-        case _:
-            foldername = location
+    # the ditch levels from the logger workbooks are stored per location
+    if get_site(location)["ditch"] is not None:
+        ditch = DITCHES[location]
+    else:
+        ditch = DITCHES[f"{location} {plot_type}"]
 
-    match location:
-        case "GDA" | "BKW" | "BKG" | "CBW" | "HZW" | "MMW" | "M4T" | "MSW":
-            basedir = Path(
-                rf"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim/{location_fullname}"
-            )
-        case _:
-            # groundwater data
-            basedir = Path(
-                f"p:/broeikasgassen-veenweiden/Grondwater/grondwaterstandanalyse/data/4-output/Gecorrigeerde_grondwaterstanden_hourly/gecorrigeerd/{foldername}"
-            )
+    basedir = get_groundwater_dir(location)
 
     if ditch:
-        data = pd.read_csv(
-            basedir.joinpath(f"{ditch}.csv"), index_col=0, parse_dates=True
+        data = read_interim(
+            basedir.joinpath(f"{ditch}.csv"),
+            columns=["Waterstand"],
+            start=start,
+            end=end,
         )["Waterstand"]
 
         return data
@@ -101,19 +94,14 @@ def read_ditch_level(location, plot_type="RF"):
         pass
 
 
-def read_precipitation_deficit(location):
+@traced()
+def read_precipitation_deficit(location, start=None, end=None):
 
-    basedir = Path(
-        "n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data"
+    path_to_data = get_interim_dir(location).joinpath(
+        f"{location}_precipitation_deficit.csv"
     )
 
-    path_to_data = basedir.joinpath(
-        "2-interim",
-        LOCATION_FULLNAMES[location],
-        f"{location}_precipitation_deficit.csv",
-    )
-
-    data = pd.read_csv(path_to_data, index_col=0, parse_dates=True)
+    data = read_interim(path_to_data, start=start, end=end)
 
     # convert the dataframe to a series by selecting the first column
     data = data.iloc[:, 0]
@@ -121,41 +109,45 @@ def read_precipitation_deficit(location):
     return data
 
 
-def read_extensometer(location, plot_type="RF"):
+def get_path_to_extensometer(location, plot_type="RF"):
+    return get_interim_path(location, "extensometer", plot_type)
 
-    match location:
-        case (
-            "DEM"
-            | "LW"
-            | "VEG"
-            | "ZH"
-            | "GDA"
-            | "BKW"
-            | "BKG"
-            | "CBW"
-            | "HZW"
-            | "MMW"
-            | "M4T"
-            | "MSW"
-            | "HGM"
-            | "HGG"
-            | "HGR"
-        ):
-            extensometer_depth = EXTENSOMETER_DEPTHS[f"{location}"]
-            filename_plot_type = f"{location}_extensometer.csv"
-        case _:
-            extensometer_depth = EXTENSOMETER_DEPTHS[f"{location} {plot_type}"]
-            filename_plot_type = f"{location}_extensometer_{plot_type}.csv"
-
-    basedir = Path(
-        "n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data"
-    )
 
-    path_to_data = basedir.joinpath(
-        "2-interim", LOCATION_FULLNAMES[location], filename_plot_type
-    )
+def get_path_to_extensometer_grid(location, plot_type="RF"):
+    path_to_data = get_path_to_extensometer(location, plot_type)
+    return path_to_data.with_name(f"{path_to_data.stem}_cm")
+
+
+@traced()
+@cached_reader(get_path_to_extensometer)
+def read_extensometer(location, plot_type="RF", mmap=False, start=None, end=None):
+    """
+    Read the interim extensometer data of a location, in cm on an hourly grid.
+    Only the rows between start and end (like .loc[start:end]) are read when
+    these are given.
+
+    With mmap=True the data is returned as a read-only view on a binary copy
+    next to the interim file (see write_grid), which is written on the first
+    call and whenever the interim file changes. Only the rows that are used
+    are then read from disk.
+    """
+
+    if mmap:
+        path_to_grid = get_path_to_extensometer_grid(location, plot_type)
+
+        if not has_grid(path_to_grid, get_path_to_extensometer(location, plot_type)):
+            write_grid(read_extensometer(location, plot_type), path_to_grid)
 
-    data = pd.read_csv(path_to_data, index_col=0, parse_dates=True)[extensometer_depth]
+        return read_grid(path_to_grid).loc[start:end]
+
+    if location in EXTENSOMETER_DEPTHS:
+        extensometer_depth = EXTENSOMETER_DEPTHS[location]
+    else:
+        extensometer_depth = EXTENSOMETER_DEPTHS[f"{location} {plot_type}"]
+
+    path_to_data = get_path_to_extensometer(location, plot_type)
+
+    data = read_interim(path_to_data, columns=extensometer_depth, start=start, end=end)
     data.index = pd.to_datetime(data.index)
 
     column_names = [column_name.replace("m-mv", "m bs") for column_name in data.columns]
@@ -190,41 +182,17 @@ def read_extensometer(location, plot_type="RF"):
     return data_cm
 
 
-def read_surface_level(location, plot_type="RF"):
+def get_path_to_surface_level(location, plot_type="RF"):
+    return get_interim_path(location, "surface_level", plot_type)
 
-    basedir = Path(
-        "n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data"
-    )
 
-    match location:
-        case (
-            "DEM"
-            | "LW"
-            | "VEG"
-            | "ZH"
-            | "GDA"
-            | "BKW"
-            | "BKG"
-            | "CBW"
-            | "HZW"
-            | "MMW"
-            | "M4T"
-            | "MSW"
-            | "HGM"
-            | "HGG"
-            | "HGR"
-        ):
-            plot_type = ""
-        case _:
-            plot_type = "_" + plot_type
-
-    path_to_data = basedir.joinpath(
-        "2-interim",
-        LOCATION_FULLNAMES[location],
-        f"{location}_surface_level{plot_type}.csv",
-    )
+@traced()
+@cached_reader(get_path_to_surface_level)
+def read_surface_level(location, plot_type="RF"):
 
-    data = pd.read_csv(path_to_data, header=None)
+    path_to_data = get_path_to_surface_level(location, plot_type)
+
+    data = pd.read_csv(cached_path(path_to_data), header=None)
 
     # multiply by 100 to get the data in cm
     data_cm = data * 100
@@ -232,38 +200,17 @@ def read_surface_level(location, plot_type="RF"):
     return data_cm.iloc[0, 0]
 
 
-def read_filter_depths(location, plot_type="RF"):
+def get_path_to_filter_depths(location, plot_type="RF"):
+    return get_interim_path(location, "filterdepths", plot_type)
 
-    basedir = Path(
-        "n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data"
-    )
 
-    match location:
-        case (
-            "DEM"
-            | "LW"
-            | "VEG"
-            | "ZH"
-            | "GDA"
-            | "BKW"
-            | "BKG"
-            | "CBW"
-            | "HZW"
-            | "MMW"
-            | "M4T"
-            | "MSW"
-        ):
-            plot_type = ""
-        case _:
-            plot_type = "_" + plot_type
-
-    path_to_data = basedir.joinpath(
-        "2-interim",
-        LOCATION_FULLNAMES[location],
-        f"{location}_filterdepths{plot_type}.csv",
-    )
+@traced()
+@cached_reader(get_path_to_filter_depths)
+def read_filter_depths(location, plot_type="RF"):
+
+    path_to_data = get_path_to_filter_depths(location, plot_type)
 
-    data = pd.read_csv(path_to_data, header=None)
+    data = pd.read_csv(cached_path(path_to_data), header=None)
 
     # multiply by 100 to get the data in cm
     data_cm = data * 100
@@ -271,73 +218,22 @@ def read_filter_depths(location, plot_type="RF"):
     return data_cm
 
 
-def read_soilprofile(location, location_fullname, plot_type="RF", language="english"):
+def get_soilprofile_sheetname(location, location_fullname=None, plot_type="RF"):
+    return get_soilprofile_source(location, plot_type)[1]
 
-    match location:
-        case "ROU":
-            if plot_type == "MS":
-                sheetname = "ROU05_MP"
-            else:
-                sheetname = "ROU05_RF"
-        case "ALB" | "ASD" | "VLI" | "ZEG":
-            sheetname = f"{location}_{plot_type}"
-        case "DEM" | "VEG":
-            sheetname = location
-        case "LW":
-            sheetname = "LAW"
-        case "ZH":
-            sheetname = "ZEG_HW"
-        case "BKW" | "BKG" | "CBW":
-            sheetname = location_fullname
-        case "HZW":
-            sheetname = location_fullname.removesuffix("-Dorp")
-        case "ROU09":
-            if plot_type == "MS":
-                sheetname = "ROU09_MP"
-            else:
-                sheetname = "ROU09_RF"
-        case "M4T":
-            sheetname = "Vierde tochtweg"
-        case "MMW":
-            sheetname = "Middelweg"
-        case "MSW":
-            sheetname = "Spoorweglaan"
-        case "HGM":
-            sheetname = "Museumsite"
-        case "HGG":
-            sheetname = "Perceel 3 - greppel"
-        case "HGR":
-            sheetname = "Perceel 3 - referentie"
-
-    if location == "ZEG" and plot_type == "MS":
-        sheetname = "ZEG_003"
-
-    basedir = Path(
-        r"N:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging"
-    )
 
-    match location:
-        case "GDA" | "BKW" | "BKG" | "CBW" | "HZW":
-            filepath = basedir.joinpath(
-                "data/3-processed/regiodeal/lithologie en ankerdiepten RDBGH44.xlsx"
-            )
-        case "M4T" | "MMW" | "MSW":
-            filepath = basedir.joinpath(
-                "data/3-processed/Lithologie en ankerdiepten restveengebied.xlsx"
-            )
-        case "HGM" | "HGG" | "HGR":
-            filepath = basedir.joinpath(
-                "data/3-processed/Lithologie en ankerdiepten Hegewarren.xlsx"
-            )
-        case _:
-            filepath = basedir.joinpath(
-                "data/3-processed/Lithologie en ankerdiepten extensometers aangevuld.xlsx"
-            )
-
-    soil_profile = pd.read_excel(
-        filepath,
-        sheet_name=sheetname,
-    )
+def get_path_to_soilprofile(location):
+    return get_soilprofile_source(location)[0]
+
+
+def parse_soilprofile(soil_profile):
+    """
+    Lithology and anchor tables of a sheet of a lithology workbook.
+
+    Returns:
+    - Tuple with the lithology (Dutch names, top, bottom and thickness in cm) and
+      the anchors (depth in m-mv and m NAP, deepest anchor first).
+    """
 
     lithology = (
         soil_profile[["lithologie", "bovengrens [cm]", "ondergrens [cm]"]]
@@ -348,19 +244,78 @@ def read_soilprofile(location, location_fullname, plot_type="RF", language="engl
     lithology = lithology.astype(
         {"bovengrens [cm]": "float64", "ondergrens [cm]": "float64"}
     )
-
-    lithology.loc[:, ("bovengrens [cm]", "ondergrens [cm]")] = lithology.loc[
-        :, ("bovengrens [cm]", "ondergrens [cm]")
-    ]
     lithology["dikte"] = lithology.iloc[:, 1] - lithology.iloc[:, 0]
 
-    if language != "dutch":
-        lithology.index = [SOILTYPES_ENGLISH.get(l[0]) for l in lithology.iterrows()]
-
     anchors = (
         soil_profile[["anker", "m-mv", "m NAP"]].iloc[::-1].set_index("anker").dropna()
     )
 
+    return lithology, anchors
+
+
+def get_path_to_soilprofile_cache(filepath):
+    return INTERIM_DIR.joinpath("soilprofiles", f"{Path(filepath).stem}.pkl")
+
+
+@traced()
+@cached_reader(lambda filepath: filepath, maxsize=4, copy=False)
+def load_soilprofile_catalogue(filepath, persist=False):
+    """
+    Read all sheets of a lithology workbook at once.
+
+    Parameters:
+    - filepath: Path to the lithology workbook (see get_path_to_soilprofile).
+    - persist: Store the catalogue in 2-interim/soilprofiles, so the next run
+      does not have to parse the workbook as long as it did not change.
+
+    Returns:
+    - Dictionary with the lithology and anchors (see parse_soilprofile) per
+      sheet. Sheets without these tables are left out. The catalogue is
+      shared by the callers, copy a sheet before modifying it.
+    """
+
+    mtime = get_mtime(filepath)
+    path_to_cache = get_path_to_soilprofile_cache(filepath)
+
+    if persist and path_to_cache.exists():
+        stored = pd.read_pickle(path_to_cache)
+
+        if stored["mtime"] == mtime:
+            return stored["catalogue"]
+
+    catalogue = {}
+
+    for sheetname, soil_profile in pd.read_excel(
+        cached_path(filepath), sheet_name=None
+    ).items():
+        try:
+            catalogue[sheetname] = parse_soilprofile(soil_profile)
+        except (KeyError, ValueError):
+            continue
+
+    if persist:
+        path_to_cache.parent.mkdir(parents=True, exist_ok=True)
+        pd.to_pickle({"mtime": mtime, "catalogue": catalogue}, path_to_cache)
+
+    return catalogue
+
+
+@traced()
+def read_soilprofile(
+    location, location_fullname, plot_type="RF", language="english", persist=False
+):
+
+    sheetname = get_soilprofile_sheetname(location, location_fullname, plot_type)
+    filepath = get_path_to_soilprofile(location)
+
+    # only the sheet of the location is copied, not the whole catalogue
+    lithology, anchors = copy_result(
+        load_soilprofile_catalogue(filepath, persist=persist)[sheetname]
+    )
+
+    if language != "dutch":
+        lithology.index = [SOILTYPES_ENGLISH.get(l[0]) for l in lithology.iterrows()]
+
     # anchors['m-mv'] *= -1 # to obtain positive values for m-mv
 
     # reverse the order of the soil profile anchors to match the order of the extensometer data
@@ -375,14 +330,15 @@ def read_soilprofile(location, location_fullname, plot_type="RF", language="engl
     return lithology, anchors
 
 
+@traced()
 def read_soilprofile_regiodeal(location, location_fullname):
 
     try:
-        path_to_soilprofile = Path(
-            f"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/3-processed/regiodeal/{location}_lithology.csv"
+        path_to_soilprofile = data_path(LITHOLOGY_DIR).joinpath(
+            "regiodeal", f"{location}_lithology.csv"
         )
         soilprofile = pd.read_csv(
-            path_to_soilprofile,
+            cached_path(path_to_soilprofile),
             index_col=0,
         )
 
@@ -411,16 +367,17 @@ def read_soilprofile_regiodeal(location, location_fullname):
         lithology = pd.DataFrame()
 
     # read the anchors
-    path_to_anchors = Path(
-        f"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/3-processed/regiodeal/{location}_anchors.csv"
+    path_to_anchors = data_path(LITHOLOGY_DIR).joinpath(
+        "regiodeal", f"{location}_anchors.csv"
     )
     anchors = pd.read_csv(
-        path_to_anchors, index_col=0, usecols=["anker", "m-mv", "m NAP"]
+        cached_path(path_to_anchors), index_col=0, usecols=["anker", "m-mv", "m NAP"]
     ).iloc[::-1]
 
     return lithology, anchors
 
 
+@traced()
 def read_strain(path_stats, sheetname, header=2, footer=0):
 
     strain_values = pd.read_excel(
@@ -446,52 +403,43 @@ def read_strain(path_stats, sheetname, header=2, footer=0):
     return strain_values
 
 
-def read_gwlevel(location, plot_type):
-
-    location_fullname = LOCATION_FULLNAMES[location]
-
-    match location:
-        case "LW":
-            foldername = "LAW"
-        case "ZH":
-            foldername = "ZEG31"
-        case _:
-            foldername = location
-
-    match location:
-        case "GDA" | "BKW" | "BKG" | "CBW" | "HZW" | "ROU09" | "MMW" | "M4T" | "MSW":
-            basedir = Path(
-                rf"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/2-interim/{location_fullname}"
-            )
+@traced()
+def read_gwlevel(location, plot_type, start=None, end=None):
+    """
+    Read the groundwater levels of a location, only the rows between start
+    and end when these are given.
+    """
 
-            data = pd.read_csv(
-                basedir.joinpath(f"{location}_gwlevels.csv"),
-                index_col=0,
-                parse_dates=True,
-            )  # ["Waterstand"]
+    if get_site(location)["gwlevels_interim"]:
+        data = read_interim(
+            get_interim_dir(location).joinpath(f"{location}_gwlevels.csv"),
+            start=start,
+            end=end,
+        )  # ["Waterstand"]
 
-        case _:
-            # groundwater data
-            basedir = Path(
-                f"p:/broeikasgassen-veenweiden/Grondwater/grondwaterstandanalyse/data/4-output/Gecorrigeerde_grondwaterstanden_hourly/gecorrigeerd/{foldername}"
-            )
+    else:
+        # groundwater data
+        basedir = get_groundwater_dir(location)
 
-            data = pd.DataFrame()
+        data = pd.DataFrame()
 
-            wells = SELECTED_GROUNDWATER_WELLS[f"{location} {plot_type}"]
+        wells = SELECTED_GROUNDWATER_WELLS[f"{location} {plot_type}"]
 
-            for well in wells:
-                if well:
-                    data_single_well = pd.read_csv(
-                        basedir.joinpath(f"{well}.csv"), index_col=0, parse_dates=True
-                    )["Waterstand"]
+        for well in wells:
+            if well:
+                data_single_well = read_interim(
+                    basedir.joinpath(f"{well}.csv"),
+                    columns=["Waterstand"],
+                    start=start,
+                    end=end,
+                )["Waterstand"]
 
-                else:
-                    data_single_well = pd.DataFrame()
+            else:
+                data_single_well = pd.DataFrame()
 
-                data = pd.concat([data, data_single_well], axis=1)
+            data = pd.concat([data, data_single_well], axis=1)
 
-            data.columns = [well for well in wells if well]
+        data.columns = [well for well in wells if well]
 
     return data
 
@@ -0,0 +1,511 @@
+import json
+import os
+from pathlib import Path
+
+from nl2120_soilmm.constants import (
+    DITCHES,
+    EXTENSOMETER_DEPTHS,
+    HYDRAULIC_HEADS,
+    LOCATION_FULLNAMES,
+    PB_COLUMNS,
+    SOILPROFILE_DEPTHS,
+)
+
+# Set this environment variable to a local copy of the network drives to run
+# the scripts against that copy, with a folder per drive letter, e.g.
+# D:/mirror/n/Projects/11211000/... for n:/Projects/11211000/...
+DATA_ROOT_VARIABLE = "NL2120_SOILMM_DATA_ROOT"
+
+DATA_ROOT = os.environ.get(DATA_ROOT_VARIABLE)
+
+ROUVEEN_DIR = (
+    "n:/Projects/11202000/11202008/B. Measurements and calculations/Extensometers"
+)
+FIRST_SERIES_DIR = (
+    "n:/Projects/11204000/11204108/B. Measurements and calculations/Extensometers"
+)
+SECOND_SERIES_DIR = "n:/Projects/11206000/11206457/B. Measurements and calculations"
+REGIODEAL_DIR = (
+    "n:/Projects/11206000/11206020/B. Measurements and calculations/Extensometers"
+)
+MOORDRECHT_DIR = (
+    "n:/Projects/11210000/11210175/B. Measurements and calculations/Extensometers"
+)
+HEGEWARREN_DIR = (
+    "n:/Projects/11210000/11210448/B. Measurements and calculations/Extensometers"
+)
+BODEMBEWEGING_DIR = (
+    "n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging"
+)
+GROUNDWATER_DIR = (
+    "p:/broeikasgassen-veenweiden/Grondwater/grondwaterstandanalyse/data/4-output/"
+    "Gecorrigeerde_grondwaterstanden_hourly/gecorrigeerd"
+)
+
+LITHOLOGY_DIR = f"{BODEMBEWEGING_DIR}/data/3-processed"
+LITHOLOGY_EXTENSOMETERS = (
+    f"{LITHOLOGY_DIR}/Lithologie en ankerdiepten extensometers aangevuld.xlsx"
+)
+LITHOLOGY_REGIODEAL = (
+    f"{LITHOLOGY_DIR}/regiodeal/lithologie en ankerdiepten RDBGH44.xlsx"
+)
+LITHOLOGY_RESTVEENGEBIED = (
+    f"{LITHOLOGY_DIR}/Lithologie en ankerdiepten restveengebied.xlsx"
+)
+LITHOLOGY_HEGEWARREN = f"{LITHOLOGY_DIR}/Lithologie en ankerdiepten Hegewarren.xlsx"
+
+SERIES = ["first", "second", "regiodeal", "moordrecht", "hegewarren"]
+
+# Values that differ per plot type are dictionaries, "RF" is used for plot types
+# that are not in the dictionary. "{plot_type}" in a string is replaced by the
+# plot type.
+#
+# - series: Measurement series, determines how the logger workbook is read.
+# - plot_types: The interim files have the plot type in their name.
+# - workbook: Logger workbook (.xlsm).
+# - extensometer_sheet: Sheet with the anchor data.
+# - anchor_columns: First and last column with anchor data.
+# - surface_level_cell: Cell with the surface level on the "cal" sheet.
+# - filter_depth_rows: Rows with the top and bottom of the filters on "cal".
+# - hydraulic_head_column: Column with the hydraulic head on the "PB" sheet.
+# - ditch: Time column, level column and rows to skip on the "PB" sheet.
+# - gwlevels_interim: The groundwater levels are in the interim folder.
+# - groundwater_folder: Folder with the corrected groundwater levels, None if
+#   the hydraulic head and ditch level are in the interim folder.
+# - lithology_workbook, soilprofile_sheet: Lithology and anchor depths.
+SITES = {
+    "ALB": {
+        "series": "first",
+        "plot_types": True,
+        "workbook": f"{FIRST_SERIES_DIR}/ALB_{{plot_type}}.xlsm",
+        "extensometer_sheet": "bewerking",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "C21",
+        "groundwater_folder": "ALB",
+        "lithology_workbook": LITHOLOGY_EXTENSOMETERS,
+        "soilprofile_sheet": "ALB_{plot_type}",
+    },
+    "ASD": {
+        "series": "first",
+        "plot_types": True,
+        "workbook": f"{FIRST_SERIES_DIR}/ASD_{{plot_type}}.xlsm",
+        "extensometer_sheet": "bewerking",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "C21",
+        "groundwater_folder": "ASD",
+        "lithology_workbook": LITHOLOGY_EXTENSOMETERS,
+        "soilprofile_sheet": "ASD_{plot_type}",
+    },
+    "ROU": {
+        "series": "first",
+        "plot_types": True,
+        "workbook": {
+            "RF": f"{ROUVEEN_DIR}/WDOD-05B-ref.xlsm",
+            "MS": f"{ROUVEEN_DIR}/WDOD-05A-drain.xlsm",
+        },
+        "extensometer_sheet": "bewerking",
+        "anchor_columns": ("E", "H"),
+        "surface_level_cell": {"RF": "C56", "MS": "C96"},
+        "groundwater_folder": "ROU",
+        "lithology_workbook": LITHOLOGY_EXTENSOMETERS,
+        "soilprofile_sheet": {"RF": "ROU05_RF", "MS": "ROU05_MP"},
+    },
+    "VLI": {
+        "series": "first",
+        "plot_types": True,
+        "workbook": f"{FIRST_SERIES_DIR}/VLI_{{plot_type}}.xlsm",
+        "extensometer_sheet": "bewerking",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "C21",
+        "groundwater_folder": "VLI",
+        "lithology_workbook": LITHOLOGY_EXTENSOMETERS,
+        "soilprofile_sheet": "VLI_{plot_type}",
+    },
+    "ZEG": {
+        "series": "first",
+        "plot_types": True,
+        "workbook": {
+            "RF": f"{FIRST_SERIES_DIR}/ZEG_{{plot_type}}.xlsm",
+            "MS": f"{FIRST_SERIES_DIR}/ZEG_003_perceel 16-drain.xlsm",
+        },
+        "extensometer_sheet": "bewerking",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "C21",
+        "groundwater_folder": "ZEG",
+        "lithology_workbook": LITHOLOGY_EXTENSOMETERS,
+        "soilprofile_sheet": {"RF": "ZEG_{plot_type}", "MS": "ZEG_003"},
+    },
+    "DEM": {
+        "series": "second",
+        "workbook": f"{SECOND_SERIES_DIR}/Demmerik/Extensometer/Demmerik.xlsm",
+        "extensometer_sheet": "Ext",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "C27",
+        "groundwater_folder": "DEM",
+        "lithology_workbook": LITHOLOGY_EXTENSOMETERS,
+        "soilprofile_sheet": "DEM",
+    },
+    "LW": {
+        "series": "second",
+        "workbook": f"{SECOND_SERIES_DIR}/LangeWeide/Extensometer/LangeWeide.xlsm",
+        "extensometer_sheet": "EXT",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "C21",
+        "groundwater_folder": "LAW",
+        "lithology_workbook": LITHOLOGY_EXTENSOMETERS,
+        "soilprofile_sheet": "LAW",
+    },
+    "VEG": {
+        "series": "second",
+        "workbook": f"{SECOND_SERIES_DIR}/Vegelinsoord/Extensometer/Vegelinsoord.xlsm",
+        "extensometer_sheet": "Ext",
+        "anchor_columns": ("D", "F"),
+        "surface_level_cell": "C21",
+        "groundwater_folder": "VEG",
+        "lithology_workbook": LITHOLOGY_EXTENSOMETERS,
+        "soilprofile_sheet": "VEG",
+    },
+    "ZH": {
+        "series": "second",
+        "workbook": (
+            f"{SECOND_SERIES_DIR}/ZegveldHoogwater/Extensometer/ZegveldHoogwater.xlsm"
+        ),
+        "extensometer_sheet": "bewerking",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "C21",
+        "groundwater_folder": "ZEG31",
+        "lithology_workbook": LITHOLOGY_EXTENSOMETERS,
+        "soilprofile_sheet": "ZEG_HW",
+    },
+    "LR": {
+        "plot_types": True,
+        "groundwater_folder": "LR",
+        "lithology_workbook": LITHOLOGY_EXTENSOMETERS,
+    },
+    "GDA": {
+        "series": "regiodeal",
+        "workbook": f"{REGIODEAL_DIR}/Gouda_MBORijnland.xlsm",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "B23",
+        "filter_depth_rows": (27, 28),
+        "hydraulic_head_column": "C",
+        "ditch": ("F", "J", [0, 1, 2, 3, 4, 6]),
+        "gwlevels_interim": True,
+        "lithology_workbook": LITHOLOGY_REGIODEAL,
+    },
+    "BKW": {
+        "series": "regiodeal",
+        "workbook": f"{REGIODEAL_DIR}/Berkenwoude.xlsm",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "B23",
+        "filter_depth_rows": (27, 28),
+        "hydraulic_head_column": "C",
+        "ditch": ("F", "J", [0, 1, 2, 3, 4, 6]),
+        "gwlevels_interim": True,
+        "lithology_workbook": LITHOLOGY_REGIODEAL,
+        "soilprofile_sheet": "Berkenwoude",
+    },
+    "BKG": {
+        "series": "regiodeal",
+        "workbook": f"{REGIODEAL_DIR}/Bleskensgraaf.xlsm",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "B23",
+        "filter_depth_rows": (27, 28),
+        "hydraulic_head_column": "C",
+        "ditch": ("F", "J", [0, 1, 2, 3, 4, 6]),
+        "gwlevels_interim": True,
+        "lithology_workbook": LITHOLOGY_REGIODEAL,
+        "soilprofile_sheet": "Bleskensgraaf",
+    },
+    "CBW": {
+        "series": "regiodeal",
+        "workbook": f"{REGIODEAL_DIR}/Cabauw.xlsm",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "B23",
+        "filter_depth_rows": (27, 28),
+        "hydraulic_head_column": "C",
+        "ditch": ("J", "N", [0, 1, 2, 3, 4, 6, 7]),
+        "gwlevels_interim": True,
+        "lithology_workbook": LITHOLOGY_REGIODEAL,
+        "soilprofile_sheet": "Cabauw",
+    },
+    "HZW": {
+        "series": "regiodeal",
+        "workbook": f"{REGIODEAL_DIR}/Hazerswoude.xlsm",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "B23",
+        "filter_depth_rows": (27, 28),
+        "hydraulic_head_column": "C",
+        "ditch": ("F", "J", [0, 1, 2, 3, 4, 6]),
+        "gwlevels_interim": True,
+        "lithology_workbook": LITHOLOGY_REGIODEAL,
+        "soilprofile_sheet": "Hazerswoude",
+    },
+    "ROU09": {
+        "series": "first",
+        "plot_types": True,
+        "workbook": {
+            "RF": f"{ROUVEEN_DIR}/WDOD-09B-ref.xlsm",
+            "MS": f"{ROUVEEN_DIR}/WDOD-09A-drain.xlsm",
+        },
+        "extensometer_sheet": "bewerking",
+        "anchor_columns": ("D", "F"),
+        "surface_level_cell": "C56",
+        "gwlevels_interim": True,
+        "groundwater_folder": "ROU09",
+        "lithology_workbook": LITHOLOGY_EXTENSOMETERS,
+        "soilprofile_sheet": {"RF": "ROU09_RF", "MS": "ROU09_MP"},
+    },
+    "M4T": {
+        "series": "moordrecht",
+        "workbook": f"{MOORDRECHT_DIR}/Moordrecht-4eTochtweg.xlsm",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "C108",
+        "filter_depth_rows": (32, 33),
+        "hydraulic_head_column": "D",
+        "ditch": ("G", "K", [0, 1, 2, 3, 4]),
+        "gwlevels_interim": True,
+        "lithology_workbook": LITHOLOGY_RESTVEENGEBIED,
+        "soilprofile_sheet": "Vierde tochtweg",
+    },
+    "MMW": {
+        "series": "moordrecht",
+        "workbook": f"{MOORDRECHT_DIR}/Moordrecht-Middelweg.xlsm",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "C109",
+        "filter_depth_rows": (33, 34),
+        "hydraulic_head_column": "E",
+        "ditch": ("H", "L", [0, 1, 2, 3, 4, 6, 7]),
+        "gwlevels_interim": True,
+        "lithology_workbook": LITHOLOGY_RESTVEENGEBIED,
+        "soilprofile_sheet": "Middelweg",
+    },
+    "MSW": {
+        "series": "moordrecht",
+        "workbook": f"{MOORDRECHT_DIR}/Moordrecht-Spoorweglaan.xlsm",
+        "anchor_columns": ("G", "L"),
+        "surface_level_cell": "C108",
+        "filter_depth_rows": (32, 33),
+        "hydraulic_head_column": "E",
+        "ditch": ("I", "M", [0, 1, 2, 3, 4, 6, 7, 8]),
+        "gwlevels_interim": True,
+        "lithology_workbook": LITHOLOGY_RESTVEENGEBIED,
+        "soilprofile_sheet": "Spoorweglaan",
+    },
+    "HGM": {
+        "series": "hegewarren",
+        "workbook": f"{HEGEWARREN_DIR}/Hegewarren-Museum.xlsm",
+        "anchor_columns": ("F", "J"),
+        "surface_level_cell": "C27",
+        "groundwater_folder": "HGM",
+        "lithology_workbook": LITHOLOGY_HEGEWARREN,
+        "soilprofile_sheet": "Museumsite",
+    },
+    "HGG": {
+        "series": "hegewarren",
+        "workbook": f"{HEGEWARREN_DIR}/Hegewarren-Greppel.xlsm",
+        "anchor_columns": ("F", "J"),
+        "surface_level_cell": "C27",
+        "groundwater_folder": "HGG",
+        "lithology_workbook": LITHOLOGY_HEGEWARREN,
+        "soilprofile_sheet": "Perceel 3 - greppel",
+    },
+    "HGR": {
+        "series": "hegewarren",
+        "workbook": f"{HEGEWARREN_DIR}/Hegewarren-Ref.xlsm",
+        "anchor_columns": ("F", "J"),
+        "surface_level_cell": "C27",
+        "groundwater_folder": "HGR",
+        "lithology_workbook": LITHOLOGY_HEGEWARREN,
+        "soilprofile_sheet": "Perceel 3 - referentie",
+    },
+}
+
+DEFAULTS = {
+    "series": None,
+    "plot_types": False,
+    "workbook": None,
+    "extensometer_sheet": "Ext",
+    "anchor_columns": None,
+    "surface_level_cell": None,
+    "filter_depth_rows": None,
+    "hydraulic_head_column": None,
+    "ditch": None,
+    "gwlevels_interim": False,
+    "groundwater_folder": None,
+    "lithology_workbook": None,
+    "soilprofile_sheet": None,
+}
+
+
+def data_path(path):
+    """
+    Path to a file or folder on the network drives (e.g., "n:/Projects/..."),
+    in the local copy when NL2120_SOILMM_DATA_ROOT is set.
+    """
+    if DATA_ROOT is None:
+        return Path(path)
+
+    drive, _, relative_path = str(path).partition(":/")
+    return Path(DATA_ROOT, drive.lower(), relative_path)
+
+
+def validate_site(location, site):
+    """Check the entry of a location and fill in the defaults."""
+
+    unknown = set(site) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown site properties for {location}: {unknown}")
+
+    site = {**DEFAULTS, **site, "fullname": LOCATION_FULLNAMES[location]}
+
+    if site["series"] is not None:
+        if site["series"] not in SERIES:
+            raise ValueError(f"Unknown series for {location}: {site['series']}")
+
+        for name in ["workbook", "anchor_columns", "surface_level_cell"]:
+            if site[name] is None:
+                raise ValueError(f"No {name} for {location}")
+
+    if site["anchor_columns"] is not None:
+        first, last = site["anchor_columns"]
+        if not ("A" <= first <= last <= "Z"):
+            raise ValueError(f"Invalid anchor columns for {location}")
+
+    return site
+
+
+def validate_sites(sites):
+    """
+    Check the site registry and fill in the defaults.
+
+    Returns:
+    - Dictionary with the complete entry per location.
+    """
+
+    missing = set(LOCATION_FULLNAMES) - set(sites)
+    if missing:
+        raise ValueError(f"Locations missing in the site registry: {missing}")
+
+    return {location: validate_site(location, site) for location, site in sites.items()}
+
+
+SITES = validate_sites(SITES)
+
+INTERIM_DIR = data_path(BODEMBEWEGING_DIR).joinpath("data", "2-interim")
+
+# Locations listed in this file in the data root are added to the registry when
+# the package is imported, e.g. the synthetic sites of nl2120_soilmm.synthetic.
+EXTRA_SITES_FILENAME = "sites.json"
+
+# the constants that are kept per location, by their name in an extra site
+SITE_CONSTANTS = {
+    "extensometer_depths": EXTENSOMETER_DEPTHS,
+    "soilprofile_depth": SOILPROFILE_DEPTHS,
+    "pb_columns": PB_COLUMNS,
+    "hydraulic_head": HYDRAULIC_HEADS,
+    "ditch": DITCHES,
+}
+
+
+def register_site(location, entry):
+    """
+    Add a location to the registry.
+
+    Parameters:
+    - location: Short code for the location (e.g., "S001").
+    - entry: Dictionary with the full name ("fullname"), the site properties
+      ("site", see SITES) and optionally the constants of the location (see
+      SITE_CONSTANTS, e.g. "extensometer_depths").
+    """
+
+    LOCATION_FULLNAMES[location] = entry["fullname"]
+    SITES[location] = validate_site(location, entry["site"])
+
+    for name, value in entry.get("constants", {}).items():
+        SITE_CONSTANTS[name][location] = value
+
+
+def get_extra_sites_path():
+    if DATA_ROOT is None:
+        return None
+
+    return Path(DATA_ROOT, EXTRA_SITES_FILENAME)
+
+
+def load_extra_sites(path_to_sites):
+    """Register the locations in a sites.json file (see register_site)."""
+    with open(path_to_sites, encoding="UTF8") as f:
+        extra_sites = json.load(f)
+
+    for location, entry in extra_sites.items():
+        register_site(location, entry)
+
+    return list(extra_sites)
+
+
+if get_extra_sites_path() is not None and get_extra_sites_path().exists():
+    load_extra_sites(get_extra_sites_path())
+
+
+def select_plot_type(value, plot_type):
+    """Value of a site property for a plot type."""
+    if isinstance(value, dict):
+        value = value.get(plot_type, value["RF"])
+
+    if isinstance(value, str):
+        value = value.format(plot_type=plot_type)
+
+    return value
+
+
+def get_site(location):
+    return SITES[location]
+
+
+def get_workbook_path(location, plot_type="RF"):
+    """Path to the logger workbook (.xlsm) of a location."""
+    return data_path(select_plot_type(SITES[location]["workbook"], plot_type))
+
+
+def get_interim_dir(location):
+    return INTERIM_DIR.joinpath(SITES[location]["fullname"])
+
+
+def get_interim_path(location, name, plot_type="RF"):
+    """
+    Path to an interim csv file of a location (e.g., name="extensometer"). The
+    plot type is only part of the file name for the locations with plot types.
+    """
+    if SITES[location]["plot_types"]:
+        filename = f"{location}_{name}_{plot_type}.csv"
+    else:
+        filename = f"{location}_{name}.csv"
+
+    return get_interim_dir(location).joinpath(filename)
+
+
+def get_anchor_columns(location):
+    """Column letters of the anchors in the logger workbook."""
+    first, last = SITES[location]["anchor_columns"]
+    return [chr(column) for column in range(ord(first), ord(last) + 1)]
+
+
+def get_groundwater_dir(location):
+    """Folder with the corrected hourly groundwater levels of a location."""
+    folder = SITES[location]["groundwater_folder"]
+
+    if folder is None:
+        return get_interim_dir(location)
+
+    return data_path(GROUNDWATER_DIR).joinpath(folder)
+
+
+def get_soilprofile_source(location, plot_type="RF"):
+    """Lithology workbook and the name of the sheet of a location."""
+    site = SITES[location]
+
+    return (
+        data_path(site["lithology_workbook"]),
+        select_plot_type(site["soilprofile_sheet"], plot_type),
+    )
@@ -2,10 +2,10 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib import dates as mdates
-from pathlib import Path
 import scipy
 
 from nl2120_soilmm.constants import MONTHS
+from nl2120_soilmm.tracing import span, traced
 
 
 def calculate_dynamic(extensometer_year, year):
@@ -44,6 +44,113 @@ def calculate_deformation(layer_thickness_year, year):
     return yearly_dynamics
 
 
+def get_hydrological_year(index):
+    """
+    Hydrological year of each timestamp. The hydrological year runs from 1
+    November of the previous year up to and including 31 October.
+    """
+    return pd.Index(index.year + (index.month >= 11), name="year")
+
+
+@traced()
+def calculate_yearly_stats(
+    extensometer_data, layer_thickness_data, layer_thickness_start, years=(2022,)
+):
+    """
+    Yearly statistics of the anchors and layer thicknesses per hydrological
+    year (see get_hydrological_year), for all years at once.
+
+    Parameters:
+    - extensometer_data: DataFrame with the extensometer data in cm.
+    - layer_thickness_data: DataFrame with the layer thickness changes in cm.
+    - layer_thickness_start: DataFrame with the initial thickness of each layer
+      in cm in the first column, indexed like the layer_thickness_data columns.
+    - years: Years that are included even when they are not complete.
+
+    Returns:
+    - Tuple with the statistics of the anchors (min, max, dynamiek and percent
+      of upper anchor dynamic (%)) and of the layers (laagdiktes, min, max,
+      totale deformatie and rek). The columns are a MultiIndex of year and
+      statistic.
+    """
+
+    hydrological_year = get_hydrological_year(extensometer_data.index)
+
+    # only complete years, i.e. with data on 1 November and 31 October
+    complete_years = [
+        year
+        for year in hydrological_year.unique()
+        if (
+            pd.Timestamp(f"{year - 1}-11-01") in extensometer_data.index
+            and pd.Timestamp(f"{year}-10-31") in extensometer_data.index
+        )
+        or year in years
+    ]
+
+    def aggregate(data, statistics):
+        grouped = data.groupby(get_hydrological_year(data.index))
+        minimum = grouped.min().loc[complete_years]
+        maximum = grouped.max().loc[complete_years]
+
+        yearly = pd.concat(
+            dict(zip(statistics, [minimum, maximum, maximum - minimum])), axis=1
+        )
+
+        # index: anchors or layers, columns: (year, statistic)
+        yearly = yearly.T.unstack(level=0)
+        return yearly.reindex(
+            index=data.columns,
+            columns=pd.MultiIndex.from_product([complete_years, statistics]),
+        )
+
+    yearly_stats = aggregate(extensometer_data, ["min", "max", "dynamiek"])
+
+    dynamiek = yearly_stats.xs("dynamiek", axis=1, level=1)
+    percentage = dynamiek / dynamiek.iloc[0] * 100
+    percentage.columns = pd.MultiIndex.from_product(
+        [complete_years, ["percent of upper anchor dynamic (%)"]]
+    )
+
+    yearly_stats_layer_thickness = aggregate(
+        layer_thickness_data, ["min", "max", "totale deformatie"]
+    )
+
+    laagdiktes = layer_thickness_start.iloc[:, 0].to_numpy()
+
+    for year in complete_years:
+        yearly_stats_layer_thickness.loc[
+            :, [(year, "min"), (year, "max")]
+        ] += laagdiktes[:, np.newaxis]
+
+    rek = yearly_stats_layer_thickness.xs("totale deformatie", axis=1, level=1).div(
+        laagdiktes, axis="index"
+    )
+    rek.columns = pd.MultiIndex.from_product([complete_years, ["rek"]])
+
+    yearly_stats = pd.concat([yearly_stats, percentage], axis=1)[
+        pd.MultiIndex.from_product(
+            [
+                complete_years,
+                ["min", "max", "dynamiek", "percent of upper anchor dynamic (%)"],
+            ]
+        )
+    ]
+
+    yearly_stats_layer_thickness = pd.concat(
+        [layer_thickness_start, yearly_stats_layer_thickness, rek], axis=1
+    )[
+        [layer_thickness_start.columns[0]]
+        + list(
+            pd.MultiIndex.from_product(
+                [complete_years, ["min", "max", "totale deformatie", "rek"]]
+            )
+        )
+    ]
+
+    return yearly_stats, yearly_stats_layer_thickness
+
+
+@traced()
 def get_trendline(extensometer_data, months=(1, 2)):
 
     highest_per_year = (
@@ -57,10 +164,8 @@ def get_trendline(extensometer_data, months=(1, 2)):
     x = mdates.date2num(highest_per_year.index)
     y = highest_per_year.values
 
-    z = np.polyfit(x, y, 1)
-    p = np.poly1d(z)
-
     slope, intercept, r_value, p_value, std_err = scipy.stats.linregress(x, y)
+    p = np.poly1d([slope, intercept])
     r_2 = r_value * r_value
 
     # convert slope to mm/year
@@ -72,23 +177,69 @@ def get_trendline(extensometer_data, months=(1, 2)):
     return p, x, r_2, slope
 
 
+@traced()
+def get_trendlines(data, months=(1, 2)):
+    """
+    Trendlines of all columns of a DataFrame (e.g., all anchors or all layer
+    thicknesses) at once. Gives the same results as get_trendline per column,
+    missing values are left out per column.
+
+    Parameters:
+    - data: DataFrame with a DatetimeIndex and the data in cm.
+    - months: Months of the year used for the trendline.
+
+    Returns:
+    - DataFrame with per column the slope (mm/jaar), the intercept (cm at day
+      zero of matplotlib dates), R2, the standard error of the slope (mm/jaar)
+      and the number of values used.
+    """
+
+    data = data[data.index.month.isin(months)].resample("h").mean()
+
+    x = mdates.date2num(data.index)[:, np.newaxis]
+    y = data.to_numpy(dtype="float64")
+
+    valid = ~np.isnan(y)
+    n = valid.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = np.where(valid, x, 0.0).sum(axis=0) / n
+        y_mean = np.where(valid, y, 0.0).sum(axis=0) / n
+
+        dx = np.where(valid, x - x_mean, 0.0)
+        dy = np.where(valid, y - y_mean, 0.0)
+
+        sxx = (dx * dx).sum(axis=0)
+        syy = (dy * dy).sum(axis=0)
+        sxy = (dx * dy).sum(axis=0)
+
+        slope = sxy / sxx
+        intercept = y_mean - slope * x_mean
+        r_value = np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0)
+        std_err = np.sqrt((1 - r_value**2) * syy / sxx / (n - 2))
+
+    # convert slope from cm/day to mm/year
+    return pd.DataFrame(
+        {
+            "Slope (mm/jaar)": slope * 365.25 * 10,
+            "Intercept (cm)": intercept,
+            "R2": r_value**2,
+            "Std error (mm/jaar)": std_err * 365.25 * 10,
+            "n": n,
+        },
+        index=data.columns,
+    )
+
+
 if __name__ == "__main__":
 
-    from nl2120_soilmm.read import (
-        read_extensometer,
-        read_soilprofile,
-        read_soilprofile_regiodeal,
-    )
     from nl2120_soilmm.constants import (
         LOCATION_FULLNAMES,
-        EXTENSOMETER_DEPTHS,
         SOILPROFILE_DEPTHS,
     )
+    from nl2120_soilmm.pipeline import clear_results, compute
 
-    from nl2120_soilmm.layer_analysis import (
-        calculate_layer_thickness,
-        calculate_rek,
-    )
+    from nl2120_soilmm.sites import BODEMBEWEGING_DIR, data_path
 
     #################################################################
     # Parameters
@@ -106,9 +257,7 @@ if __name__ == "__main__":
 
     trendline_months = (1, 2)
 
-    basedir = Path(
-        "n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data"
-    )
+    basedir = data_path(BODEMBEWEGING_DIR).joinpath("data")
 
     if write_yearly_stats:
 
@@ -170,172 +319,34 @@ if __name__ == "__main__":
         # read data
         #################################################################
 
-        extensometer_data = read_extensometer(location, plot_type=plot_type)
-
-        if location in [
-            "ALB",
-            "ASD",
-            "ROU",
-            "VLI",
-            "ZEG",
-            "DEM",
-            "LW",
-            "VEG",
-            "ZH",
-            "BKW",
-            "BKG",
-            "CBW",
-            "HZW",
-            "ROU09",
-        ]:
-            _, soilprofile_anchors = read_soilprofile(
-                location, location_fullname, plot_type=plot_type
-            )
-        elif location in ["GDA"]:
-            _, soilprofile_anchors = read_soilprofile_regiodeal(
-                location, location_fullname
-            )
-        else:
-            extensometer_depth = EXTENSOMETER_DEPTHS[location]
-
-            anchor_levels = []
-
-            for i, soilprofile_anchor in enumerate(extensometer_depth):
-                anchor_levels.append(-1 * float(soilprofile_anchor.split(" ")[0]))
+        extensometer_data = compute("extensometer", location, plot_type)
 
-            soilprofile_anchors = pd.DataFrame(
-                anchor_levels, index=extensometer_data.columns, columns=["m-mv"]
-            )
-            # anchor_depth_start = calculate_anchor_depth_start(
-        #     soilprofile_anchors=soilprofile_anchors["m NAP"],
-        #     column_names=extensometer_data.columns,
-        # )
-        # anchor_depth_start = anchor_depth_start.to_frame(name="ankerdiepte")
-        # anchor_depth_start.columns = pd.MultiIndex.from_product([[""], ["ankerdiepte"]])
-
-        # extensometer_data -= (
-        #     anchor_depth_start.T.values
-        # )  # add the anchor depth to the data
         ################################################################
         # calculate layer thicknesses
         ################################################################
 
-        layer_thickness_data = calculate_layer_thickness(extensometer_data)
-        layer_thickness_start = soilprofile_anchors["m-mv"].diff().dropna()
-
-        layer_thickness_start.index = (
-            layer_thickness_data.columns
-        )  # use the same index as the layer thickness data
-
-        layer_thickness_start *= 100  # convert to cm
-        layer_thickness_start *= -1  # invert the values to get the correct direction
-
-        layer_thickness_start = layer_thickness_start.to_frame(name="laagdiktes")
-        layer_thickness_start.columns = pd.MultiIndex.from_product(
-            [[""], ["laagdiktes"]]
-        )
+        layer_thickness_data = compute("layer thickness", location, plot_type)
+        layer_thickness_start = compute("layer thickness start", location, plot_type)
 
         ################################################################
         # calculate rek
         ################################################################
 
-        _, rek = calculate_rek(layer_thickness_data, layer_thickness_start)
+        rek = compute("rek", location, plot_type)
 
         #################################################################
         # output directory
         #################################################################
 
-        outputdir = Path(
-            "n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging/data/4-output"
-        )
+        outputdir = basedir.joinpath("4-output")
 
         ################################################################
         # calculate yearly stats
         ################################################################
         if write_yearly_stats:
 
-            years = extensometer_data.index.year.unique()
-
-            yearly_stats = pd.DataFrame()
-            yearly_stats_layer_thickness = pd.DataFrame()
-
-            for year in years:
-                # print(f"Analysing year {year}")
-
-                start = pd.to_datetime(f"{year-1}-11-01")
-                end = pd.to_datetime(f"{year}-10-31")
-
-                if (
-                    (start in extensometer_data.index)
-                    and (end in extensometer_data.index)
-                ) or (year == 2022):
-                    extensometer_year = extensometer_data.loc[start:end]
-                    layer_thickness_year = layer_thickness_data.loc[start:end]
-                    rek_year = rek.loc[start:end]
-
-                    dynamiek_jaar = calculate_dynamic(extensometer_year, year)
-                    dynamiek_jaar_layer_thickness = calculate_deformation(
-                        layer_thickness_year, year
-                    )
-
-                    # print(dynamiek_jaar_layer_thickness)
-
-                    # add the starting layer thickness using pd.add
-                    # see https://pandas.pydata.org/docs/reference/api/pandas.DataFrame.add.html
-                    # this is also available for divisions and subtractions
-                    dynamiek_jaar_layer_thickness.iloc[:, :2] = (
-                        dynamiek_jaar_layer_thickness.iloc[:, :2].add(
-                            layer_thickness_start.values, axis="index"
-                        )
-                    )
-
-                    # dynamiek_jaar.iloc[:, :2] = dynamiek_jaar.iloc[:, :2].add(
-                    #     anchor_depth_start.values, axis="index"
-                    # )
-
-                    totale_deformatie = dynamiek_jaar_layer_thickness.iloc[
-                        :,
-                        dynamiek_jaar_layer_thickness.columns.get_level_values(1)
-                        == "totale deformatie",
-                    ]
-
-                    dynamiek_jaar_layer_thickness[year, "rek"] = (
-                        totale_deformatie / layer_thickness_start.values
-                    )
-
-                    dynamiek_jaar[year, "percent of upper anchor dynamic (%)"] = (
-                        dynamiek_jaar[year, "dynamiek"]
-                        / dynamiek_jaar.loc[dynamiek_jaar.index[0]][year, "dynamiek"]
-                        * 100
-                    )
-
-                    # dynamiek_jaar_layer_thickness[year, "rek"] = (
-                    #     rek_year.abs().max(axis=0)
-                    # )
-
-                    if yearly_stats.empty:
-                        yearly_stats = dynamiek_jaar
-                    else:
-                        yearly_stats = pd.concat([yearly_stats, dynamiek_jaar], axis=1)
-
-                    if yearly_stats_layer_thickness.empty:
-                        yearly_stats_layer_thickness = dynamiek_jaar_layer_thickness
-                    else:
-                        yearly_stats_layer_thickness = pd.concat(
-                            [
-                                yearly_stats_layer_thickness,
-                                dynamiek_jaar_layer_thickness,
-                            ],
-                            axis=1,
-                        )
-
-            # yearly_stats = pd.concat([anchor_depth_start, yearly_stats], axis=1)
-            yearly_stats_layer_thickness = pd.concat(
-                [
-                    layer_thickness_start,
-                    yearly_stats_layer_thickness,
-                ],
-                axis=1,
+            yearly_stats, yearly_stats_layer_thickness = compute(
+                "yearly stats", location, plot_type
             )
 
             # round results
@@ -456,73 +467,45 @@ if __name__ == "__main__":
 
         if write_trendline_stats:
 
+            # None is the start or end of the data, so the trendlines use the
+            # same pipeline results as the other stats
             if location in ["BKG"]:
                 nr_of_loops = 2
-                start_dates = [extensometer_data.index[0], pd.to_datetime("2023-11-05")]
-                end_dates = [pd.to_datetime("2023-09-14"), extensometer_data.index[-1]]
+                start_dates = [None, pd.to_datetime("2023-11-05")]
+                end_dates = [pd.to_datetime("2023-09-14"), None]
                 startrows = [3, 13]
 
             else:
                 nr_of_loops = 1
-                start_dates = [extensometer_data.index[0]]
-                end_dates = [extensometer_data.index[-1]]
+                start_dates = [None]
+                end_dates = [None]
                 startrows = [2]
 
             for i in range(nr_of_loops):
 
-                extensometer_data_period = extensometer_data.loc[
-                    start_dates[i] : end_dates[i]
-                ]
-                layer_thickness_data_period = layer_thickness_data.loc[
-                    start_dates[i] : end_dates[i]
-                ]
-
-                trendline_data = pd.DataFrame()
-                trendline_data_layer_thickness = pd.DataFrame()
-
                 # for location Langeweide (LW) we only want to use
                 # the data from 2023
                 # if location == "LW":
                 #     extensometer_data = extensometer_data.loc["2023":]
                 #     layer_thickness_data = layer_thickness_data.loc["2023":]
 
-                for anchor in extensometer_data_period:
-                    # print(f"Analysing anchor {anchor}")
-
-                    # if (location == "HZW") and (anchor == "260 cm bs"):
-                    #     continue
-
-                    p, x, r2, slope = get_trendline(
-                        extensometer_data_period[anchor], months=trendline_months
-                    )
-
-                    # print(f"R2 = {r2}")
-                    # print(f"Slope = {slope}")
-
-                    if trendline_data.empty:
-                        trendline_data = pd.DataFrame(
-                            data={anchor: [slope, r2]},
-                            index=["Slope (mm/jaar)", "R2"],
-                        )
-                    else:
-                        trendline_data[anchor] = [slope, r2]
-
-                for layer in layer_thickness_data_period:
-
-                    p, x, r2, slope = get_trendline(
-                        layer_thickness_data_period[layer], months=trendline_months
-                    )
-
-                    if trendline_data_layer_thickness.empty:
-                        trendline_data_layer_thickness = pd.DataFrame(
-                            data={layer: [slope, r2]},
-                            index=["Slope (mm/jaar)", "R2"],
-                        )
-                    else:
-                        trendline_data_layer_thickness[layer] = [slope, r2]
-
-                trendline_data = trendline_data.T
-                trendline_data_layer_thickness = trendline_data_layer_thickness.T
+                trendline_data = compute(
+                    "trendlines",
+                    location,
+                    plot_type,
+                    months=trendline_months,
+                    start=start_dates[i],
+                    end=end_dates[i],
+                )[["Slope (mm/jaar)", "R2"]]
+
+                trendline_data_layer_thickness = compute(
+                    "layer thickness trendlines",
+                    location,
+                    plot_type,
+                    months=trendline_months,
+                    start=start_dates[i],
+                    end=end_dates[i],
+                )[["Slope (mm/jaar)", "R2"]]
 
                 trendline_data["Contribution to subsidence (%)"] = (
                     trendline_data["Slope (mm/jaar)"]
@@ -635,8 +618,13 @@ if __name__ == "__main__":
             writer_trendline.sheets[location_fullname].set_column(9, 9, 30)
             writer_trendline.sheets[location_fullname].set_column(10, 10, 10)
 
-    if write_yearly_stats:
-        writer.close()
+        # the results of this location are not used for the next locations
+        clear_results(location)
 
-    if write_trendline_stats:
-        writer_trendline.close()
+    # the workbooks are written when they are closed
+    with span("stats.write_export"):
+        if write_yearly_stats:
+            writer.close()
+
+        if write_trendline_stats:
+            writer_trendline.close()
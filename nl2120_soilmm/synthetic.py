@@ -0,0 +1,534 @@
+import argparse
+import csv
+import json
+import time
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from nl2120_soilmm.interim import write_interim
+from nl2120_soilmm.sites import (
+    DATA_ROOT_VARIABLE,
+    data_path,
+    get_extra_sites_path,
+    get_interim_dir,
+    get_interim_path,
+    get_workbook_path,
+    register_site,
+)
+
+SYNTHETIC_DIR = "n:/Synthetic/Extensometers"
+# a lithology workbook per prefix of the location codes
+LITHOLOGY_SYNTHETIC = "n:/Synthetic/Lithologie en ankerdiepten {prefix}.xlsx"
+
+# the synthetic sites are laid out like the Moordrecht workbooks: anchors on the
+# "Ext" sheet, groundwater wells, hydraulic head and ditch level on the "PB"
+# sheet, surface level and filter levels on the "cal" sheet
+HEADER_ROW = 6
+FIRST_ROW = 10
+WELL_COLUMNS = ["B", "C", "D"]
+HYDRAULIC_HEAD_COLUMN = "D"
+DITCH = ("F", "G", [0, 1, 2, 3, 4, 6, 7])
+SURFACE_LEVEL_CELL = "C21"
+FILTER_DEPTH_ROWS = (32, 33)
+
+# soil types of the peat and clay layers, the profile ends in sand
+SOILTYPES = ["klei", "klei, humeus", "veen", "veen, kleiig", "gyttja"]
+
+
+def get_synthetic_site(location, n_anchors, prefix="S"):
+    """Registry entry of a synthetic location (see register_site)."""
+
+    last_anchor_column = chr(ord("G") + n_anchors - 1)
+
+    return {
+        "fullname": f"Synthetic-{location}",
+        "site": {
+            "series": "moordrecht",
+            "workbook": f"{SYNTHETIC_DIR}/{location}.xlsm",
+            "anchor_columns": ["G", last_anchor_column],
+            "surface_level_cell": SURFACE_LEVEL_CELL,
+            "filter_depth_rows": list(FILTER_DEPTH_ROWS),
+            "hydraulic_head_column": HYDRAULIC_HEAD_COLUMN,
+            "ditch": list(DITCH),
+            "gwlevels_interim": True,
+            "lithology_workbook": LITHOLOGY_SYNTHETIC.format(prefix=prefix),
+            "soilprofile_sheet": location,
+        },
+    }
+
+
+def generate_site_data(
+    n_anchors=6, years=3, interval="15min", start="2022-01-01", rng=None
+):
+    """
+    Logger series of a synthetic site. The groundwater level follows the
+    seasons, the shallow anchors move with the groundwater level and subside,
+    and the loggers have a few gaps.
+
+    Parameters:
+    - n_anchors: Number of anchors (at most 20).
+    - years: Length of the series in years.
+    - interval: Logging interval (e.g., "15min").
+    - start: First timestamp.
+    - rng: numpy random Generator.
+
+    Returns:
+    - Dictionary with the anchor depths (m-mv), the surface level and the top
+      and bottom of the filters (m NAP), the soil profile, and DataFrames with
+      the anchor movement (mm), groundwater levels (m NAP) and ditch level
+      (m NAP, hourly).
+    """
+
+    if not 2 <= n_anchors <= 20:
+        raise ValueError("The number of anchors should be between 2 and 20")
+
+    rng = rng or np.random.default_rng()
+
+    index = pd.date_range(
+        start,
+        pd.Timestamp(start) + pd.DateOffset(years=years),
+        freq=interval,
+        inclusive="left",
+    )
+    t = ((index - index[0]) / pd.Timedelta(days=365.25)).to_numpy()
+
+    def noise(scale, smoothness=0.999):
+        # random walk that is pulled back to zero
+        steps = rng.normal(0, scale, len(index))
+        steps[0] = 0
+        walk = pd.Series(steps).ewm(alpha=1 - smoothness, adjust=False).mean()
+        return walk.to_numpy() * 30
+
+    surface_level = rng.uniform(-2.5, -0.5)
+    season = np.sin(2 * np.pi * (t - 0.1))
+
+    phreatic = surface_level - 0.5 - 0.3 * season + noise(0.01)
+    middepth = 0.7 * phreatic + 0.3 * (surface_level - 1.0) + noise(0.005)
+    deep = surface_level - 1.2 - 0.1 * season + noise(0.003)
+
+    groundwater = pd.DataFrame(
+        np.column_stack([phreatic, middepth, deep]), index=index, columns=WELL_COLUMNS
+    )
+
+    soilprofile_depth = round(rng.uniform(4, 12), 2)
+    depths = np.sort(rng.uniform(0.3, soilprofile_depth - 0.2, n_anchors - 1))
+    depths = np.round(np.concatenate([[0.06], depths]), 2)
+    depths = np.maximum.accumulate(depths + np.arange(n_anchors) * 0.01)
+
+    # anchor movement in mm: swelling and shrinking with the groundwater level
+    # and subsidence, both decreasing with depth
+    movement = np.column_stack(
+        [
+            np.exp(-depth / 1.5) * (40 * (phreatic - phreatic.mean()) - 8 * t)
+            + noise(0.02)
+            for depth in depths
+        ]
+    )
+    movement -= movement[0]
+
+    extensometer = pd.DataFrame(
+        movement, index=index, columns=[f"{depth:.2f} m" for depth in depths]
+    )
+
+    ditch = (
+        pd.Series(surface_level - 0.4 - 0.1 * season + noise(0.002), index=index)
+        .resample("h")
+        .first()
+    )
+
+    # logger gaps of a few days
+    for _ in range(years * 2):
+        gap_start = rng.integers(len(index))
+        gap = slice(gap_start, gap_start + rng.integers(24, 24 * 7))
+        extensometer.iloc[gap] = np.nan
+        groundwater.iloc[gap] = np.nan
+
+    filter_tops = surface_level - np.array([0.5, 1.5, 4.0])
+    filter_bottoms = filter_tops - 0.5
+
+    # layers of at least 20 cm down to the bottom of the profile, in cm
+    boundaries = np.sort(
+        rng.uniform(20, soilprofile_depth * 100 - 20, rng.integers(2, 6))
+    )
+    boundaries = np.round(np.concatenate([[0], boundaries, [soilprofile_depth * 100]]))
+    soiltypes = list(rng.choice(SOILTYPES, len(boundaries) - 2)) + ["zand"]
+
+    return {
+        "anchor depths": depths,
+        "surface level": surface_level,
+        "filter tops": filter_tops,
+        "filter bottoms": filter_bottoms,
+        "soilprofile depth": soilprofile_depth,
+        "lithology": pd.DataFrame(
+            {
+                "lithologie": soiltypes,
+                "bovengrens [cm]": boundaries[:-1],
+                "ondergrens [cm]": boundaries[1:],
+            }
+        ),
+        "extensometer": extensometer,
+        "groundwater": groundwater,
+        "ditch": ditch,
+    }
+
+
+def write_rows(sheet, header, rows):
+    """Write the header at HEADER_ROW and the rows from FIRST_ROW onwards."""
+
+    for row in range(1, FIRST_ROW):
+        sheet.append(header if row == HEADER_ROW else [])
+
+    for row in rows:
+        sheet.append(row)
+
+
+def get_column_position(letter):
+    return ord(letter) - 65
+
+
+def write_workbook(path_to_workbook, site_data):
+    """
+    Write a logger workbook in the layout of the Moordrecht workbooks, with the
+    "Ext", "PB" and "cal" sheets.
+    """
+
+    path_to_workbook.parent.mkdir(parents=True, exist_ok=True)
+
+    wb = openpyxl.Workbook(write_only=True)
+
+    # anchors in mm, from column G onwards
+    extensometer = site_data["extensometer"]
+    offset = get_column_position("G")
+    empty = [None] * (offset - 1)
+
+    write_rows(
+        wb.create_sheet("Ext"),
+        ["tijd"] + empty + list(extensometer.columns),
+        (
+            [timestamp.to_pydatetime()]
+            + empty
+            + [None if np.isnan(v) else v for v in values]
+            for timestamp, values in zip(extensometer.index, extensometer.to_numpy())
+        ),
+    )
+
+    # groundwater wells in m NAP, the ditch level is logged separately
+    groundwater = site_data["groundwater"]
+    ditch = site_data["ditch"]
+    ditch_time, ditch_level, _ = DITCH
+    gap = [None] * (get_column_position(ditch_time) - len(WELL_COLUMNS) - 1)
+
+    header = ["tijd"] + [f"PB{nr + 1}" for nr in range(len(WELL_COLUMNS))]
+    header += gap + ["Sloot"]
+
+    sheet = wb.create_sheet("PB")
+    for row in range(1, FIRST_ROW):
+        match row:
+            case _ if row == HEADER_ROW:
+                sheet.append(header)
+            case _ if row == FIRST_ROW - 1:
+                # header of the ditch level table
+                sheet.append([None] * (len(header) - 1) + ["tijd", "Waterstand"])
+            case _:
+                sheet.append([])
+
+    ditch_rows = list(zip(ditch.index, ditch.to_numpy()))
+
+    for i, (timestamp, values) in enumerate(
+        zip(groundwater.index, groundwater.to_numpy())
+    ):
+        row = [timestamp.to_pydatetime()] + [None if np.isnan(v) else v for v in values]
+        if i < len(ditch_rows):
+            row += gap + [ditch_rows[i][0].to_pydatetime(), ditch_rows[i][1]]
+        sheet.append(row)
+
+    # surface level and the top and bottom of the filters in m NAP
+    column, row = SURFACE_LEVEL_CELL[0], int(SURFACE_LEVEL_CELL[1:])
+    row_top, row_bottom = FILTER_DEPTH_ROWS
+
+    cal = {row: {column: site_data["surface level"]}}
+    cal[row_top] = dict(zip(WELL_COLUMNS, site_data["filter tops"]))
+    cal[row_bottom] = dict(zip(WELL_COLUMNS, site_data["filter bottoms"]))
+
+    sheet = wb.create_sheet("cal")
+    for row in range(1, max(cal) + 1):
+        values = cal.get(row, {})
+        sheet.append(
+            [values.get(chr(65 + position)) for position in range(26)] if values else []
+        )
+
+    wb.save(path_to_workbook)
+
+
+def write_lithology_workbook(path_to_workbook, soilprofiles):
+    """
+    Write the lithology workbook with a sheet per location, with the
+    lithology and the anchors like the sheets read_soilprofile expects.
+    """
+
+    path_to_workbook.parent.mkdir(parents=True, exist_ok=True)
+
+    with pd.ExcelWriter(path_to_workbook) as writer:
+        for location, site_data in soilprofiles.items():
+            depths = site_data["anchor depths"]
+
+            anchors = pd.DataFrame(
+                {
+                    "anker": [f"anker {nr + 1}" for nr in range(len(depths))],
+                    "m-mv": -depths,
+                    "m NAP": site_data["surface level"] - depths,
+                }
+            )
+
+            pd.concat([site_data["lithology"], anchors], axis=1).to_excel(
+                writer, sheet_name=location, index=False
+            )
+
+
+def write_interim_data(location, site_data):
+    """
+    Write the interim files of a location from the synthetic series, as the
+    preprocessing (see ingest_workbook) would write them from the workbook.
+    """
+
+    extensometer = site_data["extensometer"].resample("h").mean()
+    extensometer.columns = [f"{column}-mv" for column in extensometer.columns]
+    extensometer.index.name = "tijd"
+    write_interim(extensometer, get_interim_path(location, "extensometer"))
+
+    groundwater = site_data["groundwater"].resample("h").mean() * 100
+    groundwater.index.name = "tijd"
+
+    gwlevels = groundwater.copy()
+    gwlevels.columns = [f"Waterstand PB{nr + 1}" for nr in range(len(WELL_COLUMNS))]
+    write_interim(gwlevels, get_interim_path(location, "gwlevels"))
+
+    hydraulic_head = groundwater[[HYDRAULIC_HEAD_COLUMN]]
+    hydraulic_head.columns = ["Waterstand"]
+    write_interim(hydraulic_head, get_interim_path(location, "hydraulic_head"))
+
+    ditch = (site_data["ditch"].dropna() * 100).to_frame("Waterstand")
+    ditch.index.name = "tijd"
+    write_interim(ditch, get_interim_path(location, "ditch_level"))
+
+    with open(get_interim_path(location, "surface_level"), "w+", encoding="UTF8") as f:
+        csv.writer(f).writerows([[site_data["surface level"]]])
+
+    with open(
+        get_interim_path(location, "filterdepths"), "w+", encoding="UTF8", newline=""
+    ) as f:
+        csv.writer(f).writerows(
+            zip(site_data["filter tops"], site_data["filter bottoms"])
+        )
+
+
+def generate_sites(
+    n_sites,
+    n_anchors=6,
+    years=3,
+    interval="15min",
+    start="2022-01-01",
+    interim=False,
+    workbooks=True,
+    seed=0,
+    prefix="S",
+):
+    """
+    Write synthetic sites in the layouts of the real data: a logger workbook
+    per site, a lithology workbook with a sheet per site and, with
+    interim=True, the interim files. The sites are added to sites.json in the
+    data root, so they are in the registry of every process that uses the same
+    data root (see load_extra_sites).
+
+    Parameters:
+    - n_sites: Number of sites, named S001, S002, ... (see prefix)
+    - n_anchors: Number of anchors per site.
+    - years: Length of the logger series in years.
+    - interval: Logging interval of the workbooks (e.g., "15min").
+    - start: First timestamp of the logger series.
+    - interim: Also write the interim files, so the analysis and figures can be
+      run without preprocessing the workbooks.
+    - workbooks: Write the logger workbooks. Writing them with openpyxl takes
+      most of the time, leave them out to only time the analysis and figures.
+    - seed: Seed of the random numbers, the same seed gives the same sites.
+    - prefix: Prefix of the location codes, sites with another prefix are kept.
+      The sites of an earlier run with the same prefix are replaced, as they
+      share the lithology workbook.
+
+    Returns:
+    - List with the short codes of the sites.
+    """
+
+    path_to_sites = get_extra_sites_path()
+
+    if not (workbooks or interim):
+        raise ValueError("Write the workbooks, the interim files or both")
+
+    if path_to_sites is None:
+        raise ValueError(
+            f"Set {DATA_ROOT_VARIABLE} to a local folder to write synthetic sites."
+        )
+
+    rng = np.random.default_rng(seed)
+
+    path_to_lithology = LITHOLOGY_SYNTHETIC.format(prefix=prefix)
+
+    extra_sites = {}
+    if path_to_sites.exists():
+        with open(path_to_sites, encoding="UTF8") as f:
+            extra_sites = json.load(f)
+
+    # the lithology workbook of the prefix is written again with only the new
+    # sites, so the sites of an earlier run would miss their sheets
+    extra_sites = {
+        location: entry
+        for location, entry in extra_sites.items()
+        if entry["site"].get("lithology_workbook") != path_to_lithology
+    }
+
+    soilprofiles = {}
+
+    for nr in range(1, n_sites + 1):
+        location = f"{prefix}{nr:03d}"
+
+        start_time = time.perf_counter()
+
+        site_data = generate_site_data(n_anchors, years, interval, start, rng)
+
+        entry = get_synthetic_site(location, n_anchors, prefix)
+        entry["constants"] = {
+            "extensometer_depths": [
+                f"{depth:.2f} m-mv" for depth in site_data["anchor depths"]
+            ],
+            "soilprofile_depth": site_data["soilprofile depth"],
+            "pb_columns": WELL_COLUMNS,
+            "hydraulic_head": f"{location}_hydraulic_head",
+            "ditch": f"{location}_ditch_level",
+        }
+
+        register_site(location, entry)
+        extra_sites[location] = entry
+
+        if workbooks:
+            write_workbook(get_workbook_path(location), site_data)
+
+        get_interim_dir(location).mkdir(parents=True, exist_ok=True)
+
+        if interim:
+            write_interim_data(location, site_data)
+
+        soilprofiles[location] = site_data
+
+        print(
+            f"Generated {location} with {len(site_data['extensometer'])} rows "
+            f"in {time.perf_counter() - start_time:.1f} s"
+        )
+
+    if soilprofiles:
+        write_lithology_workbook(data_path(path_to_lithology), soilprofiles)
+
+    path_to_sites.parent.mkdir(parents=True, exist_ok=True)
+    with open(path_to_sites, "w", encoding="UTF8") as f:
+        json.dump(extra_sites, f, indent=1)
+
+    return list(soilprofiles)
+
+
+def run_chain(locations, workers=None, preprocess=True):
+    """
+    Run the preprocessing, the analysis and the figures of a set of locations,
+    e.g. synthetic sites, and time each stage.
+
+    Parameters:
+    - locations: Short codes of the locations.
+    - workers: Number of worker processes of the preprocessing and figures.
+    - preprocess: Preprocess the logger workbooks, otherwise the existing
+      interim files are used.
+
+    Returns:
+    - Series with the time in seconds of each stage and the number of sites.
+    """
+
+    from nl2120_soilmm.pipeline import compute
+    from nl2120_soilmm.preprocessing.driver import run_preprocessing
+    from nl2120_soilmm.visualisation.render import get_jobs, render
+
+    timings = {"sites": len(locations)}
+
+    if preprocess:
+        start = time.perf_counter()
+        summary = run_preprocessing(locations, max_workers=workers)
+        timings["preprocessing [s]"] = time.perf_counter() - start
+
+        failed = summary.index[summary["status"] == "failed"].to_list()
+        if failed:
+            raise RuntimeError(f"Preprocessing failed for {failed}")
+
+    start = time.perf_counter()
+    for location in locations:
+        compute("yearly stats", location)
+        compute("trendlines", location)
+    timings["stats [s]"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    figures = render(
+        get_jobs(["soil movement"], locations, variants=["english"]),
+        workers=workers,
+        path_to_timings=None,
+    )
+    timings["figures [s]"] = time.perf_counter() - start
+
+    failed = figures.loc[figures["error"].notna(), "location"].to_list()
+    if failed:
+        raise RuntimeError(f"The figures failed for {failed}")
+
+    return pd.Series(timings)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Write synthetic sites to the data root (NL2120_SOILMM_DATA_ROOT) and "
+            "optionally run the preprocessing, analysis and figures on them."
+        )
+    )
+    parser.add_argument("--sites", type=int, default=1)
+    parser.add_argument("--anchors", type=int, default=6)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--interval", default="15min")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--interim", action="store_true", help="also write the interim files"
+    )
+    parser.add_argument(
+        "--no-workbooks",
+        action="store_true",
+        help="only write the interim files, not the logger workbooks",
+    )
+    parser.add_argument(
+        "--run", action="store_true", help="run the chain and print the timings"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    locations = generate_sites(
+        args.sites,
+        n_anchors=args.anchors,
+        years=args.years,
+        interval=args.interval,
+        interim=args.interim or args.no_workbooks,
+        workbooks=not args.no_workbooks,
+        seed=args.seed,
+    )
+
+    if args.run:
+        print(
+            run_chain(
+                locations,
+                workers=args.workers,
+                preprocess=not (args.interim or args.no_workbooks),
+            )
+        )
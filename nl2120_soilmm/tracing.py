@@ -0,0 +1,281 @@
+import argparse
+import contextlib
+import functools
+import inspect
+import json
+from multiprocessing.util import Finalize, register_after_fork
+import os
+from pathlib import Path
+import threading
+import time
+
+import pandas as pd
+
+# Set this environment variable to a folder to record spans in every process
+# (including the worker processes of the preprocessing and render drivers).
+# Each process writes its spans to trace_<pid>.json in the folder when it exits.
+TRACE_DIR_VARIABLE = "NL2120_SOILMM_TRACE_DIR"
+
+TRACE_DIR = os.environ.get(TRACE_DIR_VARIABLE)
+
+# whether spans are recorded, and the finished spans of this process as Chrome
+# trace events
+STATE = {"enabled": TRACE_DIR is not None, "events": []}
+
+# the open spans per thread, the innermost span last
+local = threading.local()
+
+# functions called when a span starts, with the new span and the open spans,
+# and when it ends, with the span, the open spans, its name and tags. The end
+# hooks return values that are stored with the span (see memory.py).
+HOOKS = {"start": [], "end": []}
+
+# wall clock time (us) at a perf_counter reading, so the spans of several
+# processes can be put on one time axis
+ORIGIN = (time.time_ns() // 1000, time.perf_counter_ns() // 1000)
+
+
+def enable():
+    """Start recording spans in this process."""
+    STATE["enabled"] = True
+
+
+def disable():
+    STATE["enabled"] = False
+
+
+def clear():
+    """Remove the recorded spans of this process."""
+    STATE["events"].clear()
+
+
+def get_stack():
+    if not hasattr(local, "stack"):
+        local.stack = []
+
+    return local.stack
+
+
+def now():
+    wall, perf = ORIGIN
+    return wall + time.perf_counter_ns() // 1000 - perf
+
+
+# returned by span when tracing is disabled
+NO_SPAN = contextlib.nullcontext()
+
+
+def span(name, **tags):
+    """
+    Record the time spent in a block of code as a span, nested in the span
+    that is open in the same thread. Nothing is recorded when tracing is
+    disabled.
+
+    Parameters:
+    - name: Name of the span (e.g., "render.savefig").
+    - tags: Values stored with the span (e.g., location="ZEG", plot_type="RF").
+    """
+
+    if not STATE["enabled"]:
+        return NO_SPAN
+
+    return recorded_span(name, tags)
+
+
+@contextlib.contextmanager
+def recorded_span(name, tags):
+    stack = get_stack()
+    record = {"bytes": 0, "children": 0}
+
+    for hook in HOOKS["start"]:
+        hook(record, stack)
+
+    stack.append(record)
+
+    start = now()
+    try:
+        yield
+    finally:
+        duration = now() - start
+        stack.pop()
+
+        measured = {}
+        for hook in HOOKS["end"]:
+            measured.update(hook(record, stack, name, tags))
+
+        if stack:
+            stack[-1]["children"] += duration
+            stack[-1]["bytes"] += record["bytes"]
+
+        STATE["events"].append(
+            {
+                "name": name,
+                "cat": name.split(".")[0],
+                "ph": "X",
+                "ts": start,
+                "dur": duration,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {
+                    **{tag: str(value) for tag, value in tags.items()},
+                    "bytes": record["bytes"],
+                    "self [us]": duration - record["children"],
+                    "depth": len(stack),
+                    **measured,
+                },
+            }
+        )
+
+
+def traced(name=None, tags=("location", "plot_type")):
+    """
+    Decorator that records each call of a function as a span (see span). When
+    tracing is disabled the function is called directly.
+
+    Parameters:
+    - name: Name of the span, the module and name of the function by default
+      (e.g., "read.read_extensometer").
+    - tags: Arguments of the function that are stored with the span.
+    """
+
+    def decorator(function):
+        module = function.__module__.removeprefix("nl2120_soilmm.")
+        span_name = name or f"{module}.{function.__name__}"
+
+        signature = inspect.signature(function)
+        tagged = [tag for tag in tags if tag in signature.parameters]
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not STATE["enabled"]:
+                return function(*args, **kwargs)
+
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+
+            with span(span_name, **{tag: arguments.arguments[tag] for tag in tagged}):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_file(path):
+    """Add the size of a file that is read to the open span."""
+    if not STATE["enabled"]:
+        return
+
+    stack = get_stack()
+    if not stack:
+        return
+
+    try:
+        stack[-1]["bytes"] += os.path.getsize(path)
+    except OSError:
+        pass
+
+
+def get_events():
+    """Spans recorded in this process (and not in a parent it was forked from)."""
+    pid = os.getpid()
+    return [event for event in STATE["events"] if event["pid"] == pid]
+
+
+def save_trace(path_to_trace, events=None):
+    """
+    Write spans as a Chrome trace, which can be opened in chrome://tracing or
+    https://ui.perfetto.dev.
+    """
+
+    events = get_events() if events is None else events
+
+    path_to_trace = Path(path_to_trace)
+    path_to_trace.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path_to_trace, "w", encoding="UTF8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def load_traces(trace_dir):
+    """Spans of all processes that wrote a trace to a folder."""
+    events = []
+
+    for path_to_trace in sorted(Path(trace_dir).glob("trace_*.json")):
+        with open(path_to_trace, encoding="UTF8") as f:
+            events += json.load(f)["traceEvents"]
+
+    return events
+
+
+def summarize(events=None):
+    """
+    Time per span name, e.g. to see whether a refresh spends its time reading
+    files, parsing workbooks, resampling, fitting trendlines or saving figures.
+
+    Returns:
+    - DataFrame with per span name the number of calls, the total time (s), the
+      time spent outside nested spans (self, s), the mean time (s) and the
+      megabytes read, sorted by the self time.
+    """
+
+    events = get_events() if events is None else events
+
+    if not events:
+        return pd.DataFrame()
+
+    spans = pd.DataFrame(
+        {
+            "name": [event["name"] for event in events],
+            "total [s]": [event["dur"] / 1e6 for event in events],
+            "self [s]": [event["args"]["self [us]"] / 1e6 for event in events],
+            "read [MB]": [event["args"]["bytes"] / 2**20 for event in events],
+        }
+    )
+
+    summary = spans.groupby("name").agg(
+        calls=("total [s]", "size"),
+        **{
+            "total [s]": ("total [s]", "sum"),
+            "self [s]": ("self [s]", "sum"),
+            "mean [s]": ("total [s]", "mean"),
+            "read [MB]": ("read [MB]", "sum"),
+        },
+    )
+
+    return summary.sort_values("self [s]", ascending=False)
+
+
+def save_process_trace():
+    events = get_events()
+    if events:
+        save_trace(Path(TRACE_DIR, f"trace_{os.getpid()}.json"), events)
+
+
+def register_trace_writer(*args):
+    # runs when the process exits, also in the worker processes of a pool
+    Finalize(None, save_process_trace, exitpriority=0)
+
+
+if TRACE_DIR is not None:
+    register_trace_writer()
+    # forked worker processes do not inherit the finalizers of the parent
+    register_after_fork(register_trace_writer, register_trace_writer)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Merge the traces that the processes wrote to a folder (see "
+            f"{TRACE_DIR_VARIABLE}) into trace.json and print the time per span."
+        )
+    )
+    parser.add_argument("trace_dir", type=Path, nargs="?", default=TRACE_DIR)
+    args = parser.parse_args()
+
+    events = load_traces(args.trace_dir)
+    save_trace(args.trace_dir.joinpath("trace.json"), events)
+
+    with pd.option_context("display.width", 200):
+        print(summarize(events).to_string(float_format="{:.3f}".format))
@@ -2,8 +2,8 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib import dates as mdates
+from matplotlib.lines import Line2D
 from collections import OrderedDict
-from pathlib import Path
 
 # import cmocean
 
@@ -21,86 +21,185 @@ from nl2120_soilmm.constants import (
     LOCATION_FULLNAMES,
     SOILPROFILE_DEPTHS,
     SOILTYPES_COLORS,
+    SOILTYPES_COLORS_DUTCH,
 )
+from nl2120_soilmm.sites import BODEMBEWEGING_DIR, data_path, get_site
+from nl2120_soilmm.tracing import traced
 
 from nl2120_soilmm.old_scripts.stats import get_trendline
 
-#################################################################
-# Parameters
-#################################################################
-
-# locations = ["HZW"]  # "BKG"]  #
-# locations = ["ALB", "ASD", "ROU", "ZEG", "VLI", "DEM", "LW", "VEG", "ZH"]
-# locations = ["ZEG"]
-locations = ["ROU"]
-# locations = ["M4T", "MMW", "MSW"]
-# locations = ["VEG"]
-plot_type = "RF"
-plot_names = {
-    "RF": "Reference",
-    "MP": "Pressurized subsurface infiltration",
-    "MS": "Subsubsurface infiltration",
+# the variants of the figure, with their texts and options
+VARIANTS = {
+    "english": {
+        "language": "english",
+        "plot names": {
+            "RF": "Reference",
+            "MP": "Pressurized subsurface infiltration",
+            "MS": "Subsubsurface infiltration",
+        },
+        "rename anchors": False,
+        "trendlines": False,
+        "surface level": "Surface level",
+        "filters": [
+            "Shallow filter 'phreatic'",
+            "Mid-depth filter",
+            "Deep filter 'aquifer'",
+        ],
+        "filter label": "filter depth: {bottom:.0f} - {top:.0f} cm below surface",
+        "filter label locations": ["MMW", "M4T", "MSW"],
+        "ditch level": "Ditch water level",
+        "ditch color": "darkturquoise",
+        "anchor title": "Anchor height",
+        "layer title": "Layer thickness",
+        "groundwater title": "Groundwater level",
+        "anchor ylabel": "Change in height (cm)",
+        "layer ylabel": "Change in thickness (cm)",
+        "groundwater ylabel": "Groundwater level relative\n to NAP (cm)",
+        "soil composition": "Soil composition",
+        "soiltype colors": SOILTYPES_COLORS,
+        "key orders": {
+            "GOU": ["sand", "organic sand", "clay", "organic clay", "peat"],
+            "M4T": ["clay", "organic clay", "peat", "peat, clayey", "sand"],
+            "MMW": ["clay", "organic clay", "peat", "gyttja", "sand"],
+            "MSW": ["clay", "peat", "peat, clayey", "gyttja", "sand"],
+        },
+        "anchor marker": None,
+        "soil types": "Soil types:",
+        "depth ylabel": "cm below surface level",
+        "suffix": "",
+    },
 }
-plot_name = plot_names[plot_type]
 
-trendline_months = (1, 2)
+VARIANTS["dutch"] = VARIANTS["english"] | {
+    "language": "dutch",
+    # the Dutch figures only have the name of the location as title
+    "plot names": None,
+    "rename anchors": True,
+    "surface level": "Maaiveldhoogte",
+    "filters": [
+        "Freatische grondwaterstand",
+        "Middendiep filter",
+        "Stijghoogte",
+    ],
+    "filter label": "filter diepte: {bottom:.0f} - {top:.0f} cm-mv",
+    "ditch level": "Slootpeil",
+    "ditch color": "blueviolet",
+    "anchor title": "Verticale beweging ankers",
+    "layer title": "Laagdikteverandering",
+    "groundwater title": "Waterdruk",
+    "anchor ylabel": "Hoogteverandering\nt.o.v. start meting (cm)",
+    "layer ylabel": "Laagdikteverandering\nt.o.v. start meting (cm)",
+    "groundwater ylabel": "Grondwaterstand (cm NAP)",
+    "soil composition": "Bodemopbouw",
+    "soiltype colors": SOILTYPES_COLORS_DUTCH,
+    "key orders": {
+        "M4T": ["klei", "klei, humeus", "veen", "veen, kleiig", "zand"],
+        "MMW": ["klei", "klei, humeus", "veen", "gyttja", "zand"],
+        "MSW": ["klei", "veen", "veen, kleiig", "gyttja", "zand"],
+    },
+    "anchor marker": "anker",
+    "soil types": "Bodemtypes:",
+    "depth ylabel": "cm-mv",
+    "suffix": "_Nederlands_nl2120",
+}
+
+# the Dutch figures of the restveengebied (M4T, MMW, MSW)
+VARIANTS["restveengebied"] = VARIANTS["dutch"] | {
+    # all wells are labelled with their filter depth
+    "filter label locations": None,
+    "anchor ylabel": "Hoogteverandering t.o.v. T0 (cm)",
+    "layer ylabel": "Laagdikteverandering t.o.v. T0 (cm)",
+    "anchor marker": None,
+    "soil types": "Soil types:",
+    "suffix": "_Nederlands_test",
+}
 
-for location in locations:
+# colors of the groundwater wells, from shallow to deep
+GROUNDWATER_COLORS = ["#90e0ef", "#00b4d8", "#0077b6", "#03045e"]
+
+# locations without plot types, the plot type is left out of the title and file name
+LOCATIONS_WITHOUT_PLOT_TYPE = [
+    "DEM",
+    "LW",
+    "VEG",
+    "ZH",
+    "GDA",
+    "BKW",
+    "BKG",
+    "CBW",
+    "HZW",
+    "MMW",
+    "M4T",
+    "MSW",
+    "HGM",
+    "HGG",
+    "HGR",
+]
+
+
+@traced()
+def load_soil_movement_data(location, plot_type="RF"):
+    """
+    Read the data of the soil movement figure of a location. The data does
+    not depend on the variant, so it is read once for all variants of the
+    figure.
+
+    Returns:
+    - Dictionary with the extensometer and layer thickness data, groundwater
+      and ditch levels, surface level, filter depths and the soil profile (with
+      the soil types in English and Dutch).
+    """
 
     location_fullname = LOCATION_FULLNAMES[location]
-    print(f"Plotting data for location: {location_fullname}")
 
-    #################################################################
-    # read data
-    #################################################################
+    data = {"lithology": {}, "anchors": None}
 
     if location in SOILPROFILE_DEPTHS.keys():
-        soilprofile_depth = SOILPROFILE_DEPTHS[location]
-        if location in [
-            "ALB",
-            "ASD",
-            "ROU",
-            "VLI",
-            "ZEG",
-            "DEM",
-            "LW",
-            "VEG",
-            "ZH",
-            "BKW",
-            "BKG",
-            "CBW",
-            "HZW",
-            "ROU09",
-            "M4T",
-            "MMW",
-            "MSW",
-        ]:
-            soilprofile_lithology, soilprofile_anchors = read_soilprofile(
-                location, location_fullname, plot_type=plot_type
-            )
-        elif location in ["GDA"]:
-            soilprofile_lithology, soilprofile_anchors = read_soilprofile_regiodeal(
-                location, location_fullname
-            )
+        for language in ["english", "dutch"]:
+            # the soil profile is read from the lithology workbook of the site
+            if get_site(location)["soilprofile_sheet"] is not None:
+                lithology, data["anchors"] = read_soilprofile(
+                    location, location_fullname, plot_type=plot_type, language=language
+                )
+            elif location in ["GDA"]:
+                lithology, data["anchors"] = read_soilprofile_regiodeal(
+                    location, location_fullname
+                )
+            else:
+                continue
+
+            data["lithology"][language] = lithology
 
     extensometer_data = read_extensometer(location, plot_type=plot_type)
-    groundwater_data = read_gwlevel(location, plot_type=plot_type)
-    ditch_level_data = read_ditch_level(location, plot_type=plot_type)
 
-    surface_level = read_surface_level(location, plot_type=plot_type)
+    # not all locations have groundwater wells and a ditch (e.g., Hegewarren)
+    try:
+        data["groundwater"] = read_gwlevel(location, plot_type=plot_type)
+    except KeyError:
+        data["groundwater"] = pd.DataFrame()
+
+    try:
+        ditch_level_data = read_ditch_level(location, plot_type=plot_type)
+    except KeyError:
+        ditch_level_data = None
+
+    data["surface level"] = read_surface_level(location, plot_type=plot_type)
 
     try:
         filter_depths = read_filter_depths(location, plot_type=plot_type)
-        filter_depths_mv = surface_level - filter_depths
+        data["filter depths"] = data["surface level"] - filter_depths
 
     except FileNotFoundError:
         print("The filter depths are not found")
+        data["filter depths"] = None
 
     if ditch_level_data is not None:
         ditch_level_data = ditch_level_data.loc[
             extensometer_data.first_valid_index() : extensometer_data.last_valid_index()
         ]
 
+    data["ditch level"] = ditch_level_data
+
     match location:
         case "MSW":
             extensometer_data.loc["2025-11-15":] = np.nan
@@ -109,78 +208,85 @@ for location in locations:
     # calculate layer thicknesses
     ################################################################
 
-    layer_thickness_data = calculate_layer_thickness(extensometer_data)
+    data["extensometer"] = extensometer_data
+    data["layer thickness"] = calculate_layer_thickness(extensometer_data)
 
-    ################################################################
-    # the plot
-    ################################################################
+    return data
 
-    fig, axs = plt.subplots(nrows=3, ncols=2, gridspec_kw={"width_ratios": [4, 1]})
 
-    # some plot attributes
-    colors = plt.cm.viridis_r(np.linspace(0, 1, len(extensometer_data.columns)))
+def rename_anchors(data, spec):
+    """Anchor depths in cm-mv instead of cm bs for the legend, if the spec asks for it."""
+    if not spec["rename anchors"]:
+        return data
+
+    data = data.copy()
+    data.columns = data.columns.str.replace(" bs", "-mv", regex=True)
+
+    return data
+
+
+def set_time_axis(ax, data):
     locator = mdates.AutoDateLocator(minticks=2, maxticks=6)
     formatter = mdates.ConciseDateFormatter(locator)
 
-    # plot the surface level
-    axs[0, 0].text(
-        1.28,
-        1.15,
-        f"Surface level: {surface_level:.0f} cm NAP",
-        fontsize=10,
-        fontweight="bold",
-        ha="center",
-        va="center",
-        transform=axs[0, 0].transAxes,
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(formatter)
+    ax.grid()
+
+    ax.set_xlim(
+        [
+            data["extensometer"].first_valid_index(),
+            data["extensometer"].last_valid_index(),
+        ]
     )
 
-    plot_trendline = False
 
-    print(
-        f"The extensometer depths for {location} are: {extensometer_data.columns.to_list()}"
-    )
+def plot_columns(ax, series_data, location, spec, trendline_months):
+    """Plot the columns of series_data, with trendlines if the spec asks for it."""
+
+    colors = plt.cm.viridis_r(np.linspace(0, 1, len(series_data.columns)))
 
-    for j, column in enumerate(extensometer_data.columns):
+    for j, column in enumerate(series_data.columns):
 
-        # optional, uncomment the two lines below to skip plotting an anchor entirely (also does not plot a trendline)
+        # optional, uncomment the two lines below to skip plotting a column entirely (also does not plot a trendline)
         # if column.isin(["6 cm bs"]):
         #     continue
 
-        extensometer_data_column = extensometer_data[column]
+        series_data_column = series_data[column]
 
-        axs[0, 0].plot(
-            extensometer_data_column,
+        ax.plot(
+            series_data_column,
             label=column,
             color=colors[j],
             linewidth=0.7,
         )
 
-        if plot_trendline:
+        if spec["trendlines"]:
             # if location == "LW":
-            #     extensometer_data_column = extensometer_data_column.loc["2023":]
+            #     series_data_column = series_data_column.loc["2023":]
 
             if location in ["BKG"]:
-                extensometer_data_column_1 = extensometer_data_column.loc[:"2023-09-15"]
-                extensometer_data_column_2 = extensometer_data_column.loc["2023-11-05":]
+                series_data_column_1 = series_data_column.loc[:"2023-09-15"]
+                series_data_column_2 = series_data_column.loc["2023-11-05":]
 
-                extensometer_data_column_1.name = f"{column}_1"
-                extensometer_data_column_2.name = f"{column}_2"
+                series_data_column_1.name = f"{column}_1"
+                series_data_column_2.name = f"{column}_2"
 
-                extensometer_data_columns = pd.concat(
-                    [extensometer_data_column_1, extensometer_data_column_2],
+                series_data_columns = pd.concat(
+                    [series_data_column_1, series_data_column_2],
                     axis="columns",
                 )
             else:
-                extensometer_data_columns = extensometer_data_column.to_frame()
+                series_data_columns = series_data_column.to_frame()
 
-            for column in extensometer_data_columns:
+            for column in series_data_columns:
                 p, x, r_2, slope = get_trendline(
-                    extensometer_data_columns[column].dropna(), months=trendline_months
+                    series_data_columns[column].dropna(), months=trendline_months
                 )
 
-                print(f"The slope of the anchor at {column} is {slope} cm/yr.")
+                print(f"The slope of {column} is {slope} cm/yr.")
 
-                axs[0, 0].plot(
+                ax.plot(
                     x,
                     p(x),
                     linestyle="--",
@@ -188,84 +294,102 @@ for location in locations:
                     linewidth=0.7,
                 )
 
+
+@traced()
+def plot_anchors(ax, data, location, spec, trendline_months=(1, 2)):
+    """Panel with the height of the anchors and the surface level."""
+
+    extensometer_data = rename_anchors(data["extensometer"], spec)
+
+    # plot the surface level
+    ax.text(
+        1.28,
+        1.15,
+        f"{spec['surface level']}: {data['surface level']:.0f} cm NAP",
+        fontsize=10,
+        fontweight="bold",
+        ha="center",
+        va="center",
+        transform=ax.transAxes,
+    )
+
     print(
-        f"The layer thicknesses calculated for {location} are: {layer_thickness_data.columns.to_list()}"
+        f"The extensometer depths for {location} are: {extensometer_data.columns.to_list()}"
     )
 
-    for i, column in enumerate(layer_thickness_data.columns):
+    plot_columns(ax, extensometer_data, location, spec, trendline_months)
+    set_time_axis(ax, data)
 
-        # optional, this skip plotting the anchor entirely (also does not plot a trendline)
-        # if column.isin(["41 cm bs - 6 cm bs"]):
-        #     continue
+    ax.legend(
+        loc="upper center",
+        bbox_to_anchor=(1.25, 0.85),
+    )
 
-        layer_thickness_data_column = layer_thickness_data[column]
+    ax.set_title(spec["anchor title"], fontsize=10)
+    ax.set_ylabel(spec["anchor ylabel"])
 
-        axs[1, 0].plot(
-            layer_thickness_data_column,
-            label=column,
-            color=colors[i],
-            linewidth=0.7,
-        )
+    match location:
+        case "ROU":
+            ax.set_ylim([-8, 8])
+        case _:
+            ax.set_ylim([-6, 6])
 
-        if plot_trendline:
-            # if location == "LW":
-            #     layer_thickness_data_column = layer_thickness_data_column.loc["2023":]
 
-            if location in ["BKG"]:
-                layer_thickness_data_column_1 = layer_thickness_data_column.loc[
-                    :"2023-09-15"
-                ]
-                layer_thickness_data_column_2 = layer_thickness_data_column.loc[
-                    "2023-11-05":
-                ]
-
-                layer_thickness_data_column_1.name = f"{column}_1"
-                layer_thickness_data_column_2.name = f"{column}_2"
-
-                layer_thickness_data_columns = pd.concat(
-                    [layer_thickness_data_column_1, layer_thickness_data_column_2],
-                    axis="columns",
-                )
-            else:
-                layer_thickness_data_columns = layer_thickness_data_column.to_frame()
+@traced()
+def plot_layer_thickness(ax, data, location, spec, trendline_months=(1, 2)):
+    """Panel with the change in thickness of the layers between the anchors."""
 
-            for column in layer_thickness_data_columns:
-                p, x, r_2, slope = get_trendline(
-                    layer_thickness_data_columns[column].dropna(),
-                    months=trendline_months,
-                )
+    layer_thickness_data = rename_anchors(data["layer thickness"], spec)
 
-                print(f"The slope of the layer thickness {column} is {slope} cm/yr.")
+    print(
+        f"The layer thicknesses calculated for {location} are: {layer_thickness_data.columns.to_list()}"
+    )
 
-                axs[1, 0].plot(
-                    x,
-                    p(x),
-                    linestyle="--",
-                    color=colors[i],
-                    linewidth=0.7,
-                )
+    plot_columns(ax, layer_thickness_data, location, spec, trendline_months)
+    set_time_axis(ax, data)
 
-    colors_gw = plt.cm.viridis_r(np.linspace(0, 1, len(groundwater_data.columns)))
-    # colors_gw = cmocean.cm.deep(np.linspace(0, 1, len(groundwater_data.columns)))
-    colors_gw = ["#90e0ef", "#00b4d8", "#03045e"]
-    # colors_gw = ["deepskyblue", "royalblue", "darkblue"]
+    ax.legend(
+        loc="upper center",
+        bbox_to_anchor=(1.3, 0.85),
+    )
+
+    ax.set_title(spec["layer title"], fontsize=10)
+    ax.set_ylabel(spec["layer ylabel"])
+
+    match location:
+        case "ZEG" | "ROU":
+            ax.set_ylim([-5, 5])
+        case _:
+            ax.set_ylim([-2.5, 2.5])
+
+
+@traced()
+def plot_groundwater(ax, data, location, spec, trendline_months=(1, 2)):
+    """Panel with the groundwater levels and the ditch level."""
+
+    groundwater_data = data["groundwater"]
+    filter_depths_mv = data["filter depths"]
 
-    nobv_labeltitles = [
-        "Shallow filter 'phreatic'",
-        "Mid-depth filter",
-        "Deep filter 'aquifer'",
-    ]
+    # colors_gw = cmocean.cm.deep(np.linspace(0, 1, len(groundwater_data.columns)))
+    if len(groundwater_data.columns) > 3:
+        colors_gw = GROUNDWATER_COLORS
+    else:
+        colors_gw = [GROUNDWATER_COLORS[i] for i in [0, 1, 3]]
 
     for i, well in enumerate(groundwater_data):
 
-        match location:
-            case "MMW" | "M4T" | "MSW":
-                top_filter = filter_depths_mv.iloc[i].values[0]
-                bottom_filter = filter_depths_mv.iloc[i].values[-1]
-                labeltitle = f"filter depth: {bottom_filter:.0f} - {top_filter:.0f} cm below surface"
-            case _:
-                labeltitle = nobv_labeltitles[i]
-        axs[2, 0].plot(
+        if (
+            spec["filter label locations"] is None
+            or location in spec["filter label locations"]
+        ):
+            labeltitle = spec["filter label"].format(
+                top=filter_depths_mv.iloc[i].values[0],
+                bottom=filter_depths_mv.iloc[i].values[-1],
+            )
+        else:
+            labeltitle = spec["filters"][i]
+
+        ax.plot(
             groundwater_data[well],
             label=labeltitle,
             color=colors_gw[i],
@@ -273,137 +397,101 @@ for location in locations:
             zorder=1,
         )
 
-    if ditch_level_data is not None:
-        axs[2, 0].plot(
-            ditch_level_data,
-            label="Ditch water level",
-            color="darkturquoise",
+    if data["ditch level"] is not None:
+        ax.plot(
+            data["ditch level"],
+            label=spec["ditch level"],
+            color=spec["ditch color"],
             linewidth=0.7,
             zorder=1,
         )
 
-    for ax in axs[:, 0].flat:
-
-        ax.xaxis.set_major_locator(locator)
-        ax.xaxis.set_major_formatter(formatter)
-        ax.grid()
+    set_time_axis(ax, data)
 
-        ax.set_xlim(
-            [
-                extensometer_data.first_valid_index(),
-                extensometer_data.last_valid_index(),
-            ]
-        )
-
-    handles_ax2, labels_ax2 = axs[2, 0].get_legend_handles_labels()
-
-    axs[0, 0].legend(
-        loc="upper center",
-        bbox_to_anchor=(1.25, 0.85),
-    )
-    axs[1, 0].legend(
-        loc="upper center",
-        bbox_to_anchor=(1.3, 0.85),
-    )
+    handles, _ = ax.get_legend_handles_labels()
 
-    if handles_ax2:
-        axs[2, 0].legend(
+    if handles:
+        ax.legend(
             loc="upper center",
             bbox_to_anchor=(0.45, -0.20),
         )
 
-    axs[0, 0].set_title("Anchor height", fontsize=10)
-    axs[1, 0].set_title("Layer thickness", fontsize=10)
-    axs[2, 0].set_title("Groundwater level", fontsize=10)
-
-    axs[0, 0].set_ylabel("Change in height (cm)")
-    axs[1, 0].set_ylabel("Change in thickness (cm)")
-    axs[2, 0].set_ylabel(
-        "Groundwater level relative\n to NAP (cm)",
-    )
-
-    axs[0, 1].axis("off")
-    axs[1, 1].axis("off")
-
-    match location:
-        case "ZEG":
-            axs[0, 0].set_ylim([-6, 6])
-            axs[1, 0].set_ylim([-5, 5])
-        case "ROU":
-            axs[0, 0].set_ylim([-8, 8])
-            axs[1, 0].set_ylim([-5, 5])
-        case _:
-            axs[0, 0].set_ylim([-6, 6])
-            axs[1, 0].set_ylim([-2.5, 2.5])
+    ax.set_title(spec["groundwater title"], fontsize=10)
+    ax.set_ylabel(spec["groundwater ylabel"])
 
     match location:
         case "ALB":
-            axs[2, 0].set_ylim([-245, -95])
+            ax.set_ylim([-245, -95])
         case "ASD":
-            axs[2, 0].set_ylim([-305, -155])
+            ax.set_ylim([-305, -155])
         case "ROU":
-            axs[2, 0].set_ylim([-185, -35])
+            ax.set_ylim([-185, -35])
         case "VLI":
-            axs[2, 0].set_ylim([-300, -150])
+            ax.set_ylim([-300, -150])
         case "ZEG":
-            axs[2, 0].set_ylim([-365, -215])
+            ax.set_ylim([-365, -215])
         case "ZH":
-            axs[2, 0].set_ylim([-365, -215])
+            ax.set_ylim([-365, -215])
         case "VEG":
-            axs[2, 0].set_ylim([-280, -130])
+            ax.set_ylim([-280, -130])
         case "LAW":
-            axs[2, 0].set_ylim([-320, -170])
+            ax.set_ylim([-320, -170])
         case "DEM":
-            axs[2, 0].set_ylim([-340, -190])
+            ax.set_ylim([-340, -190])
 
-    ############################################
-    # plot the soil profile
-    ############################################
+
+@traced()
+def plot_lithology(ax, data, location, spec, trendline_months=(1, 2)):
+    """Panel with the soil profile and the depths of the anchors."""
+
+    soilprofile_lithology = data["lithology"].get(spec["language"])
 
     if location in SOILPROFILE_DEPTHS.keys():
-        for anchor in soilprofile_anchors["m-mv"]:
-            axs[2, 1].hlines(anchor * 100 * -1, -1, 1, color="black", zorder=2)
+        for anchor in data["anchors"]["m-mv"]:
+            ax.hlines(anchor * 100 * -1, -1, 1, color="black", zorder=2)
 
-            axs[2, 1].plot(
+            ax.plot(
                 0.44, anchor * 100 * -1, "<", color="black", markersize=5, clip_on=False
             )
 
-        if not soilprofile_lithology.empty:
+        if soilprofile_lithology is not None and not soilprofile_lithology.empty:
             for lith in soilprofile_lithology.iterrows():
-                axs[2, 1].bar(
-                    "Soil composition",
+                ax.bar(
+                    spec["soil composition"],
                     lith[1]["dikte"],
                     bottom=lith[1]["bovengrens [cm]"],
                     label=lith[0],
-                    color=SOILTYPES_COLORS[lith[0]],
+                    color=spec["soiltype colors"][lith[0]],
                     zorder=1,
                 )
 
-        axs[2, 1].set_ylim(0, soilprofile_depth * 100)
+        ax.set_ylim(0, SOILPROFILE_DEPTHS[location] * 100)
 
-        handles, labels = axs[2, 1].get_legend_handles_labels()
+        handles, labels = ax.get_legend_handles_labels()
+
+        if spec["anchor marker"]:
+            # this to add a triangle symbol for the anchors to the legend
+            point = Line2D(
+                [0],
+                [0],
+                label=spec["anchor marker"],
+                marker="<",
+                markersize=6,
+                color="k",
+                linestyle="",
+            )
+
+            handles.extend([point])
+            labels.extend([point.get_label()])
 
         # by_label = dict(zip(labels, handles))
         by_label = OrderedDict(zip(labels, handles))
 
-        if location in ["GOU"]:
-            key_order = ["sand", "organic sand", "clay", "organic clay", "peat"]
-            for k in key_order:  # a loop to force the order you want
-                by_label.move_to_end(k)
-        if location in ["M4T"]:
-            key_order = ["clay", "organic clay", "peat", "peat, clayey", "sand"]
-            for k in key_order:  # a loop to force the order you want
-                by_label.move_to_end(k)
-        if location in ["MMW"]:
-            key_order = ["clay", "organic clay", "peat", "gyttja", "sand"]
-            for k in key_order:  # a loop to force the order you want
-                by_label.move_to_end(k)
-        if location in ["MSW"]:
-            key_order = ["clay", "peat", "peat, clayey", "gyttja", "sand"]
-            for k in key_order:  # a loop to force the order you want
-                by_label.move_to_end(k)
-
-        soilprofile_legend = axs[2, 1].legend(
+        # a loop to force the order you want
+        for k in spec["key orders"].get(location, []):
+            by_label.move_to_end(k)
+
+        ax.legend(
             by_label.values(),
             by_label.keys(),
             bbox_to_anchor=(1.85, 0.95),
@@ -411,40 +499,83 @@ for location in locations:
             frameon=False,
             fontsize=9,
             ncol=1,
-            title="Soil types:",
+            title=spec["soil types"],
         )
 
-        axs[2, 1].invert_yaxis()
+        ax.invert_yaxis()
+
+    ax.set_xlim([-0.4, 0.4])
+    ax.set_ylabel(spec["depth ylabel"])
+
+
+# the panels of the figure, with their axes and the parts of the variant spec
+# they depend on
+PANELS = {
+    "anchors": {
+        "function": plot_anchors,
+        "axes": (0, 0),
+        "keys": [
+            "rename anchors",
+            "trendlines",
+            "surface level",
+            "anchor title",
+            "anchor ylabel",
+        ],
+    },
+    "layer thickness": {
+        "function": plot_layer_thickness,
+        "axes": (1, 0),
+        "keys": ["rename anchors", "trendlines", "layer title", "layer ylabel"],
+    },
+    "groundwater": {
+        "function": plot_groundwater,
+        "axes": (2, 0),
+        "keys": [
+            "filters",
+            "filter label",
+            "filter label locations",
+            "ditch level",
+            "ditch color",
+            "groundwater title",
+            "groundwater ylabel",
+        ],
+    },
+    "lithology": {
+        "function": plot_lithology,
+        "axes": (2, 1),
+        "keys": [
+            "language",
+            "soil composition",
+            "soiltype colors",
+            "key orders",
+            "anchor marker",
+            "soil types",
+            "depth ylabel",
+        ],
+    },
+}
 
-    axs[2, 1].set_xlim([-0.4, 0.4])
-    axs[2, 1].set_ylabel("cm below surface level")
 
-    ###########################################
-    # other figure settings
-    ###########################################
+def create_figure():
+    fig, axs = plt.subplots(nrows=3, ncols=2, gridspec_kw={"width_ratios": [4, 1]})
+
+    axs[0, 1].axis("off")
+    axs[1, 1].axis("off")
 
     fig.set_figwidth(9)
     fig.set_figheight(10.5)
-    plt.subplots_adjust(hspace=0.3, wspace=0.3)
+    fig.subplots_adjust(hspace=0.3, wspace=0.3)
 
-    match location:
-        case (
-            "DEM"
-            | "LW"
-            | "VEG"
-            | "ZH"
-            | "GDA"
-            | "BKW"
-            | "BKG"
-            | "CBW"
-            | "HZW"
-            | "MMW"
-            | "M4T"
-            | "MSW"
-        ):
-            suptitle_name = location_fullname
-        case _:
-            suptitle_name = f"{location_fullname} {plot_name}"
+    return fig, axs
+
+
+def set_suptitle(fig, location, plot_type, spec):
+    location_fullname = LOCATION_FULLNAMES[location]
+
+    if location in LOCATIONS_WITHOUT_PLOT_TYPE or spec["plot names"] is None:
+        suptitle_name = location_fullname
+    else:
+        suptitle_name = f"{location_fullname} {spec['plot names'][plot_type]}"
 
     fig.suptitle(
         suptitle_name,
@@ -454,37 +585,137 @@ for location in locations:
         ha="center",
     )
 
-    outputdir = Path(
-        r"n:/Projects/11211000/11211391/B. Measurements and calculations/Bodembeweging"
-    )
 
-    match location:
-        case (
-            "DEM"
-            | "LW"
-            | "VEG"
-            | "ZH"
-            | "GDA"
-            | "BKW"
-            | "BKG"
-            | "CBW"
-            | "HZW"
-            | "M4T"
-            | "MMW"
-            | "MSW"
-        ):
-            plot_type = ""
-        case _:
-            plot_type = "_" + plot_type
-
-    plt.savefig(
-        outputdir.joinpath(
-            "data",
-            "5-visualisation",
-            location_fullname,
-            f"soil_movement{plot_type}.png",
-        ),
-        bbox_inches="tight",
-        dpi=300,
+def plot_soil_movement_variants(
+    data, location, plot_type="RF", variants=("english",), trendline_months=(1, 2)
+):
+    """
+    Draw variants of the soil movement figure of a location one after the
+    other on the same figure. A panel is only drawn again when a part of the
+    spec it depends on differs from the previous variant (see PANELS).
+
+    Parameters:
+    - data: Data of the location (see load_soil_movement_data).
+    - location: Short code for the location (e.g., "ROU").
+    - plot_type: Plot type of the location (default is "RF").
+    - variants: Names of the variants (see VARIANTS).
+    - trendline_months: Months used for the trendlines.
+
+    Returns:
+    - Generator with the name of the variant, the figure (which can be saved
+      until the next variant is drawn) and the names of the panels that were
+      drawn. The figure is closed at the end.
+    """
+
+    fig, axs = create_figure()
+
+    drawn = {}
+
+    try:
+        for variant in variants:
+            spec = VARIANTS[variant]
+            redrawn = []
+
+            for name, panel in PANELS.items():
+                key = [spec[key] for key in panel["keys"]]
+
+                if drawn.get(name) == key:
+                    continue
+
+                ax = axs[panel["axes"]]
+                ax.clear()
+                panel["function"](ax, data, location, spec, trendline_months)
+
+                drawn[name] = key
+                redrawn.append(name)
+
+            set_suptitle(fig, location, plot_type, spec)
+
+            yield variant, fig, redrawn
+
+    finally:
+        plt.close(fig)
+
+
+def plot_soil_movement(
+    data, location, plot_type="RF", variant="english", trendline_months=(1, 2)
+):
+    """
+    Figure with the anchor heights, layer thicknesses, groundwater levels and
+    soil profile of a location.
+
+    Parameters:
+    - data: Data of the location (see load_soil_movement_data).
+    - location: Short code for the location (e.g., "ROU").
+    - plot_type: Plot type of the location (default is "RF").
+    - variant: Name of the variant (see VARIANTS), e.g. "english" or "dutch".
+    - trendline_months: Months used for the trendlines.
+
+    Returns:
+    - The figure.
+    """
+
+    fig, axs = create_figure()
+    spec = VARIANTS[variant]
+
+    for panel in PANELS.values():
+        panel["function"](axs[panel["axes"]], data, location, spec, trendline_months)
+
+    set_suptitle(fig, location, plot_type, spec)
+
+    return fig
+
+
+def get_path_to_figure(location, plot_type="RF", variant="english"):
+    """Path of the soil movement figure of a location."""
+
+    if location in LOCATIONS_WITHOUT_PLOT_TYPE:
+        plot_type = ""
+    else:
+        plot_type = "_" + plot_type
+
+    return data_path(BODEMBEWEGING_DIR).joinpath(
+        "data",
+        "5-visualisation",
+        LOCATION_FULLNAMES[location],
+        f"soil_movement{plot_type}{VARIANTS[variant]['suffix']}.png",
     )
-    # plt.show()
+
+
+if __name__ == "__main__":
+
+    #################################################################
+    # Parameters
+    #################################################################
+
+    # locations = ["HZW"]  # "BKG"]  #
+    # locations = ["ALB", "ASD", "ROU", "ZEG", "VLI", "DEM", "LW", "VEG", "ZH"]
+    # locations = ["ZEG"]
+    locations = ["ROU"]
+    # locations = ["M4T", "MMW", "MSW"]
+    # locations = ["VEG"]
+    plot_type = "RF"
+    variant = "english"
+
+    trendline_months = (1, 2)
+
+    for location in locations:
+
+        print(f"Plotting data for location: {LOCATION_FULLNAMES[location]}")
+
+        data = load_soil_movement_data(location, plot_type=plot_type)
+
+        fig = plot_soil_movement(
+            data,
+            location,
+            plot_type=plot_type,
+            variant=variant,
+            trendline_months=trendline_months,
+        )
+
+        fig.savefig(
+            get_path_to_figure(location, plot_type, variant),
+            bbox_inches="tight",
+            dpi=300,
+        )
+        # plt.show()
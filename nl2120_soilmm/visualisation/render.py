@@ -0,0 +1,282 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import io
+import time
+
+import matplotlib
+import pandas as pd
+
+from nl2120_soilmm.cache import cache_clear
+from nl2120_soilmm.constants import LOCATION_FULLNAMES
+from nl2120_soilmm.sites import BODEMBEWEGING_DIR, data_path
+from nl2120_soilmm.tracing import span, traced
+from nl2120_soilmm.visualisation.plot_soil_movement import (
+    VARIANTS,
+    get_path_to_figure,
+    load_soil_movement_data,
+    plot_soil_movement,
+    plot_soil_movement_variants,
+)
+
+# the figures that can be rendered, with the function that reads the data of a
+# location, the function that draws the variants of the figure one after the
+# other, the function that draws a single figure, the variants and the path of
+# the figure
+FIGURES = {
+    "soil movement": {
+        "load": load_soil_movement_data,
+        "plot variants": plot_soil_movement_variants,
+        "plot": plot_soil_movement,
+        "variants": VARIANTS,
+        "path": get_path_to_figure,
+    },
+}
+
+PATH_TO_TIMINGS = data_path(BODEMBEWEGING_DIR).joinpath(
+    "data", "5-visualisation", "render_timings.csv"
+)
+
+
+def use_agg():
+    """Draw the figures without a window, in each worker process."""
+    matplotlib.use("Agg")
+
+
+def get_jobs(figures, locations, plot_types=("RF",), variants=("english",)):
+    """All combinations of figures, locations, plot types and variants."""
+    return [
+        (figure, location, plot_type, variant)
+        for figure in figures
+        for location in locations
+        for plot_type in plot_types
+        for variant in variants
+    ]
+
+
+def group_jobs(jobs):
+    """Variants per location and plot type, and per figure, which use the same data."""
+    groups = {}
+
+    for figure, location, plot_type, variant in jobs:
+        groups.setdefault((location, plot_type), {}).setdefault(figure, []).append(
+            variant
+        )
+
+    return groups
+
+
+@traced()
+def render_location(location, plot_type, figures, dpi=300):
+    """
+    Render the figures of a location. The data is read once per loader, and
+    the variants of a figure are drawn on the same figure, so only the panels
+    that differ between them are drawn again.
+
+    Parameters:
+    - location: Short code for the location (e.g., "ROU").
+    - plot_type: Plot type of the location (e.g., "RF").
+    - figures: Dictionary with the variants per figure.
+    - dpi: Resolution of the figures.
+
+    Returns:
+    - List with the path, the panels that were drawn and the load, plot and
+      save times of each figure. The error is included when a figure failed.
+    """
+
+    loaded = {}
+    timings = []
+
+    for figure, variants in figures.items():
+        spec = FIGURES[figure]
+
+        try:
+            start = time.perf_counter()
+            if spec["load"] not in loaded:
+                loaded[spec["load"]] = spec["load"](location, plot_type=plot_type)
+            load_time = time.perf_counter() - start
+
+            drawn = spec["plot variants"](
+                loaded[spec["load"]], location, plot_type=plot_type, variants=variants
+            )
+
+            start = time.perf_counter()
+            for variant, fig, redrawn in drawn:
+                timing = {
+                    "figure": figure,
+                    "location": location,
+                    "plot_type": plot_type,
+                    "variant": variant,
+                    "path": None,
+                    "panels": ", ".join(redrawn),
+                    "load [s]": load_time,
+                    "plot [s]": time.perf_counter() - start,
+                    "save [s]": None,
+                    "error": None,
+                }
+                load_time = 0.0
+
+                path_to_figure = spec["path"](location, plot_type, variant)
+                path_to_figure.parent.mkdir(parents=True, exist_ok=True)
+
+                start = time.perf_counter()
+                with span(
+                    "render.savefig",
+                    location=location,
+                    plot_type=plot_type,
+                    variant=variant,
+                ):
+                    fig.savefig(path_to_figure, bbox_inches="tight", dpi=dpi)
+                timing["save [s]"] = time.perf_counter() - start
+                timing["path"] = str(path_to_figure)
+
+                timings.append(timing)
+                start = time.perf_counter()
+
+        except Exception as error:
+            done = {t["variant"] for t in timings if t["figure"] == figure}
+            for variant in variants:
+                if variant in done:
+                    continue
+                timings.append(
+                    {
+                        "figure": figure,
+                        "location": location,
+                        "plot_type": plot_type,
+                        "variant": variant,
+                        "error": f"{type(error).__name__}: {error}",
+                    }
+                )
+
+    return timings
+
+
+def check_jobs(jobs):
+    for figure, location, plot_type, variant in jobs:
+        if figure not in FIGURES:
+            raise ValueError(f"Unknown figure: {figure}")
+        if variant not in FIGURES[figure]["variants"]:
+            raise ValueError(f"Unknown variant of the {figure} figure: {variant}")
+
+
+def render(jobs, workers=None, dpi=300, path_to_timings=PATH_TO_TIMINGS):
+    """
+    Render figures in parallel worker processes with the Agg backend. The jobs
+    of a location and plot type are rendered by the same worker, so the data is
+    only read once.
+
+    Parameters:
+    - jobs: List of (figure, location, plot_type, variant) tuples, see FIGURES
+      for the figures and their variants (e.g., ("soil movement", "ROU", "RF",
+      "dutch")).
+    - workers: Number of worker processes, the number of CPUs by default. With
+      1 the figures are rendered in this process.
+    - dpi: Resolution of the figures.
+    - path_to_timings: csv file to write the timings to, None to skip it.
+
+    Returns:
+    - DataFrame with the timings of each figure (see render_location).
+    """
+
+    check_jobs(jobs)
+
+    groups = group_jobs(jobs)
+    timings = []
+
+    if workers == 1:
+        use_agg()
+        for (location, plot_type), figures in groups.items():
+            timings += render_location(location, plot_type, figures, dpi)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=use_agg) as pool:
+            futures = [
+                pool.submit(render_location, location, plot_type, figures, dpi)
+                for (location, plot_type), figures in groups.items()
+            ]
+
+            for future in as_completed(futures):
+                for timing in future.result():
+                    status = timing["error"] or timing["path"]
+                    print(
+                        f"{timing['figure']} {timing['location']} "
+                        f"{timing['plot_type']} {timing['variant']}: {status}"
+                    )
+                    timings.append(timing)
+
+    timings = pd.DataFrame(timings)
+
+    if path_to_timings is not None and not timings.empty:
+        path_to_timings.parent.mkdir(parents=True, exist_ok=True)
+        timings.to_csv(path_to_timings, index=False)
+
+    return timings
+
+
+def benchmark(jobs, dpi=300):
+    """
+    Time the regeneration of a set of figures in this process, the way the
+    separate scripts do it (the data is read and every figure is drawn from
+    scratch per variant) and the way render() does it (the data is read once
+    per location and only the panels that differ are drawn again). The figures
+    are saved to memory, so the figures on disk are not changed.
+
+    Returns:
+    - Series with the total time in seconds of both ways.
+    """
+
+    check_jobs(jobs)
+    use_agg()
+
+    import matplotlib.pyplot as plt
+
+    cache_clear()
+    start = time.perf_counter()
+    for figure, location, plot_type, variant in jobs:
+        spec = FIGURES[figure]
+        # each script reads the files again
+        cache_clear()
+        data = spec["load"](location, plot_type=plot_type)
+        fig = spec["plot"](data, location, plot_type=plot_type, variant=variant)
+        fig.savefig(io.BytesIO(), bbox_inches="tight", dpi=dpi)
+        plt.close(fig)
+    separate = time.perf_counter() - start
+
+    cache_clear()
+    start = time.perf_counter()
+    for (location, plot_type), figures in group_jobs(jobs).items():
+        for figure, variants in figures.items():
+            spec = FIGURES[figure]
+            data = spec["load"](location, plot_type=plot_type)
+            for _, fig, _ in spec["plot variants"](
+                data, location, plot_type=plot_type, variants=variants
+            ):
+                fig.savefig(io.BytesIO(), bbox_inches="tight", dpi=dpi)
+    shared = time.perf_counter() - start
+
+    return pd.Series({"separate [s]": separate, "shared [s]": shared})
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Render the figures of several locations in parallel."
+    )
+    parser.add_argument("locations", nargs="*", default=list(LOCATION_FULLNAMES))
+    parser.add_argument("--figures", nargs="+", default=list(FIGURES))
+    parser.add_argument("--plot-types", nargs="+", default=["RF"])
+    parser.add_argument("--variants", nargs="+", default=["english", "dutch"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="time the figures drawn separately and with shared data and panels",
+    )
+    args = parser.parse_args()
+
+    jobs = get_jobs(args.figures, args.locations, args.plot_types, args.variants)
+
+    if args.benchmark:
+        print(benchmark(jobs, dpi=args.dpi))
+    else:
+        timings = render(jobs, workers=args.workers, dpi=args.dpi)
+        print(timings.drop(columns="path").to_string())